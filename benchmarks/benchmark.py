@@ -0,0 +1,434 @@
+# coding: utf-8
+"""Throughput and peak RSS benchmarks of prefetch2es.
+
+A corpus is built by replicating the sample prefetch files used by the tests,
+and bulk requests are sent to a local stand-in for the Elasticsearch _bulk
+endpoint, so results only depend on this machine.
+
+    $ python benchmarks/benchmark.py --copies 1000 --json result.json
+
+Each measurement runs in a fresh process, so its peak RSS is not inflated
+by earlier ones. Stage measurements run in a single process; their peak RSS
+includes the data produced by the preceding stages, which they start from.
+End-to-end measurements run the prefetch2es import pipeline as a whole
+with each executor backend (process, thread, inline), with peak RSS covering
+the worker processes as well, and the fastest backend is reported.
+"""
+import argparse
+import hashlib
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import multiprocessing as mp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib import request
+
+import orjson
+
+from prefetch2es.models.ElasticsearchUtils import ElasticsearchUtils
+from prefetch2es.models.Prefetch2es import (
+    EXECUTOR_INLINE,
+    EXECUTORS,
+    Prefetch2es,
+    build_standard_record,
+    build_timeline_records,
+    read_prefetch,
+    serialize_record,
+)
+from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+# Same samples as tests/conftest.py
+SAMPLE_BASE_URL = "https://raw.githubusercontent.com/EricZimmerman/Prefetch/master/Prefetch.Test/TestFiles/Win10"
+SAMPLES = {
+    "CALC.EXE-3FBEF7FD.pf": "40b8917687c2b1cf8ac5bfeea6476a39",
+    "CALCULATOR.EXE-6940BD5C.pf": "00303143c458d2479d33511bc3b9610e",
+    "CHROME.EXE-B3BA7868.pf": "221eacbee606746ecda2ee8ce0f187d0",
+    "CMD.EXE-D269B812.pf": "3f665f2441f1bfa535fd4c4746a9d975",
+    "DCODEDCODEDCODEDCODEDCODEDCOD-E65B9FE8.pf": "a3691e9b4578fe5461e75b760ae90932",
+    "DEVENV.EXE-854D7862.pf": "4aeb838bfb7a8937f1c3cd7d74835792",
+}
+
+STAGES = ("discovery", "parse", "build", "serialize", "bulk")
+MODES = ("standard", "timeline")
+INDEX_NAME = "benchmark"
+
+T = TypeVar("T")
+
+
+def fetch_samples(cachedir: Path) -> Path:
+    """Download the sample prefetch files unless they are already cached.
+
+    Args:
+        cachedir (Path): Directory holding the samples.
+
+    Returns:
+        Path: cachedir
+    """
+    cachedir.mkdir(parents=True, exist_ok=True)
+    for name, expected_md5 in SAMPLES.items():
+        sample = cachedir / name
+        if sample.exists() and hashlib.md5(sample.read_bytes()).hexdigest() == expected_md5:
+            continue
+        data = request.urlopen(f"{SAMPLE_BASE_URL}/{name}").read()
+        if hashlib.md5(data).hexdigest() != expected_md5:
+            raise ValueError(f"MD5 mismatch for {name}")
+        sample.write_bytes(data)
+    return cachedir
+
+
+def build_corpus(samples_dir: Path, corpus_dir: Path, copies: int) -> int:
+    """Replicate the sample prefetch files into a corpus directory.
+
+    Args:
+        samples_dir (Path): Directory of the original .pf files.
+        corpus_dir (Path): Output directory.
+        copies (int): Number of copies of each sample.
+
+    Returns:
+        int: Number of files in the corpus.
+    """
+    samples = sorted(samples_dir.glob("*.pf"))
+    if not samples:
+        raise ValueError(f"No prefetch files in {samples_dir}")
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(copies):
+        for sample in samples:
+            shutil.copyfile(sample, corpus_dir / f"{sample.stem}-{i:06d}.pf")
+    return copies * len(samples)
+
+
+class BulkSinkHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in of Elasticsearch acknowledging every bulk document."""
+
+    protocol_version = "HTTP/1.1"
+    documents = 0
+    bytes = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?")[0]
+        if path.endswith("/_bulk"):
+            count = len(body.splitlines()) // 2
+            with self.lock:
+                BulkSinkHandler.documents += count
+                BulkSinkHandler.bytes += len(body)
+            self._reply(
+                b'{"took":0,"errors":false,"items":['
+                + b",".join([b'{"index":{"status":201}}'] * count)
+                + b"]}"
+            )
+        elif path == "/_sink/documents":
+            self._reply(
+                orjson.dumps(
+                    {"documents": BulkSinkHandler.documents, "bytes": BulkSinkHandler.bytes}
+                )
+            )
+        else:
+            self._reply(b'{"acknowledged":true}')
+
+    do_PUT = do_GET = do_POST
+
+
+def run_bulk_sink(port_queue: "mp.Queue[int]") -> None:
+    """Serve the bulk sink forever, reporting its port through port_queue."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BulkSinkHandler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def get_sink_counters(port: int) -> Tuple[int, int]:
+    """Get the number of documents and bytes received by the bulk sink."""
+    req = request.Request(f"http://127.0.0.1:{port}/_sink/documents", method="POST")
+    counters = orjson.loads(request.urlopen(req).read())
+    return counters["documents"], counters["bytes"]
+
+
+def get_peak_rss() -> Optional[int]:
+    """Get the peak RSS of this process and its terminated children in bytes."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def timed(func: Callable[..., T], *args) -> Tuple[float, T]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def measure_stage(corpus_dir: Path, stage: str, mode: str, port: int) -> dict:
+    """Measure one stage, preceded by the untimed stages it starts from.
+
+    Args:
+        corpus_dir (Path): Corpus directory.
+        stage (str): One of STAGES.
+        mode (str): One of MODES.
+        port (int): Port of the bulk sink.
+
+    Returns:
+        dict: Measurement.
+    """
+    result: dict = {"stage": stage, "mode": mode, "workers": 1}
+
+    seconds, files = timed(
+        lambda: list(chain.from_iterable(Prefetch2es(corpus_dir).gen_file_chunks(1000)))
+    )
+    result.update(files=len(files), documents=0, bytes=0, seconds=seconds)
+    if stage == "discovery":
+        return result
+
+    seconds, parsed = timed(lambda: [read_prefetch(path) for path in files])
+    result["seconds"] = seconds
+    if stage == "parse":
+        return result
+
+    def build() -> List[dict]:
+        if mode == "timeline":
+            records: List[dict] = []
+            for path, prefetch in zip(files, parsed):
+                records.extend(build_timeline_records(prefetch, path, ""))
+            return records
+        return [build_standard_record(prefetch, path) for path, prefetch in zip(files, parsed)]
+
+    seconds, records = timed(build)
+    result.update(documents=len(records), seconds=seconds)
+    if stage == "build":
+        return result
+
+    seconds, serialized = timed(lambda: [serialize_record(record) for record in records])
+    result.update(
+        bytes=sum(len(source) for _, source in serialized), seconds=seconds
+    )
+    if stage == "serialize":
+        return result
+
+    es = ElasticsearchUtils("127.0.0.1", port, "http", "", "")
+
+    def send() -> int:
+        sent = 0
+        for lines in es.gen_bulk_batches([(INDEX_NAME, serialized)], ""):
+            es.bulk_body(lines)
+            sent += sum(len(line) + 1 for line in lines)
+        return sent
+
+    seconds, sent = timed(send)
+    result.update(bytes=sent, seconds=seconds)
+    return result
+
+
+def measure_import(
+    corpus_dir: Path, mode: str, executor: str, workers: int, port: int
+) -> dict:
+    """Measure a whole prefetch2es import.
+
+    Args:
+        corpus_dir (Path): Corpus directory.
+        mode (str): One of MODES.
+        executor (str): Backend parsing the files, one of EXECUTORS.
+        workers (int): Number of workers (0 = CPU count).
+        port (int): Port of the bulk sink.
+
+    Returns:
+        dict: Measurement.
+    """
+    files = sum(1 for _ in corpus_dir.glob("*.pf"))
+    documents, sent = get_sink_counters(port)
+    seconds, _ = timed(
+        Prefetch2esPresenter(
+            input_path=corpus_dir,
+            host="127.0.0.1",
+            port=port,
+            index=INDEX_NAME,
+            is_quiet=True,
+            timeline_mode=mode == "timeline",
+            executor=executor,
+            workers=workers,
+        ).bulk_import
+    )
+    total_documents, total_sent = get_sink_counters(port)
+    return {
+        "stage": f"import-{executor}",
+        "mode": mode,
+        "executor": executor,
+        "workers": 1
+        if executor == EXECUTOR_INLINE
+        else workers or Prefetch2es.get_cpu_count(),
+        "files": files,
+        "documents": total_documents - documents,
+        "bytes": total_sent - sent,
+        "seconds": seconds,
+    }
+
+
+def _run_measurement(result_queue: "mp.Queue[dict]", func: Callable, args: tuple) -> None:
+    result = func(*args)
+    result["peak_rss"] = get_peak_rss()
+    result_queue.put(result)
+
+
+def run_isolated(ctx: mp.context.BaseContext, func: Callable, *args) -> dict:
+    """Run a measurement in a fresh process."""
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=_run_measurement, args=(result_queue, func, args))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def format_table(results: List[dict]) -> str:
+    header = ("stage", "mode", "workers", "files", "docs", "seconds", "files/s", "docs/s", "MB/s", "peak RSS MB")
+    rows = [header]
+    for r in results:
+        seconds = r["seconds"] or float("nan")
+        rows.append(
+            (
+                r["stage"],
+                r["mode"],
+                str(r["workers"]),
+                str(r["files"]),
+                str(r["documents"]),
+                f"{r['seconds']:.3f}",
+                f"{r['files'] / seconds:.0f}",
+                f"{r['documents'] / seconds:.0f}" if r["documents"] else "-",
+                f"{r['bytes'] / seconds / 2**20:.1f}" if r["bytes"] else "-",
+                f"{r['peak_rss'] / 2**20:.0f}" if r["peak_rss"] else "-",
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows
+    )
+
+
+def find_fastest_executors(results: List[dict]) -> Dict[str, str]:
+    """Get the executor of the fastest import of each record format.
+
+    Args:
+        results (List[dict]): Measurements.
+
+    Returns:
+        Dict[str, str]: Fastest executor of each mode with import measurements.
+    """
+    fastest: Dict[str, dict] = {}
+    for r in results:
+        if "executor" not in r:
+            continue
+        if r["mode"] not in fastest or r["seconds"] < fastest[r["mode"]]["seconds"]:
+            fastest[r["mode"]] = r
+    return {mode: r["executor"] for mode, r in fastest.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--samples",
+        type=Path,
+        default=Path(__file__).parent / "cache",
+        help="Directory of sample .pf files, downloaded if empty",
+    )
+    parser.add_argument(
+        "--copies", type=int, default=1000, help="Copies of each sample in the corpus"
+    )
+    parser.add_argument(
+        "--workdir", type=Path, default=None, help="Corpus directory (default: temporary)"
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to measure"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=MODES, default=list(MODES), help="Record formats to measure"
+    )
+    parser.add_argument(
+        "--no-import", action="store_true", help="Skip the end-to-end import measurements"
+    )
+    parser.add_argument(
+        "--executors",
+        nargs="+",
+        choices=EXECUTORS,
+        default=list(EXECUTORS),
+        help="Executor backends of the import measurements",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Workers of each backend (default: CPU count)"
+    )
+    parser.add_argument("--json", type=Path, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    if not any(args.samples.glob("*.pf")):
+        fetch_samples(args.samples)
+
+    ctx = mp.get_context("spawn")
+    port_queue = ctx.Queue()
+    sink = ctx.Process(target=run_bulk_sink, args=(port_queue,), daemon=True)
+    sink.start()
+    port = port_queue.get()
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="prefetch2es-benchmark-"))
+    try:
+        corpus_dir = workdir / "corpus"
+        if not any(corpus_dir.glob("*.pf")):
+            build_corpus(args.samples, corpus_dir, args.copies)
+
+        results: List[dict] = []
+        for mode in args.modes:
+            for stage in args.stages:
+                results.append(run_isolated(ctx, measure_stage, corpus_dir, stage, mode, port))
+            if not args.no_import:
+                for executor in args.executors:
+                    results.append(
+                        run_isolated(
+                            ctx, measure_import, corpus_dir, mode, executor, args.workers, port
+                        )
+                    )
+
+        print(format_table(results))
+        fastest = find_fastest_executors(results)
+        for mode, executor in fastest.items():
+            print(f"Fastest executor ({mode}): {executor}")
+        if args.json:
+            summary: Dict[str, object] = {
+                "copies": args.copies,
+                "cpu_count": Prefetch2es.get_cpu_count(),
+                "python": sys.version.split()[0],
+                "fastest_executor": fastest,
+                "results": results,
+            }
+            args.json.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    finally:
+        sink.terminate()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
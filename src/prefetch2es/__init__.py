@@ -1,16 +1,37 @@
 # coding: utf-8
-from typing import List
+from importlib import import_module
+from typing import TYPE_CHECKING, Generator, Iterable, List, Optional, Union
 from pathlib import Path
 
-from prefetch2es.models.Prefetch2es import Prefetch2es
-from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+from prefetch2es.models.Options import (
+    DEFAULT_CACHE_BYTES,
+    DEFAULT_IO_THREADS,
+    DEFAULT_MAX_CHUNK_BYTES,
+    DEFAULT_SHARD_BYTES,
+    DEFAULT_TARGET_LATENCY,
+    parse_chunk_size,
+)
+from prefetch2es.models.PrefetchRecord import export_records
+
+if TYPE_CHECKING:
+    from prefetch2es.models.Prefetch2es import WorkerPool
 
 
 # for use via python-script!
+# Presenters and the parsing models are imported by the functions using them,
+# so that importing the package does not load the Elasticsearch client,
+# multiprocessing or pyscca.
+
+
+def __getattr__(name: str):
+    # Prefetch2es and WorkerPool are loaded on first access
+    if name in ("Prefetch2es", "WorkerPool"):
+        return getattr(import_module("prefetch2es.models.Prefetch2es"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def prefetch2es(
-    input_path: str,
+    input_path: Union[str, List[str]],
     host: str = "localhost",
     port: int = 9200,
     index: str = "prefetch2es",
@@ -22,11 +43,40 @@ def prefetch2es(
     chunk_size: int = 500,
     timeline_mode: bool = False,
     tags: str = "",
-) -> None:
+    max_inflight: int = 0,
+    bulk_threads: int = 1,
+    max_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    state_file: str = "",
+    slim_timeline: bool = False,
+    files_index: str = "",
+    timeline_index: str = "",
+    bulk_output: str = "",
+    compression: str = "",
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+    overwrite: bool = False,
+    stats_file: str = "",
+    recursive: bool = False,
+    read_ahead: int = 0,
+    io_threads: int = DEFAULT_IO_THREADS,
+    parse_cache: int = 0,
+    parse_cache_dir: str = "",
+    parse_cache_bytes: int = DEFAULT_CACHE_BYTES,
+    max_retries: int = 3,
+    retry_wait: float = 1.0,
+    adaptive: bool = False,
+    target_latency: float = DEFAULT_TARGET_LATENCY,
+    parse_chunk: Union[int, str] = "auto",
+    pool: Optional["WorkerPool"] = None,
+    executor: str = "",
+    workers: int = 0,
+    index_template: bool = False,
+    tune_index: bool = False,
+) -> dict:
     """Fast import of Windows Prefetch into Elasticsearch.
     Args:
-        input_path (str):
+        input_path (Union[str, List[str]]):
             Windows Prefetch files or directory to import into Elasticsearch.
+            Multiple paths are imported in a single session.
 
         host (str, optional):
             Elasticsearch host address. Defaults to "localhost".
@@ -53,7 +103,7 @@ def prefetch2es(
             Flag to run multiprocessing.
 
         chunk_size (int, optional):
-            Size of the chunk to be processed for each process.
+            Maximum number of documents per bulk request. Defaults to 500.
 
         timeline_mode (bool, optional):
             Enable timeline analysis mode - creates specialized records
@@ -61,10 +111,318 @@ def prefetch2es(
 
         tags (str, optional):
             Additional tags for timeline records (comma-separated).
+
+        max_inflight (int, optional):
+            Maximum number of chunks in flight in multiprocess mode.
+            Defaults to 0 (twice the CPU count).
+
+        bulk_threads (int, optional):
+            Number of bulk requests sent to Elasticsearch concurrently.
+            Defaults to 1.
+
+        max_bytes (int, optional):
+            Maximum payload size of a bulk request in bytes. A request is
+            flushed at chunk_size documents or max_bytes, whichever comes
+            first. Defaults to 10 MiB.
+
+        state_file (str, optional):
+            SQLite manifest of ingested files. Files already ingested as the
+            same records into the same indices are skipped, and progress is
+            recorded as bulk requests complete so an interrupted run
+            resumes. Defaults to "".
+
+        slim_timeline (bool, optional):
+            With timeline_mode, events only carry the executable, timestamp
+            and hash; volumes and metrics are indexed once per file into
+            files_index and referenced by windows.prefetch.file_id.
+
+        files_index (str, optional):
+            Index of the per-file records of slim timeline events.
+            Defaults to "" ("<timeline index>-files").
+
+        timeline_index (str, optional):
+            Also import timeline records into this index. Each file is
+            parsed once and both record shapes are sent in the same bulk
+            stream, standard records into index. Defaults to "".
+
+        bulk_output (str, optional):
+            Directory to write ready-to-send _bulk NDJSON files into instead
+            of importing; send them later with prefetch2es_replay().
+            state_file is not used. Defaults to "".
+
+        compression (str, optional):
+            Compression of the bulk files ("gzip" or "zstd"). Defaults to "".
+
+        shard_bytes (int, optional):
+            Uncompressed size after which a new bulk file is started.
+            Defaults to 100 MiB.
+
+        overwrite (bool, optional):
+            Delete the bulk files already in bulk_output, which are refused
+            otherwise, as replaying the directory would send them too.
+            Defaults to False.
+
+        stats_file (str, optional):
+            Also write the run statistics to this JSON file. Defaults to "".
+
+        recursive (bool, optional):
+            Also search subdirectories of directories. Defaults to False.
+
+        read_ahead (int, optional):
+            Number of files read into memory by a thread pool ahead of the
+            parsers, hiding the latency of network shares. Defaults to 0
+            (files are read by the parsers).
+
+        io_threads (int, optional):
+            Number of files read concurrently with read_ahead. Defaults to 8.
+
+        parse_cache (int, optional):
+            Number of parsed files each process keeps in memory, keyed by a
+            hash of their content. Byte-identical files are parsed once and
+            only source_file and tags differ between their records.
+            Defaults to 0 (disabled).
+
+        parse_cache_dir (str, optional):
+            Also keep parsed files in this directory, shared by the worker
+            processes and later runs. Defaults to "".
+
+        parse_cache_bytes (int, optional):
+            Size cap of parse_cache_dir; the least recently used entries are
+            removed at the end of the run. Defaults to 1 GiB.
+
+        max_retries (int, optional):
+            Number of times a failed request, or documents rejected with
+            429/503, are sent again. Defaults to 3.
+
+        retry_wait (float, optional):
+            Seconds to wait before the first retry, doubled on each attempt,
+            with random jitter. Defaults to 1.0.
+
+        adaptive (bool, optional):
+            Adapt the number of documents per request and of concurrent
+            requests to bulk latency and rejections: slow down under pressure
+            and speed up again, up to chunk_size and bulk_threads.
+
+        target_latency (float, optional):
+            With adaptive, requests slower than this many seconds shrink the
+            batch size. Defaults to 5.0.
+
+        parse_chunk (Union[int, str], optional):
+            Number of files handed to a worker at a time, independent of
+            chunk_size. "auto" uses large chunks while files keep coming and
+            smaller ones at the end, so no worker is left alone with a large
+            last chunk. Defaults to "auto".
+
+        pool (Optional[WorkerPool], optional):
+            Worker pool parsing the files, e.g. shared by many calls,
+            instead of one started for this call. Implies multiprocess.
+
+        executor (str, optional):
+            Backend parsing the files: "process" (worker processes),
+            "thread" (threads of this process) or "inline" (this thread).
+            Defaults to "", process with multiprocess and inline otherwise.
+            With a pool, it must be the executor of the pool or "inline".
+
+        workers (int, optional):
+            Number of worker processes or threads. Defaults to 0, the CPU
+            count.
+
+        index_template (bool, optional):
+            Install an index template mapping the records of each target
+            index (keyword paths and hashes, date timestamps) instead of
+            relying on dynamic mapping. It applies to indices created
+            afterwards, and needs index, timeline_index and files_index to
+            be distinct.
+
+        tune_index (bool, optional):
+            Disable refresh and replicas of the target indices during the
+            import, creating them if needed, then restore their settings
+            and refresh them at the end.
+
+    Returns:
+        dict: Run statistics (stage timings, throughput, bulk latency).
+    """
+    from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+
+    presenter = Prefetch2esPresenter(
+        input_path=(
+            Path(input_path)
+            if isinstance(input_path, str)
+            else [Path(path) for path in input_path]
+        ),
+        host=host,
+        port=int(port),
+        index=index,
+        scheme=scheme,
+        pipeline=pipeline,
+        login=login,
+        pwd=pwd,
+        is_quiet=True,
+        multiprocess=multiprocess or pool is not None,
+        chunk_size=int(chunk_size),
+        max_inflight=int(max_inflight),
+        timeline_mode=timeline_mode,
+        tags=tags,
+        bulk_threads=int(bulk_threads),
+        max_bytes=int(max_bytes),
+        state_file=state_file,
+        slim_timeline=slim_timeline,
+        files_index=files_index,
+        timeline_index=timeline_index,
+        bulk_output=bulk_output,
+        compression=compression,
+        shard_bytes=int(shard_bytes),
+        overwrite=overwrite,
+        stats_file=stats_file,
+        recursive=recursive,
+        read_ahead=int(read_ahead),
+        io_threads=int(io_threads),
+        parse_cache=int(parse_cache),
+        parse_cache_dir=parse_cache_dir,
+        parse_cache_bytes=int(parse_cache_bytes),
+        max_retries=int(max_retries),
+        retry_wait=float(retry_wait),
+        adaptive=adaptive,
+        target_latency=float(target_latency),
+        parse_chunk=parse_chunk_size(parse_chunk),
+        pool=pool,
+        executor=executor,
+        workers=int(workers),
+        index_template=index_template,
+        tune_index=tune_index,
+    )
+    if bulk_output:
+        return presenter.export_bulk_files()
+    return presenter.bulk_import()
+
+
+def prefetch2es_replay(
+    input_path: Union[str, List[str]],
+    host: str = "localhost",
+    port: int = 9200,
+    scheme: str = "http",
+    login: str = "",
+    pwd: str = "",
+    chunk_size: int = 500,
+    max_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    bulk_threads: int = 4,
+    max_retries: int = 3,
+    retry_wait: float = 1.0,
+    adaptive: bool = False,
+    target_latency: float = DEFAULT_TARGET_LATENCY,
+) -> None:
+    """Send _bulk NDJSON files written with bulk_output to Elasticsearch.
+
+    Args:
+        input_path (Union[str, List[str]]):
+            Bulk files or directories containing them.
+
+        bulk_threads (int, optional):
+            Number of bulk requests sent concurrently. Defaults to 4.
+
+        max_retries (int, optional):
+            Number of times a failed request, or documents rejected with
+            429/503, are sent again. Defaults to 3.
+
+        retry_wait (float, optional):
+            Seconds to wait before the first retry, doubled on each attempt,
+            with random jitter. Defaults to 1.0.
+
+    The other arguments are those of prefetch2es().
     """
+    from prefetch2es.presenters.Prefetch2esReplayPresenter import (
+        Prefetch2esReplayPresenter,
+    )
 
-    Prefetch2esPresenter(
-        input_path=Path(input_path),
+    Prefetch2esReplayPresenter(
+        input_path=(
+            [Path(input_path)]
+            if isinstance(input_path, str)
+            else [Path(path) for path in input_path]
+        ),
+        host=host,
+        port=int(port),
+        scheme=scheme,
+        login=login,
+        pwd=pwd,
+        is_quiet=True,
+        chunk_size=int(chunk_size),
+        max_bytes=int(max_bytes),
+        bulk_threads=int(bulk_threads),
+        max_retries=int(max_retries),
+        retry_wait=float(retry_wait),
+        adaptive=adaptive,
+        target_latency=float(target_latency),
+    ).replay()
+
+
+async def prefetch2es_async(
+    input_path: Union[str, List[str]],
+    host: str = "localhost",
+    port: int = 9200,
+    index: str = "prefetch2es",
+    scheme: str = "http",
+    pipeline: str = "",
+    login: str = "",
+    pwd: str = "",
+    multiprocess: bool = False,
+    chunk_size: int = 500,
+    timeline_mode: bool = False,
+    tags: str = "",
+    max_inflight: int = 0,
+    bulk_threads: int = 1,
+    queue_size: int = 4,
+    max_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    state_file: str = "",
+    slim_timeline: bool = False,
+    files_index: str = "",
+    timeline_index: str = "",
+    stats_file: str = "",
+    recursive: bool = False,
+    read_ahead: int = 0,
+    io_threads: int = DEFAULT_IO_THREADS,
+    parse_cache: int = 0,
+    parse_cache_dir: str = "",
+    parse_cache_bytes: int = DEFAULT_CACHE_BYTES,
+    max_retries: int = 3,
+    retry_wait: float = 1.0,
+    adaptive: bool = False,
+    target_latency: float = DEFAULT_TARGET_LATENCY,
+    parse_chunk: Union[int, str] = "auto",
+    executor: str = "",
+    workers: int = 0,
+    index_template: bool = False,
+    tune_index: bool = False,
+) -> dict:
+    """Fast import of Windows Prefetch into Elasticsearch from asyncio code.
+
+    Same arguments as prefetch2es(). Files are parsed in an executor and
+    batches are sent with AsyncElasticsearch, so the calling event loop is
+    never blocked. Requires the optional extra: pip install prefetch2es[async]
+
+    Args:
+        bulk_threads (int, optional):
+            Number of concurrent bulk sender tasks. Defaults to 1.
+
+        queue_size (int, optional):
+            Maximum number of parsed batches waiting to be sent. Defaults to 4.
+
+        state_file (str, optional):
+            SQLite manifest of ingested files, as in prefetch2es().
+
+    Returns:
+        dict: Run statistics, as returned by prefetch2es().
+    """
+    from prefetch2es.presenters.AsyncPrefetch2esPresenter import (
+        AsyncPrefetch2esPresenter,
+    )
+
+    return await AsyncPrefetch2esPresenter(
+        input_path=(
+            Path(input_path)
+            if isinstance(input_path, str)
+            else [Path(path) for path in input_path]
+        ),
         host=host,
         port=int(port),
         index=index,
@@ -75,9 +433,95 @@ def prefetch2es(
         is_quiet=True,
         multiprocess=multiprocess,
         chunk_size=int(chunk_size),
+        max_inflight=int(max_inflight),
         timeline_mode=timeline_mode,
         tags=tags,
-    ).bulk_import()
+        bulk_threads=int(bulk_threads),
+        queue_size=int(queue_size),
+        max_bytes=int(max_bytes),
+        state_file=state_file,
+        slim_timeline=slim_timeline,
+        files_index=files_index,
+        timeline_index=timeline_index,
+        stats_file=stats_file,
+        recursive=recursive,
+        read_ahead=int(read_ahead),
+        io_threads=int(io_threads),
+        parse_cache=int(parse_cache),
+        parse_cache_dir=parse_cache_dir,
+        parse_cache_bytes=int(parse_cache_bytes),
+        max_retries=int(max_retries),
+        retry_wait=float(retry_wait),
+        adaptive=adaptive,
+        target_latency=float(target_latency),
+        parse_chunk=parse_chunk_size(parse_chunk),
+        executor=executor,
+        workers=int(workers),
+        index_template=index_template,
+        tune_index=tune_index,
+    ).async_bulk_import()
+
+
+def iter_prefetch_records(
+    paths: Union[str, Iterable[str]],
+    timeline: bool = False,
+    tags: str = "",
+    workers: int = 1,
+    chunk_size: int = 500,
+    ordered: bool = True,
+    max_inflight: int = 0,
+    recursive: bool = False,
+    pool: Optional["WorkerPool"] = None,
+    executor: str = "",
+) -> Generator[dict, None, None]:
+    """Lazily iterate over the records of Windows Prefetch files.
+
+    Args:
+        paths (Union[str, Iterable[str]]): Prefetch files or directories.
+        timeline (bool): Yield timeline-formatted records.
+        tags (str): Additional tags for timeline records (comma-separated).
+        workers (int): Number of workers. Unless executor is given, 1 parses
+            in the calling thread and other values in worker processes;
+            0 uses one worker per CPU.
+        chunk_size (int): Number of files handed to a worker at a time.
+        ordered (bool): Yield records in input order. If False, the records
+            of each chunk are yielded as soon as a worker completes it.
+        max_inflight (int): Maximum number of chunks parsed ahead of the
+            consumer (0 = twice the number of workers).
+        recursive (bool): Also search subdirectories of directories.
+        pool (Optional[WorkerPool]): Worker pool parsing the files
+            in place of workers, e.g. shared by many calls.
+        executor (str): Backend parsing the files: "process", "thread" or
+            "inline" ("" = chosen from workers).
+            With a pool, it must be the executor of the pool or "inline".
+
+    Yields:
+        Generator[dict, None, None]: Prefetch records.
+
+    Note:
+        Stopping the iteration early (break, or closing the generator)
+        terminates the worker processes, except those of a pool.
+    """
+    from prefetch2es.models.Prefetch2es import Prefetch2es, get_chunk_processor
+
+    prefetch = Prefetch2es(
+        [Path(paths).resolve()]
+        if isinstance(paths, str)
+        else [Path(path).resolve() for path in paths],
+        recursive=recursive,
+        pool=pool,
+    )
+    for _, records in prefetch.gen_file_records(
+        get_chunk_processor(timeline_mode=timeline, tags=tags),
+        multiprocess=workers != 1 or pool is not None,
+        chunk_size=chunk_size,
+        max_inflight=max_inflight,
+        workers=max(0, workers),
+        ordered=ordered,
+        executor=executor,
+    ):
+        # Records travel from the workers as PrefetchRecord
+        yield from export_records(records)
 
 
 def prefetch2json(
@@ -86,6 +530,11 @@ def prefetch2json(
     chunk_size: int = 500,
     timeline_mode: bool = False,
     tags: str = "",
+    max_inflight: int = 0,
+    pool: Optional["WorkerPool"] = None,
+    executor: str = "",
+    workers: int = 0,
+    recursive: bool = False,
 ) -> List[dict]:
     """Convert Windows Prefetch to List[dict].
 
@@ -95,27 +544,30 @@ def prefetch2json(
         chunk_size (int): Size of the chunk to be processed for each process.
         timeline_mode (bool): Enable timeline analysis mode - creates specialized records.
         tags (str): Additional tags for timeline records (comma-separated).
+        max_inflight (int): Maximum number of chunks in flight in multiprocess mode.
+        pool (Optional[WorkerPool]): Worker pool parsing the files,
+            e.g. shared by many calls. Implies multiprocess.
+        executor (str): Backend parsing the files: "process", "thread" or
+            "inline" ("" = process with multiprocess, inline otherwise).
+            With a pool, it must be the executor of the pool or "inline".
+        workers (int): Number of worker processes or threads (0 = CPU count).
+        recursive (bool): Also search subdirectories of directories.
 
     Note:
         Since the content of the file is loaded into memory at once,
         it requires the same amount of memory as the file to be loaded.
+        Use iter_prefetch_records() to consume records as a stream.
     """
-    prefetch = Prefetch2es(Path(filepath).resolve())
-    if timeline_mode:
-        timeline_records: List[dict] = sum(
-            list(
-                prefetch.gen_timeline_records(
-                    multiprocess=multiprocess, chunk_size=chunk_size, tags=tags
-                )
-            ),
-            list(),
-        )
-        return timeline_records
-    else:
-        standard_records: List[dict] = sum(
-            list(
-                prefetch.gen_records(multiprocess=multiprocess, chunk_size=chunk_size)
-            ),
-            list(),
+    return list(
+        iter_prefetch_records(
+            filepath,
+            timeline=timeline_mode,
+            tags=tags,
+            workers=workers if multiprocess or executor else 1,
+            chunk_size=chunk_size,
+            max_inflight=max_inflight,
+            recursive=recursive,
+            pool=pool,
+            executor=executor,
         )
-        return standard_records
+    )
@@ -0,0 +1,233 @@
+# coding: utf-8
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Generator, Optional, Tuple
+
+# Archive modules are imported when an archive is found, like py7zr
+if TYPE_CHECKING:
+    import zipfile
+
+
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tar.xz",
+    ".7z",
+)
+
+# Separates the archive path from the member name in source_file
+MEMBER_SEPARATOR = "!"
+
+# Number of ZIP archives kept open by each process
+MAX_OPEN_ZIPS = 16
+
+# Open ZIP archives by path, least recently used first, with the
+# (st_mtime_ns, st_size) of the file they were opened from
+_zip_handles: "OrderedDict[str, Tuple[Tuple[int, int], zipfile.ZipFile]]" = (
+    OrderedDict()
+)
+_zip_lock = threading.Lock()
+
+
+def is_archive(path: Path) -> bool:
+    """Check whether a path has one of ARCHIVE_SUFFIXES, in any case.
+
+    Args:
+        path (Path): File path.
+
+    Returns:
+        bool: True for ZIP, TAR (optionally compressed) and 7z archives.
+    """
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_prefetch_member(name: str) -> bool:
+    """Check whether an archive member is a file of a Windows/Prefetch directory.
+
+    Collectors keep the layout of the source volume, so the directory is
+    matched anywhere in the member path (e.g.
+    C/Windows/Prefetch/CMD.EXE-D269B812.pf).
+
+    Args:
+        name (str): Member name, with / or \\ separators.
+
+    Returns:
+        bool: True for prefetch files of a Windows/Prefetch directory.
+    """
+    parts = name.replace("\\", "/").lower().split("/")
+    return (
+        len(parts) >= 3
+        and parts[-3] == "windows"
+        and parts[-2] == "prefetch"
+        and parts[-1].endswith(".pf")
+    )
+
+
+def _open_zip(archive: str) -> "zipfile.ZipFile":
+    import zipfile
+
+    # Kept open, so that every member of a chunk does not read the central
+    # directory again. An archive replaced on disk is opened again, and the
+    # handles evicted beyond MAX_OPEN_ZIPS are closed; members still being
+    # read keep their file open until they are done.
+    stat = os.stat(archive)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _zip_lock:
+        cached = _zip_handles.pop(archive, None)
+        if cached is not None and cached[0] == version:
+            _zip_handles[archive] = cached
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+        handle = zipfile.ZipFile(archive)
+        _zip_handles[archive] = (version, handle)
+        while len(_zip_handles) > MAX_OPEN_ZIPS:
+            _, (_, evicted) = _zip_handles.popitem(last=False)
+            evicted.close()
+        return handle
+
+
+def _import_py7zr():
+    try:
+        import py7zr
+        import py7zr.io
+    except ImportError as e:
+        raise ImportError(
+            "7z archives require the py7zr package (pip install prefetch2es[7z])"
+        ) from e
+    return py7zr
+
+
+class ArchiveMember(object):
+    """Prefetch file stored inside an archive.
+
+    Provides the parts of the Path interface used on prefetch files (open,
+    read_bytes, stat, resolve and str), so members go through the same
+    pipeline as files on disk. Members are picklable and read their bytes
+    in the worker that parses them: ZIP members are decompressed there and
+    uncompressed TAR members are read at their offset. Members of compressed
+    TAR and 7z archives, which can only be decompressed sequentially, carry
+    their bytes from discovery.
+    """
+
+    def __init__(
+        self,
+        archive: Path,
+        name: str,
+        data: Optional[bytes] = None,
+        offset: int = -1,
+        size: int = 0,
+    ) -> None:
+        self.archive = archive
+        self.name = name
+        self.data = data
+        self.offset = offset
+        self.size = size
+
+    def __str__(self) -> str:
+        return f"{self.archive}{MEMBER_SEPARATOR}{self.name}"
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember('{self}')"
+
+    def read_bytes(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        if self.offset >= 0:
+            with self.archive.open(mode="rb") as f:
+                f.seek(self.offset)
+                return f.read(self.size)
+        return _open_zip(str(self.archive)).read(self.name)
+
+    def open(self, mode: str = "rb") -> BinaryIO:
+        if mode != "rb":
+            raise ValueError(f"Archive members are read-only: {self}")
+        return io.BytesIO(self.read_bytes())
+
+    def stat(self) -> os.stat_result:
+        # Members change together with their archive
+        return self.archive.stat()
+
+    def resolve(self) -> "ArchiveMember":
+        return ArchiveMember(
+            self.archive.resolve(), self.name, self.data, self.offset, self.size
+        )
+
+
+def _iter_zip_members(archive: Path) -> Generator[ArchiveMember, None, None]:
+    import zipfile
+
+    with zipfile.ZipFile(archive) as z:
+        for info in z.infolist():
+            if not info.is_dir() and is_prefetch_member(info.filename):
+                yield ArchiveMember(archive, info.filename)
+
+
+def _iter_tar_members(archive: Path) -> Generator[ArchiveMember, None, None]:
+    import tarfile
+
+    if archive.name.lower().endswith(".tar"):
+        with tarfile.open(archive, mode="r:") as tar:
+            for info in tar:
+                if info.isfile() and is_prefetch_member(info.name):
+                    if info.issparse():
+                        data = tar.extractfile(info).read()  # type: ignore[union-attr]
+                        yield ArchiveMember(archive, info.name, data=data)
+                    else:
+                        yield ArchiveMember(
+                            archive,
+                            info.name,
+                            offset=info.offset_data,
+                            size=info.size,
+                        )
+    else:
+        with tarfile.open(archive, mode="r|*") as tar:
+            for info in tar:
+                if info.isfile() and is_prefetch_member(info.name):
+                    data = tar.extractfile(info).read()  # type: ignore[union-attr]
+                    yield ArchiveMember(archive, info.name, data=data)
+
+
+def _iter_7z_members(archive: Path) -> Generator[ArchiveMember, None, None]:
+    py7zr = _import_py7zr()
+    with py7zr.SevenZipFile(archive) as z:
+        entries = [
+            entry
+            for entry in z.list()
+            if not entry.is_directory and is_prefetch_member(entry.filename)
+        ]
+        if not entries:
+            return
+        factory = py7zr.io.BytesIOFactory(
+            max(entry.uncompressed for entry in entries) + 1
+        )
+        z.extract(targets=[entry.filename for entry in entries], factory=factory)
+    for entry in entries:
+        product = factory.get(entry.filename)
+        product.seek(0)
+        yield ArchiveMember(archive, entry.filename, data=product.read())
+
+
+def iter_archive_members(archive: Path) -> Generator[ArchiveMember, None, None]:
+    """Find the Windows/Prefetch files of an archive without extracting it.
+
+    Args:
+        archive (Path): ZIP, TAR (optionally gzip, bzip2 or xz compressed)
+            or 7z archive.
+
+    Yields:
+        Generator[ArchiveMember, None, None]: Prefetch members, in archive order.
+    """
+    name = archive.name.lower()
+    if name.endswith(".zip"):
+        yield from _iter_zip_members(archive)
+    elif name.endswith(".7z"):
+        yield from _iter_7z_members(archive)
+    else:
+        yield from _iter_tar_members(archive)
@@ -0,0 +1,194 @@
+# coding: utf-8
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from prefetch2es.models.BulkThrottle import BulkThrottle
+from prefetch2es.models.Options import DEFAULT_MAX_CHUNK_BYTES
+from prefetch2es.models.Prefetch2es import SerializedRecord, serialize_record
+from prefetch2es.models.ElasticsearchUtils import (
+    INGEST_SETTINGS,
+    calc_retry_wait,
+    gen_bulk_bodies,
+    get_explicit_settings,
+    is_retryable_error,
+    partition_bulk_response,
+)
+
+
+class AsyncElasticsearchUtils(object):
+    """asyncio counterpart of ElasticsearchUtils.
+
+    Requires the optional aiohttp transport (pip install prefetch2es[async]).
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        scheme: str,
+        login: str,
+        pwd: str,
+        connections: int = 10,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+        max_retries: int = 0,
+        retry_wait: float = 1.0,
+        throttle: Optional[BulkThrottle] = None,
+    ) -> None:
+        if login == "":
+            self.es = AsyncElasticsearch(
+                hosts=[f"{scheme}://{hostname}:{port}"],
+                verify_certs=False,
+                connections_per_node=connections,
+            )
+        else:
+            self.es = AsyncElasticsearch(
+                hosts=[f"{scheme}://{hostname}:{port}"],
+                verify_certs=False,
+                http_auth=(login, pwd),
+                connections_per_node=connections,
+            )
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+        self.retry_wait = retry_wait
+        self.throttle = throttle
+        self.retried_documents = 0
+        # Requests in flight, bounded by the concurrency of the throttle
+        self.inflight = 0
+        self.slots = asyncio.Condition()
+
+    async def bulk_serialized(
+        self, batches: List[Tuple[str, List[SerializedRecord]]], pipeline: str
+    ) -> tuple:
+        """Bulk indices pre-serialized documents without blocking the event loop.
+
+        Failed requests and rejected documents are retried as in
+        ElasticsearchUtils.bulk_body.
+
+        Args:
+            batches (List[Tuple[str, List[SerializedRecord]]]): Target index
+                and records as (_id, JSON bytes) of each batch.
+            pipeline (str): Target Elasticsearch Ingest Pipeline
+
+        Returns:
+            tuple: (success_count, failed_list) - Results of bulk indexing operation
+        """
+        total_success = 0
+        total_failed: List[dict] = []
+        for lines in gen_bulk_bodies(
+            batches, pipeline, self.chunk_size, self.max_chunk_bytes, self.throttle
+        ):
+            success, failed = await self.bulk_body(lines)
+            total_success += success
+            total_failed.extend(failed)
+        return (total_success, total_failed)
+
+    async def bulk_body(self, lines: List[bytes]) -> tuple:
+        """Send one bulk request body, see ElasticsearchUtils.bulk_body.
+
+        With a throttle, callers wait while its concurrency is reached.
+        """
+        async with self.slots:
+            await self.slots.wait_for(
+                lambda: self.throttle is None
+                or self.inflight < self.throttle.concurrency
+            )
+            self.inflight += 1
+        try:
+            return await self._bulk_body(lines)
+        finally:
+            async with self.slots:
+                self.inflight -= 1
+                self.slots.notify_all()
+
+    async def _bulk_body(self, lines: List[bytes]) -> tuple:
+        total_success = 0
+        total_failed: List[dict] = []
+        # Documents of lines, as rejected by the last answered attempt
+        rejected: List[dict] = []
+        answered = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(calc_retry_wait(attempt, self.retry_wait))
+            started = time.perf_counter()
+            try:
+                # NDJSON lines are sent as is by the client's serializer
+                response = await self.es.bulk(operations=lines)  # type: ignore[arg-type]
+            except Exception as e:
+                if self.throttle is not None:
+                    self.throttle.observe(time.perf_counter() - started, error=True)
+                if attempt < self.max_retries and is_retryable_error(e):
+                    continue
+                if not answered:
+                    raise Exception(f"Bulk indexing error: {e}") from e
+                total_failed.extend(rejected)
+                break
+            answered = True
+
+            success, failed, rejected, lines = partition_bulk_response(
+                response.body, lines
+            )
+            if self.throttle is not None:
+                self.throttle.observe(
+                    time.perf_counter() - started, rejected=len(rejected)
+                )
+            total_success += success
+            total_failed.extend(failed)
+            if not rejected:
+                break
+            if attempt == self.max_retries:
+                total_failed.extend(rejected)
+            else:
+                self.retried_documents += len(rejected)
+        return (total_success, total_failed)
+
+    async def bulk_indice(
+        self, records: List[dict], index_name: str, pipeline: str
+    ) -> tuple:
+        """Bulk indices the documents into Elasticsearch without blocking the event loop.
+
+        Args:
+            records (List[dict]): List of each records read from Prefetch files.
+            index_name (str): Target Elasticsearch Index.
+            pipeline (str): Target Elasticsearch Ingest Pipeline
+
+        Returns:
+            tuple: (success_count, failed_list) - Results of bulk indexing operation
+        """
+        return await self.bulk_serialized(
+            [(index_name, [serialize_record(record) for record in records])],
+            pipeline,
+        )
+
+    async def put_index_template(self, name: str, template: dict) -> None:
+        """Create or replace an index template, see ElasticsearchUtils."""
+        await self.es.indices.put_index_template(name=name, body=template)
+
+    async def tune_for_ingest(self, index_name: str) -> Dict[str, dict]:
+        """Apply INGEST_SETTINGS to an index, see ElasticsearchUtils."""
+        await self.es.options(ignore_status=400).indices.create(index=index_name)
+        response = await self.es.indices.get_settings(
+            index=index_name, name=list(INGEST_SETTINGS), flat_settings=True
+        )
+        previous = get_explicit_settings(response.body)
+        for concrete_index in previous:
+            await self.es.indices.put_settings(
+                index=concrete_index, settings=INGEST_SETTINGS
+            )
+        return previous
+
+    async def restore_settings(
+        self, index_name: str, settings: Dict[str, dict]
+    ) -> None:
+        """Restore the settings replaced by tune_for_ingest and refresh."""
+        for concrete_index, previous in settings.items():
+            await self.es.indices.put_settings(index=concrete_index, settings=previous)
+        await self.es.indices.refresh(index=index_name)
+
+    async def close(self) -> None:
+        """Close the underlying connections."""
+        await self.es.close()
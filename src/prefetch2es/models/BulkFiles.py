@@ -0,0 +1,143 @@
+# coding: utf-8
+from pathlib import Path
+from typing import BinaryIO, Generator, Iterable, List, Optional, Tuple, Union
+
+from prefetch2es.models.Compression import (
+    COMPRESSION_SUFFIXES,
+    open_reader,
+    open_writer,
+)
+from prefetch2es.models.Options import DEFAULT_SHARD_BYTES
+
+
+BULK_FILE_SUFFIX = ".ndjson"
+
+
+class BulkFileWriter(object):
+    """Write ready-to-send _bulk request bodies into sharded NDJSON files.
+
+    Files are named <prefix>-<number>.ndjson[.gz|.zst]. A new file is started
+    once the current one holds shard_bytes uncompressed bytes; request bodies
+    are never split across files.
+
+    The directory must not already hold bulk files, which replaying it would
+    send along with the new ones, unless overwrite is set: they are then
+    deleted first.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        prefix: str,
+        compression: str = "",
+        shard_bytes: int = DEFAULT_SHARD_BYTES,
+        overwrite: bool = False,
+    ) -> None:
+        """Initialize BulkFileWriter.
+
+        Args:
+            directory (Union[str, Path]): Output directory, created if needed.
+            prefix (str): File name prefix, e.g. the target index.
+            compression (str): One of COMPRESSIONS.
+            shard_bytes (int): Uncompressed size after which a file is closed.
+            overwrite (bool): Delete the bulk files already in directory.
+
+        Raises:
+            FileExistsError: If the directory holds bulk files and overwrite
+                is not set.
+        """
+        self.directory = Path(directory)
+        # e.g. the higher-numbered shards of a larger earlier export
+        existing = list_bulk_files([self.directory]) if self.directory.is_dir() else []
+        if existing and not overwrite:
+            raise FileExistsError(
+                f"{self.directory} already holds bulk files ({existing[0].name},"
+                " ...); remove them or overwrite them"
+            )
+        for path in existing:
+            path.unlink()
+        self.prefix = prefix
+        self.compression = compression
+        self.shard_bytes = shard_bytes
+        self.paths: List[Path] = []
+        self.f: Optional[BinaryIO] = None
+        self.written = 0
+
+    def __enter__(self) -> "BulkFileWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _rotate(self) -> None:
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / (
+            f"{self.prefix}-{len(self.paths):05d}{BULK_FILE_SUFFIX}"
+            f"{COMPRESSION_SUFFIXES[self.compression]}"
+        )
+        self.f = open_writer(path, self.compression)
+        self.paths.append(path)
+        self.written = 0
+
+    def write(self, lines: List[bytes]) -> None:
+        """Write a _bulk request body.
+
+        Args:
+            lines (List[bytes]): NDJSON lines (action, source, ...).
+        """
+        if self.f is None or self.written >= self.shard_bytes:
+            self._rotate()
+        data = b"\n".join(lines) + b"\n"
+        self.f.write(data)  # type: ignore[union-attr]
+        self.written += len(data)
+
+    def close(self) -> None:
+        """Close the current file."""
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def list_bulk_files(paths: Iterable[Union[str, Path]]) -> List[Path]:
+    """Get bulk files from files and directories.
+
+    Args:
+        paths (Iterable[Union[str, Path]]): Bulk files or directories of them.
+
+    Returns:
+        List[Path]: Bulk files, sorted by name within each directory.
+    """
+    bulk_files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            bulk_files.extend(sorted(path.glob(f"*{BULK_FILE_SUFFIX}*")))
+        elif path.is_file():
+            bulk_files.append(path)
+        else:
+            raise ValueError(f"Invalid path: {path}")
+    return bulk_files
+
+
+def read_bulk_files(
+    paths: Iterable[Path],
+) -> Generator[Tuple[bytes, bytes], None, None]:
+    """Read documents back from bulk files.
+
+    Args:
+        paths (Iterable[Path]): Bulk files written by BulkFileWriter.
+
+    Yields:
+        Generator[Tuple[bytes, bytes], None, None]: (action, source) lines
+            without the trailing newline.
+    """
+    for path in paths:
+        with open_reader(path) as f:
+            lines = (line.rstrip(b"\r\n") for line in f)
+            for action in lines:
+                if not action:
+                    continue
+                source = next(lines, b"")
+                if not source:
+                    raise ValueError(f"Truncated bulk file: {path}")
+                yield action, source
@@ -0,0 +1,74 @@
+# coding: utf-8
+import threading
+import time
+
+from prefetch2es.models.Options import DEFAULT_TARGET_LATENCY
+
+# Lower bound of the adaptive batch size
+DEFAULT_MIN_BATCH_SIZE = 10
+
+
+class BulkThrottle(object):
+    """Adapt the size and concurrency of bulk requests to cluster pressure.
+
+    Additive increase, multiplicative decrease: documents rejected with
+    429/503 or failed requests halve the number of requests in flight (then
+    the batch size once a single request is left), and requests slower than
+    target_latency shrink the batch size. Fast requests without rejections
+    grow the concurrency back first, then the batch size, up to the
+    configured maximums the throttle starts from.
+
+    Decreases are applied at most once per target_latency, so the requests
+    already in flight when the cluster pushes back count as a single signal.
+    Methods may be called from several threads.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_concurrency: int,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+    ) -> None:
+        self.max_batch_size = max(1, max_batch_size)
+        self.min_batch_size = max(1, min(min_batch_size, self.max_batch_size))
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency
+        self.batch_size = self.max_batch_size
+        self.concurrency = self.max_concurrency
+        self.decreases = 0
+        self.last_decrease = float("-inf")
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, rejected: int = 0, error: bool = False) -> None:
+        """Adjust the limits after a bulk request.
+
+        Args:
+            seconds (float): Latency of the request.
+            rejected (int): Number of documents rejected with 429/503.
+            error (bool): The request failed as a whole.
+        """
+        with self.lock:
+            if error or rejected:
+                self._decrease(halve_concurrency=True)
+            elif seconds > self.target_latency:
+                self._decrease(halve_concurrency=False)
+            elif seconds <= self.target_latency / 2:
+                if self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                else:
+                    self.batch_size = min(
+                        self.max_batch_size,
+                        self.batch_size + max(1, self.max_batch_size // 10),
+                    )
+
+    def _decrease(self, halve_concurrency: bool) -> None:
+        now = time.monotonic()
+        if now - self.last_decrease < self.target_latency:
+            return
+        self.last_decrease = now
+        self.decreases += 1
+        if halve_concurrency and self.concurrency > 1:
+            self.concurrency = max(1, self.concurrency // 2)
+        else:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
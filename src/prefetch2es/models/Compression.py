@@ -0,0 +1,64 @@
+# coding: utf-8
+import gzip
+import io
+from pathlib import Path
+from typing import BinaryIO
+
+from prefetch2es.models.Options import COMPRESSIONS
+
+COMPRESSION_SUFFIXES = {"": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd compression requires the zstandard package "
+            "(pip install prefetch2es[zstd])"
+        ) from e
+    return zstandard
+
+
+def open_writer(path: Path, compression: str = "") -> BinaryIO:
+    """Open a file for writing, compressing while streaming.
+
+    Args:
+        path (Path): Output file path.
+        compression (str): One of COMPRESSIONS.
+
+    Returns:
+        BinaryIO: Writable binary stream.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Invalid compression: {compression}")
+
+    if compression == "gzip":
+        return gzip.open(path, mode="wb")  # type: ignore[return-value]
+    elif compression == "zstd":
+        return _import_zstandard().ZstdCompressor().stream_writer(
+            path.open(mode="wb")
+        )
+    else:
+        return path.open(mode="wb")
+
+
+def open_reader(path: Path) -> BinaryIO:
+    """Open a file for reading, decompressing according to its suffix.
+
+    Args:
+        path (Path): Input file path (.gz, .zst or uncompressed).
+
+    Returns:
+        BinaryIO: Readable binary stream supporting line iteration.
+    """
+    if path.suffix == COMPRESSION_SUFFIXES["gzip"]:
+        return gzip.open(path, mode="rb")  # type: ignore[return-value]
+    elif path.suffix == COMPRESSION_SUFFIXES["zstd"]:
+        return io.BufferedReader(  # type: ignore[return-value]
+            _import_zstandard().ZstdDecompressor().stream_reader(
+                path.open(mode="rb"), closefd=True
+            )
+        )
+    else:
+        return path.open(mode="rb")
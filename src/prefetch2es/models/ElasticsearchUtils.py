@@ -1,27 +1,363 @@
 # coding: utf-8
-from typing import List
-from hashlib import sha1
-
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Generator, Iterable, List, Optional, Tuple
 
 import orjson
 
+from prefetch2es.models.BulkThrottle import BulkThrottle
+from prefetch2es.models.Options import DEFAULT_MAX_CHUNK_BYTES
+from prefetch2es.models.Prefetch2es import SerializedRecord, serialize_record
+
+
+# Statuses of a _bulk request or of its documents worth sending again
+RETRY_STATUSES = (429, 503)
+
+# Upper bound of the wait before a retry
+DEFAULT_MAX_RETRY_WAIT = 60.0
+
+# Index settings applied for the duration of an import: no periodic refresh
+# and no replica to write to, restored once all documents are sent
+INGEST_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": 0}
+
+
+def calc_hash(record: dict) -> str:
+    """Calculate hash value from record.
+
+    Args:
+        record (dict): Prefetch record.
+
+    Returns:
+        str: Hash value
+    """
+    return serialize_record(record)[0]
+
+
+def calc_retry_wait(
+    attempt: int, retry_wait: float, max_wait: float = DEFAULT_MAX_RETRY_WAIT
+) -> float:
+    """Get the wait before a retry: exponential backoff with jitter.
+
+    Half of the wait is random, so that requests rejected together do not
+    hit the cluster again in lockstep.
+
+    Args:
+        attempt (int): Retry number, starting at 1.
+        retry_wait (float): Wait before the first retry, doubled on each one.
+        max_wait (float): Upper bound of the exponential wait.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    wait = min(max_wait, retry_wait * 2 ** (attempt - 1))
+    return wait / 2 + random.uniform(0, wait / 2)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Check whether a failed _bulk request is worth sending again.
+
+    Connection errors, timeouts and RETRY_STATUSES responses are transient;
+    other errors, e.g. 400 (malformed body), 401 (bad credentials) or 413
+    (body too large), fail the same way on every attempt.
+
+    Args:
+        error (BaseException): Exception raised by the client.
+
+    Returns:
+        bool: True for transient errors.
+    """
+    # Loaded with the client, once a request has failed
+    import elastic_transport
+
+    if isinstance(
+        error,
+        (
+            elastic_transport.ConnectionError,
+            elastic_transport.ConnectionTimeout,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return True
+    return getattr(error, "status_code", None) in RETRY_STATUSES
+
+
+def build_action_line(doc_id: str, index_name: str, pipeline: str) -> bytes:
+    """Build the NDJSON action line of a document.
+
+    Args:
+        doc_id (str): Document _id.
+        index_name (str): Target Elasticsearch Index.
+        pipeline (str): Target Elasticsearch Ingest Pipeline
+
+    Returns:
+        bytes: Action line without the trailing newline.
+    """
+    meta = {"_id": doc_id, "_index": index_name}
+    if pipeline != "":
+        meta["pipeline"] = pipeline
+    return orjson.dumps({"index": meta})
+
+
+class BulkBodyBuilder(object):
+    """Group (action, source) lines into _bulk request bodies as they come.
+
+    A body is complete as soon as it holds chunk_size documents or adding
+    the next one would exceed max_chunk_bytes. Unlike chunk_bulk_lines,
+    documents are added one at a time, e.g. as parse chunks arrive in an
+    event loop.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        max_chunk_bytes: int,
+        throttle: Optional[BulkThrottle] = None,
+    ) -> None:
+        """
+        Args:
+            chunk_size (int): Maximum number of documents per request.
+            max_chunk_bytes (int): Maximum payload size per request in bytes.
+            throttle (Optional[BulkThrottle]): Use its current batch size in
+                place of chunk_size for each body.
+        """
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.throttle = throttle
+        self.lines: List[bytes] = []
+        self.size = 0
+        self.limit = throttle.batch_size if throttle is not None else chunk_size
+
+    def add(self, action: bytes, source: bytes) -> Optional[List[bytes]]:
+        """Add a document.
+
+        Returns:
+            Optional[List[bytes]]: NDJSON lines of the body completed by the
+                document, which starts the next one; None otherwise.
+        """
+        # +2 to account for the trailing new line characters
+        doc_size = len(action) + len(source) + 2
+        body = None
+        if self.lines and (
+            len(self.lines) >= self.limit * 2
+            or self.size + doc_size > self.max_chunk_bytes
+        ):
+            body = self.flush()
+        self.lines.append(action)
+        self.lines.append(source)
+        self.size += doc_size
+        return body
+
+    def flush(self) -> Optional[List[bytes]]:
+        """Complete the current body.
+
+        Returns:
+            Optional[List[bytes]]: NDJSON lines of the body, None if empty.
+        """
+        if not self.lines:
+            return None
+        body = self.lines
+        self.lines = []
+        self.size = 0
+        if self.throttle is not None:
+            self.limit = self.throttle.batch_size
+        return body
+
+
+def chunk_bulk_lines(
+    documents: Iterable[Tuple[bytes, bytes]],
+    chunk_size: int,
+    max_chunk_bytes: int,
+    throttle: Optional[BulkThrottle] = None,
+) -> Generator[List[bytes], None, None]:
+    """Group (action, source) lines into _bulk request bodies.
+
+    A body is flushed as soon as it holds chunk_size documents or adding the
+    next one would exceed max_chunk_bytes.
+
+    Args:
+        documents (Iterable[Tuple[bytes, bytes]]): Action and source lines.
+        chunk_size (int): Maximum number of documents per request.
+        max_chunk_bytes (int): Maximum payload size per request in bytes.
+        throttle (Optional[BulkThrottle]): Use its current batch size in
+            place of chunk_size for each body.
+
+    Yields:
+        Generator[List[bytes], None, None]: NDJSON lines (action, source, ...).
+    """
+    builder = BulkBodyBuilder(chunk_size, max_chunk_bytes, throttle)
+    for action, source in documents:
+        body = builder.add(action, source)
+        if body is not None:
+            yield body
+
+    body = builder.flush()
+    if body is not None:
+        yield body
+
+
+def gen_bulk_documents(
+    batches: Iterable[Tuple[str, List[SerializedRecord]]], pipeline: str
+) -> Generator[Tuple[bytes, bytes], None, None]:
+    """Build the action line of pre-serialized records.
+
+    Args:
+        batches (Iterable[Tuple[str, List[SerializedRecord]]]): Target index
+            and records as (_id, JSON bytes) of each batch.
+        pipeline (str): Target Elasticsearch Ingest Pipeline
+
+    Yields:
+        Generator[Tuple[bytes, bytes], None, None]: Action and source lines.
+    """
+    for index_name, records in batches:
+        for doc_id, source in records:
+            yield build_action_line(doc_id, index_name, pipeline), source
+
+
+def gen_bulk_bodies(
+    batches: Iterable[Tuple[str, List[SerializedRecord]]],
+    pipeline: str,
+    chunk_size: int,
+    max_chunk_bytes: int,
+    throttle: Optional[BulkThrottle] = None,
+) -> Generator[List[bytes], None, None]:
+    """Assemble pre-serialized records into _bulk request bodies.
+
+    A body is flushed as soon as it holds chunk_size documents or adding the
+    next one would exceed max_chunk_bytes, independently of how the records
+    were chunked by the parser. A body may mix documents of several indices.
+
+    Args:
+        batches (Iterable[Tuple[str, List[SerializedRecord]]]): Target index
+            and records as (_id, JSON bytes) of each batch.
+        pipeline (str): Target Elasticsearch Ingest Pipeline
+        chunk_size (int): Maximum number of documents per request.
+        max_chunk_bytes (int): Maximum payload size per request in bytes.
+        throttle (Optional[BulkThrottle]): Adaptive batch size, see
+            chunk_bulk_lines.
+
+    Yields:
+        Generator[List[bytes], None, None]: NDJSON lines (action, source, ...).
+    """
+    yield from chunk_bulk_lines(
+        gen_bulk_documents(batches, pipeline), chunk_size, max_chunk_bytes, throttle
+    )
+
+
+def get_explicit_settings(response: dict) -> Dict[str, dict]:
+    """Get the current value of each INGEST_SETTINGS setting of each index.
+
+    The response is keyed by concrete index, also when the settings were
+    requested through an alias or a wildcard pattern.
+
+    Args:
+        response (dict): GET <index>/_settings response with flat settings.
+
+    Returns:
+        Dict[str, dict]: Flat setting name to value of each concrete index,
+            None for settings left to their default, so that putting it back
+            resets them.
+    """
+    return {
+        index_name: {
+            name: data.get("settings", {}).get(name) for name in INGEST_SETTINGS
+        }
+        for index_name, data in response.items()
+    }
+
+
+def parse_bulk_response(response: dict) -> tuple:
+    """Count per-document results of a _bulk response.
+
+    Args:
+        response (dict): _bulk response body.
+
+    Returns:
+        tuple: (success_count, failed_list) - Results of bulk indexing operation
+    """
+    success = 0
+    failed = []
+    for item in response.get("items", []):
+        op_type, result = next(iter(item.items()))
+        if 200 <= result.get("status", 500) < 300:
+            success += 1
+        else:
+            failed.append({op_type: result})
+    return (success, failed)
+
+
+def partition_bulk_response(response: dict, lines: List[bytes]) -> tuple:
+    """Split a _bulk response into indexed, failed and retryable documents.
+
+    Items are matched to documents by position, so lines must be the body
+    the response answers.
+
+    Args:
+        response (dict): _bulk response body.
+        lines (List[bytes]): NDJSON lines of the request.
+
+    Returns:
+        tuple: (success_count, failed_list, rejected_list, rejected_lines)
+            where rejected documents (RETRY_STATUSES) can be sent again.
+    """
+    success = 0
+    failed = []
+    rejected = []
+    rejected_lines: List[bytes] = []
+    for i, item in enumerate(response.get("items", [])):
+        op_type, result = next(iter(item.items()))
+        status = result.get("status", 500)
+        if 200 <= status < 300:
+            success += 1
+        elif status in RETRY_STATUSES:
+            rejected.append({op_type: result})
+            rejected_lines.extend(lines[i * 2 : i * 2 + 2])
+        else:
+            failed.append({op_type: result})
+    return (success, failed, rejected, rejected_lines)
+
 
 class ElasticsearchUtils(object):
     def __init__(
-        self, hostname: str, port: int, scheme: str, login: str, pwd: str
+        self,
+        hostname: str,
+        port: int,
+        scheme: str,
+        login: str,
+        pwd: str,
+        connections: int = 10,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+        max_retries: int = 0,
+        retry_wait: float = 1.0,
+        throttle: Optional[BulkThrottle] = None,
     ) -> None:
+        # The client stack is only loaded by code sending to Elasticsearch
+        from elasticsearch import Elasticsearch
+
         if login == "":
             self.es = Elasticsearch(
-                hosts=[f"{scheme}://{hostname}:{port}"], verify_certs=False
+                hosts=[f"{scheme}://{hostname}:{port}"],
+                verify_certs=False,
+                connections_per_node=connections,
             )
         else:
             self.es = Elasticsearch(
                 hosts=[f"{scheme}://{hostname}:{port}"],
                 verify_certs=False,
                 http_auth=(login, pwd),
+                connections_per_node=connections,
             )
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+        self.retry_wait = retry_wait
+        self.throttle = throttle
+        self.retried_documents = 0
+        self.lock = threading.Lock()
 
     def calc_hash(self, record: dict) -> str:
         """Calculate hash value from record.
@@ -32,7 +368,136 @@ class ElasticsearchUtils(object):
         Returns:
             str: Hash value
         """
-        return sha1(orjson.dumps(record, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return calc_hash(record)
+
+    def gen_bulk_batches(
+        self,
+        batches: Iterable[Tuple[str, List[SerializedRecord]]],
+        pipeline: str,
+    ) -> Generator[List[bytes], None, None]:
+        """Assemble pre-serialized records into _bulk request bodies.
+
+        Args:
+            batches (Iterable[Tuple[str, List[SerializedRecord]]]): Target
+                index and records as (_id, JSON bytes) of each batch.
+            pipeline (str): Target Elasticsearch Ingest Pipeline
+
+        Yields:
+            Generator[List[bytes], None, None]: NDJSON lines of each request,
+                bounded by chunk_size documents and max_chunk_bytes.
+        """
+        yield from gen_bulk_bodies(
+            batches, pipeline, self.chunk_size, self.max_chunk_bytes, self.throttle
+        )
+
+    def bulk_body(self, lines: List[bytes]) -> tuple:
+        """Send an assembled _bulk request body to Elasticsearch.
+
+        With max_retries, a request failing with a transient error (see
+        is_retryable_error) is sent again and documents rejected with a
+        RETRY_STATUSES status are sent again on their own, waiting
+        calc_retry_wait() seconds. With a throttle, the latency and
+        rejections of every attempt adjust its limits.
+
+        Args:
+            lines (List[bytes]): NDJSON lines built by gen_bulk_batches.
+
+        Returns:
+            tuple: (success_count, failed_list) - Results of bulk indexing
+                operation. If resending rejected documents fails, they are
+                reported as failed along with the results of the earlier
+                attempts.
+
+        Raises:
+            Exception: No attempt was answered.
+        """
+        total_success = 0
+        total_failed: List[dict] = []
+        # Documents of lines, as rejected by the last answered attempt
+        rejected: List[dict] = []
+        answered = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(calc_retry_wait(attempt, self.retry_wait))
+            started = time.perf_counter()
+            try:
+                # NDJSON lines are sent as is by the client's serializer
+                response = self.es.bulk(operations=lines)  # type: ignore[arg-type]
+            except Exception as e:
+                if self.throttle is not None:
+                    self.throttle.observe(time.perf_counter() - started, error=True)
+                if attempt < self.max_retries and is_retryable_error(e):
+                    continue
+                if not answered:
+                    raise Exception(f"Bulk indexing error: {e}") from e
+                total_failed.extend(rejected)
+                break
+            answered = True
+
+            success, failed, rejected, lines = partition_bulk_response(
+                response.body, lines
+            )
+            if self.throttle is not None:
+                self.throttle.observe(
+                    time.perf_counter() - started, rejected=len(rejected)
+                )
+            total_success += success
+            total_failed.extend(failed)
+            if not rejected:
+                break
+            if attempt == self.max_retries:
+                total_failed.extend(rejected)
+            else:
+                with self.lock:
+                    self.retried_documents += len(rejected)
+        return (total_success, total_failed)
+
+    def put_index_template(self, name: str, template: dict) -> None:
+        """Create or replace an index template.
+
+        Args:
+            name (str): Template name.
+            template (dict): Template body, see build_index_template.
+        """
+        self.es.indices.put_index_template(name=name, body=template)
+
+    def tune_for_ingest(self, index_name: str) -> Dict[str, dict]:
+        """Apply INGEST_SETTINGS to an index, creating it if needed.
+
+        An alias or a wildcard pattern is resolved to its concrete indices,
+        whose settings are saved and changed one by one, as they may differ.
+
+        Args:
+            index_name (str): Target Elasticsearch Index, alias or pattern.
+
+        Returns:
+            Dict[str, dict]: Previous settings of each concrete index, to be
+                passed to restore_settings.
+        """
+        # Created here so that the settings can be changed before the first
+        # document; an existing index, an alias or a pattern answers 400 and
+        # is left as is
+        self.es.options(ignore_status=400).indices.create(index=index_name)
+        response = self.es.indices.get_settings(
+            index=index_name, name=list(INGEST_SETTINGS), flat_settings=True
+        )
+        previous = get_explicit_settings(response.body)
+        for concrete_index in previous:
+            self.es.indices.put_settings(
+                index=concrete_index, settings=INGEST_SETTINGS
+            )
+        return previous
+
+    def restore_settings(self, index_name: str, settings: Dict[str, dict]) -> None:
+        """Restore the settings replaced by tune_for_ingest and refresh.
+
+        Args:
+            index_name (str): Target Elasticsearch Index, alias or pattern.
+            settings (Dict[str, dict]): Settings returned by tune_for_ingest.
+        """
+        for concrete_index, previous in settings.items():
+            self.es.indices.put_settings(index=concrete_index, settings=previous)
+        self.es.indices.refresh(index=index_name)
 
     def bulk_indice(self, records: List[dict], index_name: str, pipeline: str) -> tuple:
         """Bulk indices the documents into Elasticsearch.
@@ -45,22 +510,51 @@ class ElasticsearchUtils(object):
         Returns:
             tuple: (success_count, failed_list) - Results of bulk indexing operation
         """
-        events = []
-        for record in records:
-            event = {
-                "_id": self.calc_hash(record),
-                "_index": index_name,
-                "_source": record,
-            }
-            if pipeline != "":
-                event["pipeline"] = pipeline
-            events.append(event)
-
-        # Perform bulk indexing and return results
-        try:
-            success, failed = bulk(
-                self.es, events, raise_on_error=False, stats_only=False
-            )
-            return (success, failed)
-        except Exception as e:
-            raise Exception(f"Bulk indexing error: {e}") from e
+        total_success = 0
+        total_failed: List[dict] = []
+        serialized = [serialize_record(record) for record in records]
+        for lines in self.gen_bulk_batches([(index_name, serialized)], pipeline):
+            success, failed = self.bulk_body(lines)
+            total_success += success
+            total_failed.extend(failed)
+        return (total_success, total_failed)
+
+    def _get_concurrency(self, thread_count: int) -> int:
+        if self.throttle is None:
+            return thread_count
+        return min(thread_count, self.throttle.concurrency)
+
+    def bulk_indice_concurrent(
+        self,
+        batches: Iterable[List[bytes]],
+        thread_count: int,
+        send: Optional[Callable[[List[bytes]], tuple]] = None,
+    ) -> Generator[Future, None, None]:
+        """Send _bulk request bodies with several requests in flight.
+
+        Up to thread_count bulk_body calls run at the same time in a thread
+        pool, or fewer while a throttle has lowered its concurrency. Futures
+        are yielded in submission order; calling result() on
+        each returns the same (success_count, failed_list) tuple as
+        bulk_body, or raises its exception.
+
+        Args:
+            batches (Iterable[List[bytes]]): NDJSON lines of each request.
+            thread_count (int): Maximum number of concurrent bulk requests.
+            send (Optional[Callable[[List[bytes]], tuple]]): Function sending
+                a request body in place of bulk_body, e.g. to wrap it.
+
+        Yields:
+            Generator[Future, None, None]: Future of each bulk request.
+        """
+        thread_count = max(1, thread_count)
+        send = send or self.bulk_body
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            pending: Deque[Future] = deque()
+            for lines in batches:
+                pending.append(executor.submit(send, lines))
+                while len(pending) >= self._get_concurrency(thread_count):
+                    yield pending.popleft()
+
+            while pending:
+                yield pending.popleft()
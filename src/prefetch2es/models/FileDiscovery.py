@@ -0,0 +1,148 @@
+# coding: utf-8
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Generator, Iterable, List, Set, Tuple, cast
+
+from prefetch2es.models.Archives import is_archive, iter_archive_members
+
+
+PREFETCH_SUFFIX = ".pf"
+
+
+def is_prefetch_name(name: str) -> bool:
+    """Check whether a file name has the .pf suffix, in any case.
+
+    Args:
+        name (str): File name.
+
+    Returns:
+        bool: True for prefetch file names (e.g. CMD.EXE-D269B812.PF).
+    """
+    return name[-3:].lower() == PREFETCH_SUFFIX
+
+
+def _iter_directory(
+    directory: str, subdirectories: List[str]
+) -> Generator[str, None, None]:
+    # Yield the prefetch files of a directory, appending its subdirectories
+    # (symbolic links to directories are not followed). Like os.walk,
+    # directories that cannot be listed, e.g. without permission or removed
+    # meanwhile, are skipped instead of aborting the whole walk.
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif is_prefetch_name(entry.name) and entry.is_file():
+                    yield entry.path
+    except OSError:
+        return
+
+
+def scan_directory(directory: str) -> Tuple[List[str], List[str]]:
+    """List the prefetch files and subdirectories of a directory.
+
+    Args:
+        directory (str): Directory path.
+
+    Returns:
+        Tuple[List[str], List[str]]: Prefetch file paths and subdirectory
+            paths, both empty if the directory cannot be listed. Symbolic
+            links to directories are not followed.
+    """
+    subdirectories: List[str] = []
+    filepaths = list(_iter_directory(directory, subdirectories))
+    return filepaths, subdirectories
+
+
+def walk_prefetch_files(
+    directory: str, recursive: bool = False
+) -> Generator[Path, None, None]:
+    """Stream the prefetch files of a directory while scanning it.
+
+    Args:
+        directory (str): Directory path.
+        recursive (bool): Also walk subdirectories.
+
+    Yields:
+        Generator[Path, None, None]: Prefetch file paths, as soon as each
+            directory entry is read. Directories that cannot be listed are
+            skipped.
+    """
+    pending = [directory]
+    while pending:
+        subdirectories: List[str] = []
+        for filepath in _iter_directory(pending.pop(), subdirectories):
+            yield Path(filepath)
+        if recursive:
+            pending.extend(reversed(subdirectories))
+
+
+def walk_prefetch_files_parallel(
+    directory: str, threads: int
+) -> Generator[Path, None, None]:
+    """Recursively stream prefetch files, scanning directories in parallel.
+
+    Each directory is listed by a thread pool as soon as it is found, which
+    hides the per-directory round trips of network filesystems. Files are
+    yielded in the order their directories finish scanning, and directories
+    that cannot be listed are skipped.
+
+    Args:
+        directory (str): Directory path.
+        threads (int): Number of directories scanned concurrently.
+
+    Yields:
+        Generator[Path, None, None]: Prefetch file paths.
+    """
+    executor = ThreadPoolExecutor(max_workers=threads)
+    try:
+        pending: Set[Future] = {executor.submit(scan_directory, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                filepaths, subdirectories = future.result()
+                pending.update(
+                    executor.submit(scan_directory, subdirectory)
+                    for subdirectory in subdirectories
+                )
+                for filepath in filepaths:
+                    yield Path(filepath)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_prefetch_files(
+    paths: Iterable[Path], recursive: bool = False, threads: int = 1
+) -> Generator[Path, None, None]:
+    """Stream prefetch files from files and directories.
+
+    Files given explicitly are yielded as is, whatever their suffix, except
+    archives (see ARCHIVE_SUFFIXES) whose Windows/Prefetch files are yielded
+    as ArchiveMember, without extracting them.
+
+    Args:
+        paths (Iterable[Path]): Prefetch files or directories.
+        recursive (bool): Also walk subdirectories.
+        threads (int): Number of directories scanned concurrently when
+            walking recursively.
+
+    Yields:
+        Generator[Path, None, None]: Prefetch file paths.
+    """
+    for path in paths:
+        if path.is_file():
+            if is_archive(path):
+                # ArchiveMember provides the parts of Path used on prefetch files
+                for member in iter_archive_members(path):
+                    yield cast(Path, member)
+            else:
+                yield path
+        elif path.is_dir():
+            if recursive and threads > 1:
+                yield from walk_prefetch_files_parallel(str(path), threads)
+            else:
+                yield from walk_prefetch_files(str(path), recursive)
+        else:
+            raise ValueError(f"Invalid path: {path}")
@@ -0,0 +1,136 @@
+# coding: utf-8
+from prefetch2es.models.Prefetch2es import RECORD_FILE, RECORD_STANDARD, RECORD_TIMELINE
+
+
+# Priority of the installed templates, above the built-in ones (100)
+TEMPLATE_PRIORITY = 200
+
+# Longest indexed path; the keyword of a longer one would exceed Lucene's
+# 32766 bytes term limit for 4-byte UTF-8 characters
+MAX_KEYWORD_LENGTH = 8191
+
+KEYWORD = {"type": "keyword", "ignore_above": MAX_KEYWORD_LENGTH}
+DATE = {"type": "date"}
+LONG = {"type": "long"}
+INTEGER = {"type": "integer"}
+
+METRICS = {
+    "properties": {
+        "filename": KEYWORD,
+        "file_reference": KEYWORD,
+    }
+}
+
+VOLUMES = {
+    "properties": {
+        "path": KEYWORD,
+        "creation_time": DATE,
+        "serial_number": KEYWORD,
+    }
+}
+
+EVENT = {
+    "properties": {
+        "action": KEYWORD,
+        "category": KEYWORD,
+        "type": KEYWORD,
+        "kind": KEYWORD,
+        "provider": KEYWORD,
+        "module": KEYWORD,
+        "dataset": KEYWORD,
+    }
+}
+
+# windows.prefetch of timeline events, slim events and companion file records
+WINDOWS = {
+    "properties": {
+        "prefetch": {
+            "properties": {
+                "exec_count": LONG,
+                "hash": {"properties": {"prefetch": KEYWORD}},
+                "format_version": INTEGER,
+                "file_id": KEYWORD,
+                "last_exec_times": DATE,
+                "volumes": VOLUMES,
+                "metrics": METRICS,
+            }
+        }
+    }
+}
+
+LOG = {"properties": {"file": {"properties": {"path": KEYWORD}}}}
+
+# Explicit mappings of each record kind
+PROPERTIES = {
+    RECORD_STANDARD: {
+        "name": KEYWORD,
+        "filenames": KEYWORD,
+        "exec_count": LONG,
+        "last_exec_times": DATE,
+        "format_version": INTEGER,
+        "prefetch_hash": KEYWORD,
+        "number_of_volumes": INTEGER,
+        "number_of_filenames": INTEGER,
+        "number_of_file_metrics_entries": INTEGER,
+        "metrics": METRICS,
+        "volumes": VOLUMES,
+        "source_file": KEYWORD,
+        "tags": KEYWORD,
+    },
+    RECORD_TIMELINE: {
+        "@timestamp": DATE,
+        "event": EVENT,
+        "process": {"properties": {"name": KEYWORD, "start": DATE}},
+        "windows": WINDOWS,
+        "log": LOG,
+        "tags": KEYWORD,
+    },
+    RECORD_FILE: {
+        "event": EVENT,
+        "process": {"properties": {"name": KEYWORD}},
+        "windows": WINDOWS,
+        "log": LOG,
+        "tags": KEYWORD,
+    },
+}
+
+
+def get_template_name(index_name: str) -> str:
+    return f"prefetch2es-{index_name}"
+
+
+def build_index_template(kind: str, index_name: str) -> dict:
+    """Build the index template of the records of a kind.
+
+    Dynamic mapping indexes every string as both text and keyword and
+    detects dates from their values. The template maps paths, names and
+    hashes as keyword only, timestamps as date and counters as numbers, and
+    any field added later as keyword.
+
+    Args:
+        kind (str): Record kind (RECORD_STANDARD, RECORD_TIMELINE or
+            RECORD_FILE) stored in the index.
+        index_name (str): Index the template applies to once created.
+
+    Returns:
+        dict: Body of a PUT _index_template request.
+    """
+    return {
+        "index_patterns": [index_name],
+        "priority": TEMPLATE_PRIORITY,
+        "template": {
+            "mappings": {
+                "date_detection": False,
+                "dynamic_templates": [
+                    {
+                        "strings_as_keywords": {
+                            "match_mapping_type": "string",
+                            "mapping": KEYWORD,
+                        }
+                    }
+                ],
+                "properties": PROPERTIES[kind],
+            }
+        },
+        "_meta": {"managed_by": "prefetch2es", "record_kind": kind},
+    }
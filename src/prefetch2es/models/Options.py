@@ -0,0 +1,77 @@
+# coding: utf-8
+import os
+from typing import Union
+
+# Settings shared by the command line and the library functions. This module
+# only uses the standard library, so that --help and import prefetch2es do
+# not load multiprocessing, pyscca, orjson or the Elasticsearch client.
+
+# Parse chunk size picked by generate_auto_chunks
+AUTO_CHUNK_SIZE = 0
+
+# Backends running chunk processors
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_INLINE = "inline"
+EXECUTORS = (EXECUTOR_PROCESS, EXECUTOR_THREAD, EXECUTOR_INLINE)
+
+# Output formats and compressions of prefetch2json
+OUTPUT_FORMATS = ("json", "ndjson")
+COMPRESSIONS = ("", "gzip", "zstd")
+
+# Default upper bound of a single _bulk request body
+DEFAULT_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+
+# Default upper bound of the uncompressed size of a bulk file
+DEFAULT_SHARD_BYTES = 100 * 1024 * 1024
+
+# Requests slower than this shrink the batch size
+DEFAULT_TARGET_LATENCY = 5.0
+
+# Default size cap of the on-disk parse cache
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Number of files read concurrently by the read-ahead stage
+DEFAULT_IO_THREADS = 8
+
+
+def get_cpu_count() -> int:
+    """Get CPU count safely"""
+    return os.cpu_count() or 1
+
+
+def parse_chunk_size(value: Union[int, str]) -> int:
+    """Convert a parse chunk setting to a chunk size.
+
+    Args:
+        value (Union[int, str]): Number of files per worker task, or "auto".
+
+    Returns:
+        int: Chunk size, AUTO_CHUNK_SIZE for "auto".
+    """
+    if isinstance(value, str) and value.lower() == "auto":
+        return AUTO_CHUNK_SIZE
+    chunk_size = int(value)
+    if chunk_size < 1:
+        raise ValueError(f"Invalid parse chunk size: {value}")
+    return chunk_size
+
+
+def resolve_executor(multiprocess: bool, executor: str = "") -> str:
+    """Get the backend running chunk processors.
+
+    Args:
+        multiprocess (bool): Flag to run multiprocessing.
+        executor (str): EXECUTOR_* backend, "" to follow multiprocess.
+
+    Returns:
+        str: executor, else EXECUTOR_PROCESS with multiprocess and
+            EXECUTOR_INLINE without.
+    """
+    if executor == "":
+        return EXECUTOR_PROCESS if multiprocess else EXECUTOR_INLINE
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor: {executor} (expected one of {', '.join(EXECUTORS)})"
+        )
+    return executor
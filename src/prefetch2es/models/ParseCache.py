@@ -0,0 +1,191 @@
+# coding: utf-8
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha1
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pyscca
+
+
+# Default number of parsed files kept in memory by each process
+DEFAULT_CACHE_ENTRIES = 4096
+
+# Bumped whenever the layout of the cached data changes; entries of other
+# layouts or pyscca versions are never read and get pruned over time
+CACHE_FORMAT = "1"
+
+
+def calc_content_key(data: bytes) -> str:
+    """Get the cache key of the content of a prefetch file.
+
+    Args:
+        data (bytes): Prefetch file content.
+
+    Returns:
+        str: SHA-1 hex digest.
+    """
+    return sha1(data).hexdigest()
+
+
+class ParseCache(object):
+    """Content-addressed cache of parsed prefetch files.
+
+    Values are the serialized dict layout of the records returned by
+    read_prefetch, which do not depend on the path of the file, so
+    byte-identical files (the same golden image, or hosts collected again)
+    are parsed once. Recently used entries are kept in memory; with a
+    directory, entries are also stored on disk where they are shared by
+    every process and later runs. Methods may be called from several
+    threads.
+    """
+
+    def __init__(
+        self, max_entries: int = DEFAULT_CACHE_ENTRIES, directory: str = ""
+    ) -> None:
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.directory: Optional[Path] = (
+            Path(directory) / f"v{CACHE_FORMAT}-pyscca{pyscca.get_version()}"
+            if directory
+            else None
+        )
+        self.hits = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / key  # type: ignore[operator]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a cached value.
+
+        Args:
+            key (str): Content key (see calc_content_key).
+
+        Returns:
+            Optional[bytes]: Cached value, None on a miss.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self._count_hit()
+                return value
+        if self.directory is None:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            value = path.read_bytes()
+            # The modification time orders entries for prune_cache_directory
+            os.utime(path)
+        except OSError:
+            return None
+        with self.lock:
+            self._remember(key, value)
+            self._count_hit()
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store a value.
+
+        Args:
+            key (str): Content key (see calc_content_key).
+            value (bytes): Value to cache.
+        """
+        with self.lock:
+            self._remember(key, value)
+        if self.directory is None:
+            return
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name, so other processes never read a
+        # partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get_thread_hits(self) -> int:
+        """Get the number of hits of the calling thread.
+
+        Unlike hits, it is not changed by threads sharing the cache, so
+        differences of it count the hits of a piece of work.
+
+        Returns:
+            int: Number of hits.
+        """
+        return getattr(self.local, "hits", 0)
+
+    def _count_hit(self) -> None:
+        self.hits += 1
+        self.local.hits = self.get_thread_hits() + 1
+
+    def _remember(self, key: str, value: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def get_parse_cache(max_entries: int, directory: str) -> ParseCache:
+    """Get the parse cache of the current process.
+
+    Chunk processors only carry the cache settings, which are picklable, so
+    each worker process keeps its own in-memory entries across chunks.
+
+    Args:
+        max_entries (int): Number of entries kept in memory.
+        directory (str): On-disk cache directory ("" = memory only).
+
+    Returns:
+        ParseCache: Cache shared by every chunk processed in this process.
+    """
+    return ParseCache(max_entries, directory)
+
+
+def prune_cache_directory(directory: str, max_bytes: int) -> int:
+    """Delete the least recently used on-disk entries above a size cap.
+
+    Args:
+        directory (str): On-disk cache directory.
+        max_bytes (int): Maximum total size of the entries.
+
+    Returns:
+        int: Number of deleted entries.
+    """
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    deleted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        deleted += 1
+    return deleted
@@ -1,16 +1,75 @@
 # coding: utf-8
+import io
 import sys
-import os
-from itertools import chain
+import queue
+import time
+from collections import deque
+from hashlib import sha1
 from pathlib import Path
-from typing import List, Generator, Iterable, Dict, Union
-from itertools import islice
+from typing import (
+    List,
+    Generator,
+    Iterable,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from itertools import chain, islice
 import multiprocessing as mp
+from multiprocessing.pool import Pool, AsyncResult, ThreadPool
 from functools import partial
 
 
+import orjson
 import pyscca
 
+from prefetch2es.models.FileDiscovery import iter_prefetch_files
+from prefetch2es.models.Options import (
+    AUTO_CHUNK_SIZE,
+    EXECUTOR_INLINE,
+    EXECUTOR_PROCESS,
+    EXECUTOR_THREAD,
+    get_cpu_count,
+    resolve_executor,
+)
+from prefetch2es.models.ParseCache import ParseCache, calc_content_key, get_parse_cache
+from prefetch2es.models.PrefetchRecord import (
+    MetricEntry,
+    PrefetchRecord,
+    VolumeInfo,
+    export_records,
+    intern_path,
+)
+
+
+# (_id, JSON bytes) of a record serialized in the worker process
+SerializedRecord = Tuple[str, bytes]
+
+# Records produced from a chunk: a list, or a dict of lists of each kind
+ChunkResult = TypeVar("ChunkResult")
+
+# Picklable function turning a chunk of prefetch files into records
+ChunkProcessor = Callable[[List[Path]], ChunkResult]
+
+# Records of each kind, stage statistics and content hashes of a chunk
+StatsChunkResult = Tuple[Dict[str, list], Dict[str, float], List[str]]
+
+# Upper bound of automatically sized parse chunks
+MAX_AUTO_CHUNK_SIZE = 64
+
+# Number of chunks per worker automatically sized chunks aim for
+AUTO_TASKS_PER_WORKER = 4
+
+# Kinds of records built from a prefetch file
+RECORD_STANDARD = "standard"
+RECORD_TIMELINE = "timeline"
+# Per-file companion referenced by slim timeline events
+RECORD_FILE = "file"
+
 
 class SafeMultiprocessingMixin:
     """Safe multiprocessing management class for Python 3.13 compatibility"""
@@ -19,6 +78,7 @@ class SafeMultiprocessingMixin:
     def get_multiprocessing_context() -> mp.context.BaseContext:
         """Get safe multiprocessing context"""
         # Use spawn for Python 3.13+ or test environments to avoid fork() issues
+        ctx: mp.context.BaseContext
         if sys.version_info >= (3, 13) or "pytest" in sys.modules:
             try:
                 ctx = mp.get_context("spawn")
@@ -32,10 +92,84 @@ class SafeMultiprocessingMixin:
     @staticmethod
     def get_cpu_count() -> int:
         """Get CPU count safely"""
-        try:
-            return mp.cpu_count()
-        except NotImplementedError:
-            return os.cpu_count() or 1
+        return get_cpu_count()
+
+
+def preload_worker() -> None:
+    """Initialize a worker process before its first task.
+
+    Unpickling this function already imports this module, and with it
+    pyscca, orjson and the record builders. A parser is also created once,
+    so the first chunk of a worker is not slower than the others.
+    """
+    pyscca.file()
+
+
+class WorkerPool(SafeMultiprocessingMixin):
+    """Long-lived pool of preloaded parse workers, reusable across calls.
+
+    Starting worker processes, which re-import the interpreter and the
+    parsing dependencies under the spawn start method, can cost more than
+    parsing a small directory. A WorkerPool is started once and passed to
+    any number of Prefetch2es objects or calls.
+
+    With EXECUTOR_THREAD, workers are threads of the current process: they
+    start instantly and records are not pickled, but parsing only runs in
+    parallel as far as pyscca and the interpreter release the GIL.
+
+    Example:
+        with WorkerPool() as pool:
+            for directory in directories:
+                records = prefetch2json(directory, pool=pool)
+    """
+
+    def __init__(self, workers: int = 0, executor: str = EXECUTOR_PROCESS) -> None:
+        """Initialize WorkerPool.
+
+        Args:
+            workers (int): Number of workers (0 = CPU count).
+            executor (str): EXECUTOR_PROCESS or EXECUTOR_THREAD.
+        """
+        if executor not in (EXECUTOR_PROCESS, EXECUTOR_THREAD):
+            raise ValueError(f"A worker pool cannot use the {executor} executor")
+        self.workers = workers or self.get_cpu_count()
+        self.executor = executor
+        self.pool: Optional[Pool] = None
+
+    def __enter__(self) -> "WorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> Pool:
+        """Start the worker processes, if not already running.
+
+        Returns:
+            Pool: Underlying multiprocessing pool.
+        """
+        if self.pool is None:
+            if self.executor == EXECUTOR_THREAD:
+                self.pool = ThreadPool(self.workers)
+            else:
+                ctx = self.get_multiprocessing_context()
+                self.pool = ctx.Pool(self.workers, initializer=preload_worker)
+        return self.pool
+
+    def close(self) -> None:
+        """Wait for submitted chunks and stop the workers."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def terminate(self) -> None:
+        """Stop the workers without waiting for submitted chunks."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
 
 
 def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
@@ -55,129 +189,389 @@ def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
         piece = list(islice(i, chunk_size))
 
 
-def process_prefetch_file(filepath: Path, tags: str = "") -> dict:
-    """Process a single prefetch file and return its data.
+def generate_auto_chunks(
+    iterable: Iterable, workers: int, max_chunk_size: int = MAX_AUTO_CHUNK_SIZE
+) -> Generator:
+    """Generate chunks sized from the number of items left and of workers.
+
+    Chunks start with a single item and double up to max_chunk_size, which
+    amortizes the cost of handing them to a worker, so the workers start as
+    soon as the first items are found instead of after a full window of a
+    slow directory walk. Items are buffered AUTO_TASKS_PER_WORKER chunks of
+    the current size per worker ahead. Once the iterable is exhausted, the
+    items left are split into at least AUTO_TASKS_PER_WORKER chunks per
+    worker, so the run does not end waiting for the last worker on a single
+    large chunk.
 
     Args:
-        filepath (Path): Path to the prefetch file
+        iterable (Iterable): Original Iterable object.
+        workers (int): Number of workers processing the chunks.
+        max_chunk_size (int): Upper bound of the chunk size.
 
-    Returns:
-        dict: Prefetch file data
+    Yields:
+        Generator: List
     """
-    p = pyscca.file()
-    p.open_file_object(filepath.open(mode="rb"))
+    tasks = max(1, workers) * AUTO_TASKS_PER_WORKER
+    limit = 1
+    i = iter(iterable)
+    buffer: Deque = deque(islice(i, tasks))
+    while buffer:
+        chunk_size = min(limit, -(-len(buffer) // tasks))
+        yield [buffer.popleft() for _ in range(chunk_size)]
+        limit = min(max(1, max_chunk_size), limit * 2)
+        buffer.extend(islice(i, tasks * limit - len(buffer)))
+
+
+def gen_chunks(chunk_size: int, iterable: Iterable, workers: int) -> Generator:
+    """Generate chunks of chunk_size items, or automatically sized ones.
+
+    Args:
+        chunk_size (int): Chunk sizes, AUTO_CHUNK_SIZE for generate_auto_chunks.
+        iterable (Iterable): Original Iterable object.
+        workers (int): Number of workers processing the chunks.
+
+    Yields:
+        Generator: List
+    """
+    if chunk_size == AUTO_CHUNK_SIZE:
+        return generate_auto_chunks(iterable, workers)
+    return generate_chunks(chunk_size, iterable)
+
+
+def imap_bounded(
+    pool: Pool,
+    func: ChunkProcessor[ChunkResult],
+    chunks: Iterable[List[Path]],
+    max_inflight: int,
+    ordered: bool = True,
+) -> Generator[Tuple[List[Path], ChunkResult], None, None]:
+    """Map func over chunks in a worker pool, streaming results.
+
+    Unlike Pool.map_async, at most max_inflight chunks are submitted ahead of
+    the consumer, so parsing overlaps with whatever the caller does with each
+    result and memory stays bounded regardless of the input size.
+
+    Args:
+        pool (Pool): Worker pool.
+        func (ChunkProcessor): Chunk processor.
+        chunks (Iterable[List[Path]]): Chunks of prefetch file paths.
+        max_inflight (int): Maximum number of submitted but unyielded chunks.
+        ordered (bool): Yield in input order, otherwise in completion order.
+
+    Yields:
+        Generator[Tuple[List[Path], ChunkResult], None, None]: Each chunk
+            and its result.
+    """
+    if not ordered:
+        yield from _imap_bounded_unordered(pool, func, chunks, max_inflight)
+        return
+
+    pending: Deque[Tuple[List[Path], AsyncResult]] = deque()
+    for chunk in chunks:
+        pending.append((chunk, pool.apply_async(func, (chunk,))))
+        if len(pending) >= max(1, max_inflight):
+            chunk, result = pending.popleft()
+            yield chunk, result.get()
+
+    while pending:
+        chunk, result = pending.popleft()
+        yield chunk, result.get()
+
+
+def _imap_bounded_unordered(
+    pool: Pool,
+    func: ChunkProcessor[ChunkResult],
+    chunks: Iterable[List[Path]],
+    max_inflight: int,
+) -> Generator[Tuple[List[Path], ChunkResult], None, None]:
+    """Completion-order variant of imap_bounded."""
+    done: "queue.Queue[tuple]" = queue.Queue()
+
+    def take() -> Tuple[List[Path], ChunkResult]:
+        chunk, result, error = done.get()
+        if error is not None:
+            raise error
+        return chunk, result
+
+    inflight = 0
+    for chunk in chunks:
+        pool.apply_async(
+            func,
+            (chunk,),
+            callback=partial(_put_result, done, chunk),
+            error_callback=partial(_put_error, done, chunk),
+        )
+        inflight += 1
+        if inflight >= max(1, max_inflight):
+            yield take()
+            inflight -= 1
+
+    while inflight:
+        yield take()
+        inflight -= 1
+
+
+def _put_result(done: "queue.Queue[tuple]", chunk: List[Path], result: list) -> None:
+    done.put((chunk, result, None))
+
+
+def _put_error(
+    done: "queue.Queue[tuple]", chunk: List[Path], error: BaseException
+) -> None:
+    done.put((chunk, None, error))
+
+
+def parse_tags(tags: str) -> List[str]:
+    """Parse comma-separated tags into the tag list of a record.
 
-    # Parse tags from comma-separated string
+    Args:
+        tags (str): Additional tags (comma-separated)
+
+    Returns:
+        List[str]: "prefetch" followed by the additional tags.
+    """
     additional_tags = (
         [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
     )
-    base_tags = ["prefetch"] + additional_tags
+    return ["prefetch"] + additional_tags
+
+
+def read_prefetch(
+    filepath: Path, cache: Optional[ParseCache] = None
+) -> PrefetchRecord:
+    """Parse a prefetch file once into the parts shared by every record layout.
+
+    Args:
+        filepath (Path): Path to the prefetch file
+        cache (Optional[ParseCache]): Cache of parsed file contents. Files
+            byte-identical to one parsed before are not parsed again.
+
+    Returns:
+        PrefetchRecord: Prefetch file data without source_file and tags.
+    """
+    # Read the whole file at once: the descriptor is closed right away and
+    # the many small reads of pyscca are served from memory
+    return load_prefetch(filepath.read_bytes(), cache)
+
+
+def load_prefetch(
+    data: bytes, cache: Optional[ParseCache] = None, key: str = ""
+) -> PrefetchRecord:
+    """Parse the content of a prefetch file, through the cache if any.
+
+    Args:
+        data (bytes): Prefetch file content.
+        cache (Optional[ParseCache]): Cache of parsed file contents.
+        key (str): Content key of data if already calculated (see
+            calc_content_key).
+
+    Returns:
+        PrefetchRecord: Prefetch file data without source_file and tags.
+    """
+    if cache is None:
+        return parse_prefetch(data)
 
-    result = {
-        "name": p.executable_filename,
-        "filenames": [name for name in p.filenames],
-        "exec_count": p.run_count,
-        "last_exec_times": [
+    key = key or calc_content_key(data)
+    cached = cache.get(key)
+    if cached is not None:
+        return PrefetchRecord.from_dict(orjson.loads(cached))
+    prefetch = parse_prefetch(data)
+    cache.put(key, orjson.dumps(prefetch.to_dict()))
+    return prefetch
+
+
+def parse_prefetch(data: bytes) -> PrefetchRecord:
+    """Parse the content of a prefetch file.
+
+    Args:
+        data (bytes): Prefetch file content.
+
+    Returns:
+        PrefetchRecord: Prefetch file data without source_file and tags.
+    """
+    p = pyscca.file()
+    p.open_file_object(io.BytesIO(data))
+
+    result = PrefetchRecord(
+        name=sys.intern(p.executable_filename),
+        filenames=[intern_path(name) for name in p.filenames],
+        exec_count=p.run_count,
+        last_exec_times=[
             f"{p.get_last_run_time(i)}Z".replace(' ', 'T') for i in range(p.run_count if p.run_count < 8 else 8)
         ],
-        "format_version": p.format_version,
-        "prefetch_hash": format(p.prefetch_hash, "x").upper(),
-        "number_of_volumes": p.number_of_volumes,
-        "number_of_filenames": p.number_of_filenames,
-        "number_of_file_metrics_entries": p.number_of_file_metrics_entries,
-        "metrics": [
-            {
-                "filename": metrics.filename,
-                "file_reference": hex(metrics.file_reference).upper(),
-            }
+        format_version=p.format_version,
+        prefetch_hash=format(p.prefetch_hash, "x").upper(),
+        number_of_volumes=p.number_of_volumes,
+        number_of_filenames=p.number_of_filenames,
+        number_of_file_metrics_entries=p.number_of_file_metrics_entries,
+        metrics=[
+            MetricEntry(*intern_path(metrics.filename), metrics.file_reference)
             for metrics in p.file_metrics_entries
         ],
-        "volumes": [
-            {
-                "path": volume.device_path,
-                "creation_time": f"{volume.get_creation_time()}Z".replace(' ', 'T'),
-                "serial_number": format(volume.serial_number, "x").upper(),
-            }
+        volumes=[
+            VolumeInfo(
+                sys.intern(volume.device_path),
+                f"{volume.get_creation_time()}Z".replace(' ', 'T'),
+                format(volume.serial_number, "x").upper(),
+            )
             for volume in p.volumes
         ],
-        "source_file": str(filepath),
-        "tags": base_tags,
-    }
+    )
 
     p.close()
     return result
 
 
-def process_prefetch_file_timeline(filepath: Path, tags: str) -> List[dict]:
-    """Process a single prefetch file and return its timeline data.
+def build_standard_record(
+    prefetch: PrefetchRecord, filepath: Path, tags: str = ""
+) -> dict:
+    """Build the standard record of a parsed prefetch file.
 
     Args:
+        prefetch (PrefetchRecord): Data returned by read_prefetch.
+        filepath (Path): Path to the prefetch file
+        tags (str): Additional tags (comma-separated)
+
+    Returns:
+        dict: Prefetch file data
+    """
+    return prefetch.with_source(str(filepath), parse_tags(tags)).to_dict()
+
+
+def build_timeline_records(
+    prefetch: PrefetchRecord, filepath: Path, tags: str, file_id: str = ""
+) -> List[dict]:
+    """Build the timeline events of a parsed prefetch file.
+
+    The volumes and metrics lists, the hash and the tags are built once and
+    shared by every event of the file. With file_id, events are slim: they
+    only carry the executable, timestamp and hash, and reference the
+    companion record built by build_file_record for the rest.
+
+    Args:
+        prefetch (PrefetchRecord): Data returned by read_prefetch.
         filepath (Path): Path to the prefetch file
         tags (str): Additional tags for timeline records (comma-separated)
+        file_id (str): _id of the companion file record (slim layout).
 
     Returns:
         List[dict]: Timeline-formatted prefetch file data.
     """
-    p = pyscca.file()
-    p.open_file_object(filepath.open(mode="rb"))
+    windows: Dict[str, dict]
+    if file_id:
+        windows = {
+            "prefetch": {
+                "hash": {"prefetch": prefetch.prefetch_hash},
+                "file_id": file_id,
+            }
+        }
+    else:
+        windows = {
+            "prefetch": {
+                "exec_count": prefetch.exec_count,
+                "hash": {"prefetch": prefetch.prefetch_hash},
+                "format_version": prefetch.format_version,
+                "volumes": prefetch.volume_dicts(),
+                "metrics": prefetch.metric_dicts(),
+            }
+        }
+    log = {"file": {"path": str(filepath)}}
+    base_tags = parse_tags(tags)
 
-    # Parse tags from comma-separated string
-    additional_tags = (
-        [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
-    )
-    base_tags = ["prefetch"] + additional_tags
-
-    timeline_records = []
-    for i in range(p.run_count if p.run_count < 8 else 8):
-        timeline_records.append(
-            {
-                "@timestamp": f"{p.get_last_run_time(i)}Z".replace(' ', 'T'),
-                "event": {
-                    "action": "prefetch-executed",
-                    "category": ["process"],
-                    "type": ["start"],
-                    "kind": "event",
-                    "provider": "prefetch",
-                    "module": "windows",
-                    "dataset": "windows.prefetch",
-                },
-                "process": {
-                    "name": p.executable_filename,
-                    "start": f"{p.get_last_run_time(i)}Z".replace(' ', 'T'),
-                },
-                "windows": {
-                    "prefetch": {
-                        "exec_count": p.run_count,
-                        "hash": {"prefetch": format(p.prefetch_hash, "x").upper()},
-                        "format_version": p.format_version,
-                        "volumes": [
-                            {
-                                "path": volume.device_path,
-                                "creation_time": f"{volume.get_creation_time()}Z".replace(' ', 'T'),
-                                "serial_number": format(
-                                    volume.serial_number, "x"
-                                ).upper(),
-                            }
-                            for volume in p.volumes
-                        ],
-                        "metrics": [
-                            {
-                                "filename": metrics.filename,
-                                "file_reference": hex(
-                                    metrics.file_reference
-                                ).upper(),
-                            }
-                            for metrics in p.file_metrics_entries
-                        ],
-                    }
-                },
-                "log": {"file": {"path": str(filepath)}},
-                "tags": base_tags,
+    return [
+        {
+            "@timestamp": timestamp,
+            "event": {
+                "action": "prefetch-executed",
+                "category": ["process"],
+                "type": ["start"],
+                "kind": "event",
+                "provider": "prefetch",
+                "module": "windows",
+                "dataset": "windows.prefetch",
+            },
+            "process": {
+                "name": prefetch.name,
+                "start": timestamp,
+            },
+            "windows": windows,
+            "log": log,
+            "tags": base_tags,
+        }
+        for timestamp in prefetch.last_exec_times
+    ]
+
+
+def build_file_record(prefetch: PrefetchRecord, filepath: Path, tags: str) -> dict:
+    """Build the companion record referenced by slim timeline events.
+
+    Args:
+        prefetch (PrefetchRecord): Data returned by read_prefetch.
+        filepath (Path): Path to the prefetch file
+        tags (str): Additional tags (comma-separated)
+
+    Returns:
+        dict: Per-file metadata, volumes and metrics.
+    """
+    return {
+        "event": {
+            "kind": "state",
+            "provider": "prefetch",
+            "module": "windows",
+            "dataset": "windows.prefetch",
+        },
+        "process": {"name": prefetch.name},
+        "windows": {
+            "prefetch": {
+                "exec_count": prefetch.exec_count,
+                "hash": {"prefetch": prefetch.prefetch_hash},
+                "format_version": prefetch.format_version,
+                "last_exec_times": list(prefetch.last_exec_times),
+                "volumes": prefetch.volume_dicts(),
+                "metrics": prefetch.metric_dicts(),
             }
-        )
+        },
+        "log": {"file": {"path": str(filepath)}},
+        "tags": parse_tags(tags),
+    }
 
-    p.close()
-    return timeline_records
+
+def read_standard_record(filepath: Path, tags: str = "") -> PrefetchRecord:
+    """Parse a prefetch file into its standard record, kept compact.
+
+    Args:
+        filepath (Path): Path to the prefetch file
+        tags (str): Additional tags (comma-separated)
+
+    Returns:
+        PrefetchRecord: Standard record, see PrefetchRecord.to_dict.
+    """
+    return read_prefetch(filepath).with_source(str(filepath), parse_tags(tags))
+
+
+def process_prefetch_file(filepath: Path, tags: str = "") -> dict:
+    """Process a single prefetch file and return its data.
+
+    Args:
+        filepath (Path): Path to the prefetch file
+
+    Returns:
+        dict: Prefetch file data
+    """
+    return read_standard_record(filepath, tags).to_dict()
+
+
+def process_prefetch_file_timeline(filepath: Path, tags: str) -> List[dict]:
+    """Process a single prefetch file and return its timeline data.
+
+    Args:
+        filepath (Path): Path to the prefetch file
+        tags (str): Additional tags for timeline records (comma-separated)
+
+    Returns:
+        List[dict]: Timeline-formatted prefetch file data.
+    """
+    return build_timeline_records(read_prefetch(filepath), filepath, tags)
 
 
 def process_prefetch_chunk(filepaths: List[Path]) -> List[dict]:
@@ -192,6 +586,12 @@ def process_prefetch_chunk(filepaths: List[Path]) -> List[dict]:
     return [process_prefetch_file(filepath) for filepath in filepaths]
 
 
+def _process_standard_chunk(filepaths: List[Path]) -> List[PrefetchRecord]:
+    # Chunk processor of the standard records, which travel back from the
+    # workers as PrefetchRecord and become dicts at the output edge
+    return [read_standard_record(filepath) for filepath in filepaths]
+
+
 def process_timeline_prefetch_chunk(filepaths: List[Path]) -> List[dict]:
     """Process a chunk of prefetch files for timeline analysis.
 
@@ -227,63 +627,431 @@ def process_timeline_prefetch_chunk_with_tags(
     return result
 
 
+def serialize_record(record: dict) -> SerializedRecord:
+    """Serialize record once for both its _id and its bulk body.
+
+    Args:
+        record (dict): Prefetch record.
+
+    Returns:
+        SerializedRecord: (hash value, JSON with sorted keys)
+    """
+    source = orjson.dumps(record, option=orjson.OPT_SORT_KEYS)
+    return sha1(source).hexdigest(), source
+
+
+def process_serialized_chunk(
+    filepaths: List[Path], process_func: ChunkProcessor[list]
+) -> List[SerializedRecord]:
+    """Process a chunk of prefetch files into pre-serialized records.
+
+    Runs in the worker, so only compact bytes are sent back to the parent
+    instead of pickled nested dicts.
+
+    Args:
+        filepaths (List[Path]): List of prefetch file paths
+        process_func (ChunkProcessor): Chunk processor producing dict
+            records or PrefetchRecord.
+
+    Returns:
+        List[SerializedRecord]: List of (_id, JSON bytes)
+    """
+    return [
+        serialize_record(record)
+        for record in export_records(process_func(filepaths))
+    ]
+
+
+def process_routed_chunk(
+    filepaths: List[Path],
+    kinds: Tuple[str, ...],
+    tags: str = "",
+    serialized: bool = False,
+    cache_entries: int = 0,
+    cache_dir: str = "",
+) -> Dict[str, list]:
+    """Process a chunk of prefetch files into records of several kinds.
+
+    Each file is parsed once and every requested kind is built from it.
+    When RECORD_FILE is requested, timeline events use the slim layout and
+    reference the _id of their companion file record.
+
+    Args:
+        filepaths (List[Path]): List of prefetch file paths
+        kinds (Tuple[str, ...]): Record kinds to build (RECORD_*).
+        tags (str): Additional tags for timeline records (comma-separated)
+        serialized (bool): Produce SerializedRecord instead of dict.
+        cache_entries (int): Number of parsed files kept in memory by the
+            process, reused for byte-identical files (0 = disabled).
+        cache_dir (str): Also cache parsed files in this directory, shared
+            by every process and later runs.
+
+    Returns:
+        Dict[str, list]: Records of each kind. Unless serialized, standard
+            records are PrefetchRecord (see export_records).
+    """
+    return _process_routed_chunk(
+        filepaths, kinds, tags, serialized, _get_cache(cache_entries, cache_dir), None
+    )
+
+
+def process_routed_chunk_with_stats(
+    filepaths: List[Path],
+    kinds: Tuple[str, ...],
+    tags: str = "",
+    serialized: bool = False,
+    cache_entries: int = 0,
+    cache_dir: str = "",
+    hash_files: bool = False,
+) -> StatsChunkResult:
+    """Same as process_routed_chunk, also measuring where the time goes.
+
+    The statistics are returned with the records, so they are collected
+    from worker processes as well.
+
+    Args:
+        filepaths (List[Path]): List of prefetch file paths
+        kinds (Tuple[str, ...]): Record kinds to build (RECORD_*).
+        tags (str): Additional tags for timeline records (comma-separated)
+        serialized (bool): Produce SerializedRecord instead of dict.
+        cache_entries (int): As in process_routed_chunk.
+        cache_dir (str): As in process_routed_chunk.
+        hash_files (bool): Also return the content hash of each file,
+            calculated from the bytes already read for parsing.
+
+    Returns:
+        StatsChunkResult: Records of each kind, seconds spent in each
+            stage with the counts of the chunk, and the content hashes of
+            filepaths (empty unless hash_files).
+    """
+    stats: Dict[str, float] = {"parse": 0.0, "build": 0.0, "serialize": 0.0}
+    started = time.perf_counter()
+    cache = _get_cache(cache_entries, cache_dir)
+    hits = cache.get_thread_hits() if cache is not None else 0
+    hashes: Optional[List[str]] = [] if hash_files else None
+    routed = _process_routed_chunk(
+        filepaths, kinds, tags, serialized, cache, stats, hashes
+    )
+    if cache is not None:
+        stats["cache_hits"] = cache.get_thread_hits() - hits
+    stats["busy"] = time.perf_counter() - started
+    stats["files"] = len(filepaths)
+    stats["documents"] = sum(len(records) for records in routed.values())
+    if serialized:
+        stats["bytes"] = sum(
+            len(source) for records in routed.values() for _, source in records
+        )
+    return routed, stats, hashes or []
+
+
+def _get_cache(cache_entries: int, cache_dir: str) -> Optional[ParseCache]:
+    if cache_entries <= 0 and not cache_dir:
+        return None
+    return get_parse_cache(cache_entries, cache_dir)
+
+
+def _process_routed_chunk(
+    filepaths: List[Path],
+    kinds: Tuple[str, ...],
+    tags: str,
+    serialized: bool,
+    cache: Optional[ParseCache],
+    stats: Optional[Dict[str, float]],
+    hashes: Optional[List[str]] = None,
+) -> Dict[str, list]:
+    clock = time.perf_counter
+    routed: Dict[str, list] = {kind: [] for kind in kinds}
+    parse_time = build_time = serialize_time = 0.0
+    standard_tags = parse_tags("")
+    for filepath in filepaths:
+        started = clock()
+        if hashes is None:
+            prefetch = read_prefetch(filepath, cache)
+        else:
+            # Hashed once, for both the manifest and the parse cache
+            data = filepath.read_bytes()
+            hashes.append(calc_content_key(data))
+            prefetch = load_prefetch(data, cache, hashes[-1])
+        parsed = clock()
+        parse_time += parsed - started
+
+        if RECORD_STANDARD in routed:
+            # Converted to dict when serialized, or by the consumer
+            routed[RECORD_STANDARD].append(
+                prefetch.with_source(str(filepath), standard_tags)
+            )
+
+        file_id = ""
+        if RECORD_FILE in routed:
+            file_record = build_file_record(prefetch, filepath, tags)
+            # The _id is the content hash, so serialize the companion only once
+            file_id, source = serialize_record(file_record)
+            routed[RECORD_FILE].append(
+                (file_id, source) if serialized else file_record
+            )
+
+        if RECORD_TIMELINE in routed:
+            routed[RECORD_TIMELINE].extend(
+                build_timeline_records(prefetch, filepath, tags, file_id=file_id)
+            )
+        build_time += clock() - parsed
+
+    if serialized:
+        started = clock()
+        for kind in (RECORD_STANDARD, RECORD_TIMELINE):
+            if kind in routed:
+                routed[kind] = [
+                    serialize_record(record) for record in export_records(routed[kind])
+                ]
+        serialize_time = clock() - started
+
+    if stats is not None:
+        stats["parse"] += parse_time
+        stats["build"] += build_time
+        stats["serialize"] += serialize_time
+    return routed
+
+
+def get_chunk_processor(
+    timeline_mode: bool = False, tags: str = "", serialized: bool = False
+) -> ChunkProcessor[list]:
+    """Get the picklable chunk processor for the given record format.
+
+    Args:
+        timeline_mode (bool): Produce timeline-formatted records.
+        tags (str): Additional tags for timeline records (comma-separated).
+        serialized (bool): Produce SerializedRecord instead of dict.
+
+    Returns:
+        ChunkProcessor: Chunk processor.
+    """
+    process_func: ChunkProcessor[list] = _process_standard_chunk
+    if timeline_mode:
+        # Create partial function with tags
+        process_func = partial(process_timeline_prefetch_chunk_with_tags, tags=tags)
+    if serialized:
+        return partial(process_serialized_chunk, process_func=process_func)
+    return process_func
+
+
 class Prefetch2es(SafeMultiprocessingMixin):
     """Prefetch file processor with multiprocessing support"""
 
-    def __init__(self, input_path: Union[str, Path]) -> None:
+    def __init__(
+        self,
+        input_path: Union[str, Path, Iterable[Union[str, Path]]],
+        skip: Optional[Callable[[Path], bool]] = None,
+        recursive: bool = False,
+        scan_threads: int = 1,
+        pool: Optional[WorkerPool] = None,
+    ) -> None:
         """Initialize Prefetch2es.
 
         Args:
-            input_path (Union[str, Path]): Path to prefetch file or directory
+            input_path (Union[str, Path, Iterable[Union[str, Path]]]):
+                Path to prefetch file or directory, or several of them
+                processed as a single stream.
+            skip (Optional[Callable[[Path], bool]]): Predicate excluding
+                prefetch files from processing, e.g. already ingested ones.
+            recursive (bool): Also search subdirectories of directories.
+            scan_threads (int): Number of directories scanned concurrently
+                when searching recursively.
+            pool (Optional[WorkerPool]): Worker pool used in multiprocess
+                mode instead of starting one for each call.
         """
-        self.path = Path(input_path)
+        if isinstance(input_path, (str, Path)):
+            self.paths = [Path(input_path)]
+        else:
+            self.paths = [Path(path) for path in input_path]
+        self.skip = skip
+        self.recursive = recursive
+        self.scan_threads = scan_threads
+        self.pool = pool
+        self.owns_pool = False
+
+    def __enter__(self) -> "Prefetch2es":
+        # Keep a warm worker pool for every call made within the block
+        if self.pool is None:
+            self.pool = WorkerPool()
+            self.owns_pool = True
+        self.pool.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.owns_pool and self.pool is not None:
+            self.pool.close()
+            self.pool = None
+            self.owns_pool = False
 
-    def _get_prefetch_files(self) -> List[Path]:
+    def iter_prefetch_files(self) -> Generator[Path, None, None]:
+        """Stream prefetch files to process while searching directories.
+
+        Yields:
+            Generator[Path, None, None]: Prefetch file paths (.pf in any case).
+        """
+        prefetch_files = iter_prefetch_files(
+            self.paths, recursive=self.recursive, threads=self.scan_threads
+        )
+        if self.skip is not None:
+            skip = self.skip
+            prefetch_files = (path for path in prefetch_files if not skip(path))
+        yield from prefetch_files
+
+    def get_prefetch_files(self) -> List[Path]:
         """Get list of prefetch files to process.
 
         Returns:
             List[Path]: List of prefetch file paths
         """
-        if self.path.is_file():
-            return [self.path]
-        elif self.path.is_dir():
-            # Find all .pf files in directory
-            return list(self.path.glob("*.pf"))
-        else:
-            raise ValueError(f"Invalid path: {self.path}")
+        return list(self.iter_prefetch_files())
 
-    def gen_records(
-        self, multiprocess: bool = False, chunk_size: int = 1000
-    ) -> Generator[List[dict], None, None]:
-        """Generate prefetch records.
+    # Name used before discovery was streamed
+    _get_prefetch_files = get_prefetch_files
+
+    def gen_file_chunks(self, chunk_size: int) -> Generator[List[Path], None, None]:
+        """Generate chunks of prefetch files to process.
 
         Args:
-            multiprocess (bool): Flag to run multiprocessing.
             chunk_size (int): Size of the chunk to be processed for each process.
 
         Yields:
-            Generator[List[dict], None, None]: Yields List[dict] of prefetch records.
+            Generator[List[Path], None, None]: Chunks of prefetch file paths.
         """
-        prefetch_files = self._get_prefetch_files()
+        yield from generate_chunks(chunk_size, self.iter_prefetch_files())
+
+    def gen_file_records(
+        self,
+        process_func: ChunkProcessor[ChunkResult],
+        multiprocess: bool = False,
+        chunk_size: int = 1000,
+        max_inflight: int = 0,
+        workers: int = 0,
+        ordered: bool = True,
+        filepaths: Optional[Iterable[Path]] = None,
+        executor: str = "",
+    ) -> Generator[Tuple[List[Path], ChunkResult], None, None]:
+        """Run process_func over chunks of prefetch files.
 
-        if not prefetch_files:
+        Args:
+            process_func (ChunkProcessor): Chunk processor.
+            multiprocess (bool): Flag to run multiprocessing, unless executor
+                is given.
+            chunk_size (int): Number of prefetch files processed by each
+                worker task, AUTO_CHUNK_SIZE to size chunks automatically.
+            max_inflight (int): Maximum number of chunks submitted to the worker
+                pool but not yet yielded (0 = twice the number of workers).
+            workers (int): Number of workers (0 = CPU count), unless the
+                worker pool of the object is used.
+            ordered (bool): Yield chunks in input order, otherwise as soon as
+                each one completes.
+            filepaths (Optional[Iterable[Path]]): Prefetch files to process
+                instead of iter_prefetch_files(), e.g. a wrapped stream of it.
+            executor (str): EXECUTOR_* backend running process_func (see
+                resolve_executor). The worker pool of the object, if any,
+                is used by the process and thread backends; given
+                explicitly, the backend must be the one of the pool or
+                EXECUTOR_INLINE.
+
+        Yields:
+            Generator[Tuple[List[Path], ChunkResult], None, None]: Each chunk
+                of prefetch files and the records produced from it.
+
+        Raises:
+            ValueError: If executor conflicts with the worker pool.
+        """
+        backend = resolve_executor(multiprocess, executor)
+        if (
+            executor
+            and self.pool is not None
+            and backend not in (EXECUTOR_INLINE, self.pool.executor)
+        ):
+            raise ValueError(
+                f"The {backend} executor conflicts with the "
+                f"{self.pool.executor} executor of the worker pool"
+            )
+
+        prefetch_files = iter(
+            self.iter_prefetch_files() if filepaths is None else filepaths
+        )
+
+        # Files are streamed; peek whether there is more than one
+        head = list(islice(prefetch_files, 2))
+        if not head:
             return
+        prefetch_files = chain(head, prefetch_files)
 
-        if multiprocess and len(prefetch_files) > 1:
-            # Use safe context for Python 3.13 compatibility
-            ctx = self.get_multiprocessing_context()
-            with ctx.Pool(self.get_cpu_count()) as pool:
-                results = pool.map_async(
-                    process_prefetch_chunk,
-                    generate_chunks(chunk_size, prefetch_files),
+        parallel = backend != EXECUTOR_INLINE
+        if parallel and len(head) > 1 and self.pool is not None:
+            # Chunks still in flight when this generator is closed early are
+            # completed by the shared pool and discarded
+            processes = self.pool.workers
+            yield from imap_bounded(
+                self.pool.start(),
+                process_func,
+                gen_chunks(chunk_size, prefetch_files, processes),
+                max_inflight or processes * 2,
+                ordered=ordered,
+            )
+        elif parallel and len(head) > 1:
+            pool = WorkerPool(workers, backend)
+            processes = pool.workers
+            try:
+                yield from imap_bounded(
+                    pool.start(),
+                    process_func,
+                    gen_chunks(chunk_size, prefetch_files, processes),
+                    max_inflight or processes * 2,
+                    ordered=ordered,
                 )
-                yield list(chain.from_iterable(results.get(timeout=None)))
+            finally:
+                # Also runs when this generator is closed early
+                pool.terminate()
         else:
             # Single process mode
-            buffer: List[dict] = []
-            for chunk in generate_chunks(chunk_size, prefetch_files):
-                processed_chunk = process_prefetch_chunk(chunk)
-                buffer.extend(processed_chunk)
+            for chunk in gen_chunks(chunk_size, prefetch_files, 1):
+                yield chunk, process_func(chunk)
+
+    def _gen_chunked_records(
+        self,
+        process_func: ChunkProcessor[list],
+        multiprocess: bool,
+        chunk_size: int,
+        max_inflight: int,
+        executor: str = "",
+        workers: int = 0,
+    ) -> Generator[list, None, None]:
+        """Run process_func over chunks of prefetch files.
+
+        Args:
+            process_func (ChunkProcessor): Chunk processor.
+            multiprocess (bool): Flag to run multiprocessing.
+            chunk_size (int): Size of the chunk to be processed for each process.
+            max_inflight (int): Maximum number of chunks submitted to the worker
+                pool but not yet yielded (0 = twice the CPU count).
+            executor (str): EXECUTOR_* backend (see resolve_executor).
+            workers (int): Number of workers (0 = CPU count).
+
+        Yields:
+            Generator[list, None, None]: Yields lists of records, with
+                PrefetchRecord converted to dict.
+        """
+        chunk_results = self.gen_file_records(
+            process_func,
+            multiprocess,
+            chunk_size,
+            max_inflight,
+            workers=workers,
+            executor=executor,
+        )
+
+        if resolve_executor(multiprocess, executor) != EXECUTOR_INLINE:
+            for _, processed_chunk in chunk_results:
+                yield export_records(processed_chunk)
+        else:
+            # Single process mode
+            buffer: list = []
+            for _, processed_chunk in chunk_results:
+                buffer.extend(export_records(processed_chunk))
 
                 if len(buffer) >= chunk_size:
                     yield buffer
@@ -293,48 +1061,124 @@ class Prefetch2es(SafeMultiprocessingMixin):
             if buffer:
                 yield buffer
 
+    def gen_records(
+        self,
+        multiprocess: bool = False,
+        chunk_size: int = 1000,
+        max_inflight: int = 0,
+        serialized: bool = False,
+        executor: str = "",
+        workers: int = 0,
+    ) -> Generator[list, None, None]:
+        """Generate prefetch records.
+
+        Args:
+            multiprocess (bool): Flag to run multiprocessing.
+            chunk_size (int): Size of the chunk to be processed for each process.
+            max_inflight (int): Maximum number of chunks in flight in
+                multiprocess mode (0 = twice the CPU count).
+            serialized (bool): Yield SerializedRecord built in the workers
+                instead of dict.
+            executor (str): EXECUTOR_* backend, overriding multiprocess.
+            workers (int): Number of workers (0 = CPU count).
+
+        Yields:
+            Generator[list, None, None]: Yields List[dict] of prefetch records.
+        """
+        yield from self._gen_chunked_records(
+            get_chunk_processor(serialized=serialized),
+            multiprocess,
+            chunk_size,
+            max_inflight,
+            executor,
+            workers,
+        )
+
     def gen_timeline_records(
-        self, multiprocess: bool = False, chunk_size: int = 1000, tags: str = ""
-    ) -> Generator[List[dict], None, None]:
+        self,
+        multiprocess: bool = False,
+        chunk_size: int = 1000,
+        tags: str = "",
+        max_inflight: int = 0,
+        serialized: bool = False,
+        executor: str = "",
+        workers: int = 0,
+    ) -> Generator[list, None, None]:
         """Generate timeline-formatted prefetch records.
 
         Args:
             multiprocess (bool): Flag to run multiprocessing.
             chunk_size (int): Size of the chunk to be processed for each process.
             tags (str): Additional tags for timeline records (comma-separated).
+            max_inflight (int): Maximum number of chunks in flight in
+                multiprocess mode (0 = twice the CPU count).
+            serialized (bool): Yield SerializedRecord built in the workers
+                instead of dict.
+            executor (str): EXECUTOR_* backend, overriding multiprocess.
+            workers (int): Number of workers (0 = CPU count).
 
         Yields:
-            Generator[List[dict], None, None]: Yields List[dict] of timeline-formatted prefetch records.
+            Generator[list, None, None]: Yields List[dict] of timeline-formatted prefetch records.
         """
-        prefetch_files = self._get_prefetch_files()
-
-        if not prefetch_files:
-            return
+        yield from self._gen_chunked_records(
+            get_chunk_processor(timeline_mode=True, tags=tags, serialized=serialized),
+            multiprocess,
+            chunk_size,
+            max_inflight,
+            executor,
+            workers,
+        )
 
-        if multiprocess and len(prefetch_files) > 1:
-            # Use safe context for Python 3.13 compatibility
-            ctx = self.get_multiprocessing_context()
-            with ctx.Pool(self.get_cpu_count()) as pool:
-                # Create partial function with tags
-                process_func = partial(
-                    process_timeline_prefetch_chunk_with_tags, tags=tags
-                )
-                results = pool.map_async(
-                    process_func,
-                    generate_chunks(chunk_size, prefetch_files),
-                )
-                yield list(chain.from_iterable(results.get(timeout=None)))
-        else:
-            # Single process mode
-            buffer: List[dict] = []
-            for chunk in generate_chunks(chunk_size, prefetch_files):
-                processed_chunk = process_timeline_prefetch_chunk_with_tags(chunk, tags)
-                buffer.extend(processed_chunk)
+    def gen_routed_records(
+        self,
+        kinds: Tuple[str, ...],
+        multiprocess: bool = False,
+        chunk_size: int = 1000,
+        tags: str = "",
+        max_inflight: int = 0,
+        serialized: bool = False,
+        cache_entries: int = 0,
+        cache_dir: str = "",
+        executor: str = "",
+        workers: int = 0,
+    ) -> Generator[Dict[str, list], None, None]:
+        """Generate records of several kinds from a single parse of each file.
 
-                if len(buffer) >= chunk_size:
-                    yield buffer
-                    buffer = []
+        Args:
+            kinds (Tuple[str, ...]): Record kinds to build (RECORD_*).
+            multiprocess (bool): Flag to run multiprocessing.
+            chunk_size (int): Size of the chunk to be processed for each process.
+            tags (str): Additional tags for timeline records (comma-separated).
+            max_inflight (int): Maximum number of chunks in flight in
+                multiprocess mode (0 = twice the CPU count).
+            serialized (bool): Yield SerializedRecord built in the workers
+                instead of dict.
+            cache_entries (int): Number of parsed files kept in memory by
+                each process (0 = disabled).
+            cache_dir (str): Also cache parsed files in this directory.
+            executor (str): EXECUTOR_* backend, overriding multiprocess.
+            workers (int): Number of workers (0 = CPU count).
 
-            # Yield remaining records
-            if buffer:
-                yield buffer
+        Yields:
+            Generator[Dict[str, list], None, None]: Records of each kind, per
+                chunk of prefetch files.
+        """
+        process_func = partial(
+            process_routed_chunk,
+            kinds=kinds,
+            tags=tags,
+            serialized=serialized,
+            cache_entries=cache_entries,
+            cache_dir=cache_dir,
+        )
+        for _, routed in self.gen_file_records(
+            process_func,
+            multiprocess,
+            chunk_size,
+            max_inflight,
+            workers=workers,
+            executor=executor,
+        ):
+            if RECORD_STANDARD in routed and not serialized:
+                routed[RECORD_STANDARD] = export_records(routed[RECORD_STANDARD])
+            yield routed
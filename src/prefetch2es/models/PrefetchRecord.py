@@ -0,0 +1,233 @@
+# coding: utf-8
+import copy
+import sys
+from typing import List, Optional, Tuple
+
+
+def intern_path(path: str) -> Tuple[str, str]:
+    """Split a path into its interned directory prefix and file name.
+
+    Prefetch files of a host list the same few directories (e.g.
+    \\VOLUME{...}\\WINDOWS\\SYSTEM32\\) over and over, and the same files
+    appear in both filenames and metrics, so each of them is stored once per
+    process and pickled once per chunk.
+
+    Args:
+        path (str): Path as stored in the prefetch file.
+
+    Returns:
+        Tuple[str, str]: Directory with its trailing backslash, and file name.
+    """
+    directory, separator, name = path.rpartition("\\")
+    return sys.intern(directory + separator), sys.intern(name)
+
+
+class VolumeInfo(object):
+    """Volume referenced by a prefetch file."""
+
+    __slots__ = ("path", "creation_time", "serial_number")
+
+    def __init__(self, path: str, creation_time: str, serial_number: str) -> None:
+        self.path = path
+        self.creation_time = creation_time
+        self.serial_number = serial_number
+
+    def __reduce__(self):
+        return (VolumeInfo, (self.path, self.creation_time, self.serial_number))
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "creation_time": self.creation_time,
+            "serial_number": self.serial_number,
+        }
+
+
+class MetricEntry(object):
+    """File metrics entry of a prefetch file."""
+
+    __slots__ = ("directory", "name", "file_reference")
+
+    def __init__(self, directory: str, name: str, file_reference: int) -> None:
+        self.directory = directory
+        self.name = name
+        self.file_reference = file_reference
+
+    def __reduce__(self):
+        return (MetricEntry, (self.directory, self.name, self.file_reference))
+
+    @property
+    def filename(self) -> str:
+        return self.directory + self.name
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self.directory + self.name,
+            "file_reference": hex(self.file_reference).upper(),
+        }
+
+
+class PrefetchRecord(object):
+    """Compact representation of a parsed prefetch file.
+
+    Produced by the parsers and converted to the dict layout of the output
+    by to_dict only where records leave the package (JSON, bulk bodies or
+    the records yielded to callers). Paths are stored as interned
+    (directory, name) pairs, and the record pickles as plain tuples, so
+    chunks sent back by worker processes stay small.
+
+    A record with a source_file is a standard record, which also carries
+    its tags.
+    """
+
+    __slots__ = (
+        "name",
+        "filenames",
+        "exec_count",
+        "last_exec_times",
+        "format_version",
+        "prefetch_hash",
+        "number_of_volumes",
+        "number_of_filenames",
+        "number_of_file_metrics_entries",
+        "metrics",
+        "volumes",
+        "source_file",
+        "tags",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        filenames: List[Tuple[str, str]],
+        exec_count: int,
+        last_exec_times: List[str],
+        format_version: int,
+        prefetch_hash: str,
+        number_of_volumes: int,
+        number_of_filenames: int,
+        number_of_file_metrics_entries: int,
+        metrics: List[MetricEntry],
+        volumes: List[VolumeInfo],
+        source_file: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> None:
+        self.name = name
+        self.filenames = filenames
+        self.exec_count = exec_count
+        self.last_exec_times = last_exec_times
+        self.format_version = format_version
+        self.prefetch_hash = prefetch_hash
+        self.number_of_volumes = number_of_volumes
+        self.number_of_filenames = number_of_filenames
+        self.number_of_file_metrics_entries = number_of_file_metrics_entries
+        self.metrics = metrics
+        self.volumes = volumes
+        self.source_file = source_file
+        self.tags = tags
+
+    def __reduce__(self):
+        return (PrefetchRecord, tuple(getattr(self, slot) for slot in self.__slots__))
+
+    def __repr__(self) -> str:
+        return f"PrefetchRecord('{self.name}', source_file='{self.source_file}')"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PrefetchRecord":
+        """Rebuild a record from its dict layout.
+
+        Args:
+            data (dict): Dict returned by to_dict.
+
+        Returns:
+            PrefetchRecord: The record, with interned paths.
+        """
+        return cls(
+            name=sys.intern(data["name"]),
+            filenames=[intern_path(name) for name in data["filenames"]],
+            exec_count=data["exec_count"],
+            last_exec_times=data["last_exec_times"],
+            format_version=data["format_version"],
+            prefetch_hash=data["prefetch_hash"],
+            number_of_volumes=data["number_of_volumes"],
+            number_of_filenames=data["number_of_filenames"],
+            number_of_file_metrics_entries=data["number_of_file_metrics_entries"],
+            metrics=[
+                MetricEntry(
+                    *intern_path(metric["filename"]),
+                    int(metric["file_reference"], 16),
+                )
+                for metric in data["metrics"]
+            ],
+            volumes=[
+                VolumeInfo(
+                    sys.intern(volume["path"]),
+                    volume["creation_time"],
+                    volume["serial_number"],
+                )
+                for volume in data["volumes"]
+            ],
+            source_file=data.get("source_file"),
+            tags=data.get("tags"),
+        )
+
+    def with_source(self, source_file: str, tags: List[str]) -> "PrefetchRecord":
+        """Get the standard record of a parsed file.
+
+        Args:
+            source_file (str): Path to the prefetch file.
+            tags (List[str]): Tags of the record.
+
+        Returns:
+            PrefetchRecord: Record sharing the parsed data of this one.
+        """
+        record = copy.copy(self)
+        record.source_file = source_file
+        record.tags = tags
+        return record
+
+    def metric_dicts(self) -> List[dict]:
+        return [metric.to_dict() for metric in self.metrics]
+
+    def volume_dicts(self) -> List[dict]:
+        return [volume.to_dict() for volume in self.volumes]
+
+    def to_dict(self) -> dict:
+        """Convert to the dict layout of the output.
+
+        Returns:
+            dict: Prefetch file data, with source_file and tags for
+                standard records.
+        """
+        record = {
+            "name": self.name,
+            "filenames": [directory + name for directory, name in self.filenames],
+            "exec_count": self.exec_count,
+            "last_exec_times": list(self.last_exec_times),
+            "format_version": self.format_version,
+            "prefetch_hash": self.prefetch_hash,
+            "number_of_volumes": self.number_of_volumes,
+            "number_of_filenames": self.number_of_filenames,
+            "number_of_file_metrics_entries": self.number_of_file_metrics_entries,
+            "metrics": self.metric_dicts(),
+            "volumes": self.volume_dicts(),
+        }
+        if self.source_file is not None:
+            record["source_file"] = self.source_file
+            record["tags"] = list(self.tags or [])
+        return record
+
+
+def export_records(records: list) -> list:
+    """Convert the PrefetchRecord of a chunk to dicts, at the output edge.
+
+    Args:
+        records (list): Records produced by a chunk processor.
+
+    Returns:
+        list: records, with each PrefetchRecord replaced by its dict.
+    """
+    return [
+        record.to_dict() if isinstance(record, PrefetchRecord) else record
+        for record in records
+    ]
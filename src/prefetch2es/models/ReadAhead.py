@@ -0,0 +1,108 @@
+# coding: utf-8
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, Generator, Iterable, cast
+
+from prefetch2es.models.Options import DEFAULT_IO_THREADS
+
+
+class BufferedFile(object):
+    """Prefetch file whose content has already been read into memory.
+
+    Provides the parts of the Path interface used on prefetch files (open,
+    read_bytes, stat, resolve and str), so parsers, which may run in other
+    processes, never touch the underlying storage again.
+    """
+
+    def __init__(self, source: Path, data: bytes) -> None:
+        self.source = source
+        self.data = data
+
+    def __str__(self) -> str:
+        return str(self.source)
+
+    def __repr__(self) -> str:
+        return f"BufferedFile('{self.source}')"
+
+    def read_bytes(self) -> bytes:
+        return self.data
+
+    def open(self, mode: str = "rb") -> BinaryIO:
+        if mode != "rb":
+            raise ValueError(f"Buffered files are read-only: {self}")
+        return io.BytesIO(self.data)
+
+    def stat(self) -> os.stat_result:
+        return self.source.stat()
+
+    def resolve(self) -> "BufferedFile":
+        return BufferedFile(cast(Path, self.source.resolve()), self.data)
+
+
+def read_file(filepath: Path) -> BufferedFile:
+    """Read a whole prefetch file, closing it before returning.
+
+    Args:
+        filepath (Path): Prefetch file (or archive member).
+
+    Returns:
+        BufferedFile: The file with its content.
+    """
+    return BufferedFile(filepath, filepath.read_bytes())
+
+
+def read_ahead(
+    filepaths: Iterable[Path],
+    depth: int,
+    threads: int = DEFAULT_IO_THREADS,
+) -> Generator[Path, None, None]:
+    """Read prefetch files with a thread pool ahead of their consumer.
+
+    Up to depth files are being read or waiting in memory at any time,
+    which hides the per-file latency of network shares from the parsers.
+    Files are yielded in input order.
+
+    Args:
+        filepaths (Iterable[Path]): Prefetch files to read.
+        depth (int): Maximum number of files read ahead.
+        threads (int): Number of files read concurrently.
+
+    Yields:
+        Generator[Path, None, None]: BufferedFile of each file, typed as
+            Path since it is used in its place.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, min(threads, depth)))
+    pending: Deque[Future] = deque()
+    try:
+        for filepath in filepaths:
+            pending.append(executor.submit(read_file, filepath))
+            if len(pending) >= depth:
+                yield cast(Path, pending.popleft().result())
+        while pending:
+            yield cast(Path, pending.popleft().result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def gen_read_ahead(
+    filepaths: Iterable[Path],
+    depth: int,
+    threads: int = DEFAULT_IO_THREADS,
+) -> Iterable[Path]:
+    """Apply read_ahead when depth is positive.
+
+    Args:
+        filepaths (Iterable[Path]): Prefetch files to read.
+        depth (int): Maximum number of files read ahead (0 = disabled, files
+            are read by the parsers).
+        threads (int): Number of files read concurrently.
+
+    Returns:
+        Iterable[Path]: filepaths, or their BufferedFile.
+    """
+    if depth <= 0:
+        return filepaths
+    return read_ahead(filepaths, depth, threads)
@@ -0,0 +1,190 @@
+# coding: utf-8
+import sqlite3
+import threading
+from collections import deque
+from hashlib import sha1
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Union
+
+
+def calc_file_hash(filepath: Path) -> str:
+    """Calculate hash value of the file contents.
+
+    Args:
+        filepath (Path): Path to the file.
+
+    Returns:
+        str: Hash value
+    """
+    return sha1(filepath.read_bytes()).hexdigest()
+
+
+def get_ingest_target(indices: Dict[str, str]) -> str:
+    """Name the records built from each file and the indices they go to.
+
+    Args:
+        indices (Dict[str, str]): Target index of each record kind (RECORD_*).
+
+    Returns:
+        str: Ingest target, e.g. "standard:prefetch,timeline:prefetch-timeline".
+    """
+    return ",".join(f"{kind}:{index}" for kind, index in sorted(indices.items()))
+
+
+class StateStore(object):
+    """Persistent manifest of prefetch files already ingested.
+
+    Each entry is keyed by path and ingest target, which names the record
+    kinds built from the file and their indices (see get_ingest_target), so
+    a run producing other records, or sending them elsewhere, imports every
+    file again. Entries record size, mtime and a content hash, so unchanged
+    files are skipped on later runs and a modified file is imported again.
+    Methods may be called from several threads.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                path TEXT NOT NULL,
+                target TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (path, target)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def is_ingested(self, filepath: Path, target: str) -> bool:
+        """Check whether the file was already ingested into the target.
+
+        Args:
+            filepath (Path): Path to the prefetch file.
+            target (str): Ingest target (see get_ingest_target).
+
+        Returns:
+            bool: True if the file is unchanged since it was ingested.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM ingested_files"
+                " WHERE path = ? AND target = ?",
+                (str(filepath.resolve()), target),
+            ).fetchone()
+        if row is None:
+            return False
+
+        stat = filepath.stat()
+        size, mtime_ns, content_hash = row
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime_ns == mtime_ns:
+            return True
+
+        # Touched but possibly identical (e.g. copied again): compare contents
+        return calc_file_hash(filepath) == content_hash
+
+    def mark_ingested(
+        self,
+        filepaths: Iterable[Path],
+        target: str,
+        content_hashes: Optional[List[str]] = None,
+    ) -> None:
+        """Record files as successfully ingested into the target.
+
+        Args:
+            filepaths (Iterable[Path]): Paths to the prefetch files.
+            target (str): Ingest target (see get_ingest_target).
+            content_hashes (Optional[List[str]]): Content hash of each file,
+                as calculated when it was parsed. Files are read and hashed
+                again without them.
+        """
+        rows = []
+        for i, filepath in enumerate(filepaths):
+            stat = filepath.stat()
+            rows.append(
+                (
+                    str(filepath.resolve()),
+                    target,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    content_hashes[i] if content_hashes else calc_file_hash(filepath),
+                )
+            )
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def close(self) -> None:
+        """Close the manifest."""
+        with self.lock:
+            self.conn.close()
+
+
+class IngestTracker(object):
+    """Record ingest progress of parse chunks as bulk requests complete.
+
+    Documents are numbered in the order they are emitted. Each parse chunk
+    owns a contiguous range of that sequence, and bulk results are
+    acknowledged in the same order, so a chunk's files are marked as
+    ingested once every document up to its end has been acknowledged
+    without failure. An interrupted run then resumes after the last
+    completed chunk.
+    """
+
+    def __init__(self, store: StateStore, target: str) -> None:
+        self.store = store
+        self.target = target
+        self.emitted = 0
+        self.acknowledged = 0
+        # [files, content hashes, start, end, failed] of chunks not yet completed
+        self.chunks: Deque[list] = deque()
+
+    def add_chunk(
+        self,
+        filepaths: List[Path],
+        doc_count: int,
+        content_hashes: Optional[List[str]] = None,
+    ) -> None:
+        """Register the next parse chunk and the number of documents it emitted.
+
+        Args:
+            filepaths (List[Path]): Prefetch files of the chunk.
+            doc_count (int): Number of documents produced from them.
+            content_hashes (Optional[List[str]]): Content hash of each file,
+                see StateStore.mark_ingested.
+        """
+        start = self.emitted
+        self.emitted += doc_count
+        self.chunks.append([filepaths, content_hashes, start, self.emitted, False])
+
+    def acknowledge(self, doc_count: int, succeeded: bool) -> None:
+        """Acknowledge the next bulk request.
+
+        Args:
+            doc_count (int): Number of documents in the request.
+            succeeded (bool): Whether every document was indexed.
+        """
+        start = self.acknowledged
+        self.acknowledged += doc_count
+        if not succeeded:
+            for chunk in self.chunks:
+                if chunk[2] < self.acknowledged and chunk[3] > start:
+                    chunk[4] = True
+        self._flush()
+
+    def finish(self) -> None:
+        """Complete chunks that did not emit any document."""
+        self._flush()
+
+    def _flush(self) -> None:
+        while self.chunks and self.chunks[0][3] <= self.acknowledged:
+            filepaths, content_hashes, _, _, failed = self.chunks.popleft()
+            if not failed:
+                self.store.mark_ingested(filepaths, self.target, content_hashes)
@@ -0,0 +1,121 @@
+# coding: utf-8
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import DefaultDict, Dict, Generator, List, Optional
+
+
+# Stages timed in the workers by process_routed_chunk_with_stats
+WORKER_STAGES = ("parse", "build", "serialize")
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """Get the nearest-rank percentile of values.
+
+    Args:
+        values (List[float]): Sorted values.
+        rank (float): Percentile between 0 and 100.
+
+    Returns:
+        float: Percentile, 0.0 if values is empty.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(rank / 100 * len(values))) - 1))
+    return values[index]
+
+
+class RunStats(object):
+    """Cumulative timings and counters of an import run.
+
+    Stage seconds are summed over every process and thread involved, so with
+    several workers they can exceed the elapsed time. Methods may be called
+    from several threads.
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = workers
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.timings: DefaultDict[str, float] = defaultdict(float)
+        self.counters: DefaultDict[str, int] = defaultdict(int)
+        self.latencies: List[float] = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str) -> Generator[None, None, None]:
+        """Add the time spent in the block to a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.timings[stage] += seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def add_latency(self, seconds: float) -> None:
+        """Record the latency of a bulk request."""
+        with self.lock:
+            self.latencies.append(seconds)
+            self.timings["bulk"] += seconds
+
+    def merge_chunk(self, chunk_stats: Dict[str, float]) -> None:
+        """Merge statistics returned by process_routed_chunk_with_stats.
+
+        Args:
+            chunk_stats (Dict[str, float]): Statistics of a parse chunk.
+        """
+        with self.lock:
+            for stage in WORKER_STAGES:
+                self.timings[stage] += chunk_stats.get(stage, 0.0)
+            self.timings["worker_busy"] += chunk_stats.get("busy", 0.0)
+            self.counters["files"] += int(chunk_stats.get("files", 0))
+            self.counters["documents"] += int(chunk_stats.get("documents", 0))
+            self.counters["serialized_bytes"] += int(chunk_stats.get("bytes", 0))
+            self.counters["cache_hits"] += int(chunk_stats.get("cache_hits", 0))
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        """Get the statistics as a JSON-serializable dict."""
+        with self.lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+            latencies = sorted(self.latencies)
+            timings = dict(self.timings)
+            counters = dict(self.counters)
+
+        def per_second(value: float) -> float:
+            return value / elapsed if elapsed > 0 else 0.0
+
+        worker_busy = timings.pop("worker_busy", 0.0)
+        return {
+            "elapsed_seconds": elapsed,
+            "workers": self.workers,
+            "files": counters.get("files", 0),
+            "documents": counters.get("documents", 0),
+            "files_per_second": per_second(counters.get("files", 0)),
+            "documents_per_second": per_second(counters.get("documents", 0)),
+            "serialized_bytes": counters.get("serialized_bytes", 0),
+            "parse_cache_hits": counters.get("cache_hits", 0),
+            "bulk_requests": counters.get("bulk_requests", 0),
+            "bytes_sent": counters.get("bytes_sent", 0),
+            "retried_documents": counters.get("retried_documents", 0),
+            "stage_seconds": timings,
+            "bulk_latency_seconds": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else 0.0,
+            },
+            "worker_utilization": (
+                worker_busy / (elapsed * self.workers) if elapsed > 0 else 0.0
+            ),
+        }
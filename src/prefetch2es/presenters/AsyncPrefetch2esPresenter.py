@@ -0,0 +1,253 @@
+# coding: utf-8
+import asyncio
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from prefetch2es.models.Prefetch2es import (
+    EXECUTOR_PROCESS,
+    EXECUTOR_THREAD,
+    Prefetch2es,
+    SerializedRecord,
+    gen_chunks,
+    preload_worker,
+    resolve_executor,
+)
+from prefetch2es.models.AsyncElasticsearchUtils import AsyncElasticsearchUtils
+from prefetch2es.models.ElasticsearchUtils import BulkBodyBuilder, gen_bulk_documents
+from prefetch2es.models.StateStore import IngestTracker, StateStore
+from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+
+
+# Target index and records of each record kind of a parse chunk
+IndexBatches = List[Tuple[str, List[SerializedRecord]]]
+
+# Files of a parse chunk, their content hashes and their records
+ParsedChunk = Tuple[List[Path], List[str], IndexBatches]
+
+
+class AsyncPrefetch2esPresenter(Prefetch2esPresenter):
+    """asyncio ingestion engine.
+
+    Prefetch files are parsed in an executor and the resulting batches are
+    handed over a bounded asyncio.Queue to a sender task, which assembles
+    _bulk bodies from their records and keeps up to bulk_threads requests in
+    flight using AsyncElasticsearch, so the event loop is never blocked.
+    """
+
+    def __init__(self, *args, queue_size: int = 4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue_size = queue_size
+
+    async def _produce(
+        self,
+        queue: "asyncio.Queue[Optional[ParsedChunk]]",
+        executor: Optional[Executor],
+        store: Optional[StateStore],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        process_func = self._get_chunk_processor()
+        max_inflight = self.max_inflight or self._get_worker_count() * 2
+
+        # Directory walks, archive extraction, read-ahead and manifest lookups
+        # block, so chunks are pulled from a thread of their own, which is
+        # also the only one ever advancing the generator
+        chunks = gen_chunks(
+            self.parse_chunk,
+            self._gen_input_files(self._create_prefetch2es(store)),
+            self._get_worker_count(),
+        )
+        discovery = ThreadPoolExecutor(max_workers=1)
+
+        # Keep up to max_inflight chunks parsing while preserving input order
+        pending: Deque[Tuple[List[Path], asyncio.Future]] = deque()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(discovery, next, chunks, None)
+                if chunk is None:
+                    break
+                pending.append(
+                    (chunk, loop.run_in_executor(executor, process_func, chunk))
+                )
+                if len(pending) >= max_inflight:
+                    chunk, future = pending.popleft()
+                    await queue.put(self._to_queue_item(chunk, await future))
+
+            while pending:
+                chunk, future = pending.popleft()
+                await queue.put(self._to_queue_item(chunk, await future))
+            await queue.put(None)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            # Queued behind a next() still running, if cancelled meanwhile
+            discovery.submit(chunks.close)
+            discovery.shutdown(wait=False)
+
+    def _to_queue_item(self, chunk: List[Path], result: tuple) -> ParsedChunk:
+        routed, chunk_stats, hashes = result
+        self.stats.merge_chunk(chunk_stats)
+        return chunk, hashes, self._to_index_batches(routed)
+
+    async def _consume(
+        self,
+        queue: "asyncio.Queue[Optional[ParsedChunk]]",
+        es: AsyncElasticsearchUtils,
+        totals: dict,
+        tracker: Optional[IngestTracker],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        # The manifest is written outside of the event loop, by one thread so
+        # that the tracker sees chunks and acknowledgements in order
+        manifest = ThreadPoolExecutor(max_workers=1)
+        # Bodies are assembled from the record stream across parse chunks,
+        # as in bulk_import, and sent with up to bulk_threads in flight
+        builder = BulkBodyBuilder(self.chunk_size, self.max_bytes, es.throttle)
+        # Number of documents and task of each request, in submission order
+        pending: Deque[Tuple[int, "asyncio.Task[tuple]"]] = deque()
+
+        async def acknowledge() -> None:
+            doc_count, task = pending.popleft()
+            succeeded = False
+            try:
+                success, failed = await task
+                totals["success"] += success
+                totals["failed"].extend(failed)
+                totals["batches"] += 1
+                succeeded = not failed
+            except Exception:
+                if self.logger:
+                    self.logger("Error occurred during bulk indexing", self.is_quiet)
+                traceback.print_exc()
+            if tracker is not None:
+                await loop.run_in_executor(
+                    manifest, tracker.acknowledge, doc_count, succeeded
+                )
+
+        async def submit(lines: Optional[List[bytes]]) -> None:
+            if lines is None:
+                return
+            pending.append(
+                (len(lines) // 2, asyncio.create_task(self._send_body(es, lines)))
+            )
+            if len(pending) >= max(1, self.bulk_threads):
+                await acknowledge()
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                filepaths, hashes, batches = item
+                if tracker is not None:
+                    await loop.run_in_executor(
+                        manifest,
+                        tracker.add_chunk,
+                        filepaths,
+                        sum(len(records) for _, records in batches),
+                        hashes,
+                    )
+                for action, source in gen_bulk_documents(batches, self.pipeline):
+                    await submit(builder.add(action, source))
+
+            await submit(builder.flush())
+            while pending:
+                await acknowledge()
+            if tracker is not None:
+                await loop.run_in_executor(manifest, tracker.finish)
+        finally:
+            for _, task in pending:
+                task.cancel()
+            manifest.shutdown()
+
+    async def _send_body(
+        self, es: AsyncElasticsearchUtils, lines: List[bytes]
+    ) -> tuple:
+        self.stats.count("bulk_requests")
+        self.stats.count("bytes_sent", sum(len(line) + 1 for line in lines))
+        started = time.perf_counter()
+        try:
+            return await es.bulk_body(lines)
+        finally:
+            self.stats.add_latency(time.perf_counter() - started)
+
+    def _create_executor(self) -> Optional[Executor]:
+        # Parsing runs in worker processes or threads; inline parsing still
+        # runs in the loop's default thread pool executor, so that the event
+        # loop is never blocked.
+        backend = resolve_executor(self.multiprocess, self.executor)
+        if backend == EXECUTOR_PROCESS:
+            return ProcessPoolExecutor(
+                max_workers=self._get_worker_count(),
+                mp_context=Prefetch2es.get_multiprocessing_context(),
+                initializer=preload_worker,
+            )
+        if backend == EXECUTOR_THREAD:
+            return ThreadPoolExecutor(max_workers=self._get_worker_count())
+        return None
+
+    async def async_bulk_import(self) -> dict:
+        self._start_stats()
+        store = StateStore(self.state_file) if self.state_file else None
+        tracker = (
+            IngestTracker(store, self._get_ingest_target())
+            if store is not None
+            else None
+        )
+        es = AsyncElasticsearchUtils(
+            hostname=self.host,
+            port=self.port,
+            scheme=self.scheme,
+            login=self.login,
+            pwd=self.pwd,
+            connections=max(10, self.bulk_threads),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_bytes,
+            max_retries=self.max_retries,
+            retry_wait=self.retry_wait,
+            throttle=self._create_throttle(),
+        )
+        queue: "asyncio.Queue[Optional[ParsedChunk]]" = asyncio.Queue(
+            maxsize=max(1, self.queue_size)
+        )
+        totals: dict = {"success": 0, "failed": [], "batches": 0}
+        # Settings of the concrete indices of each tuned target, restored even
+        # if the import fails
+        tuned: Dict[str, Dict[str, dict]] = {}
+
+        executor = self._create_executor()
+        try:
+            for name, template in self._get_index_templates():
+                await es.put_index_template(name, template)
+                self._log_template(name)
+            for index_name in self._get_tuned_indices():
+                tuned[index_name] = await es.tune_for_ingest(index_name)
+                self._log_tuned(index_name, tuned[index_name])
+            # Either task failing cancels the other, e.g. the producer waiting
+            # on the full queue once the consumer is gone
+            try:
+                async with asyncio.TaskGroup() as tasks:
+                    tasks.create_task(self._produce(queue, executor, store))
+                    tasks.create_task(self._consume(queue, es, totals, tracker))
+            except BaseExceptionGroup as group:
+                raise group.exceptions[0]
+        finally:
+            if executor is not None:
+                # Waits for the chunks being parsed, away from the event loop
+                await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+            for index_name, settings in tuned.items():
+                try:
+                    await es.restore_settings(index_name, settings)
+                except Exception:
+                    self._log_restore_error(index_name, settings)
+            await es.close()
+            if store is not None:
+                store.close()
+
+        self.stats.count("retried_documents", es.retried_documents)
+        self._log_throttle(es.throttle)
+        self._log_summary(totals["batches"], totals["success"], totals["failed"])
+        return self._report_stats()
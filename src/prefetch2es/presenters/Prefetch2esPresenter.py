@@ -1,16 +1,68 @@
 # coding: utf-8
+import time
 import traceback
+from collections import deque
+from functools import partial
 from pathlib import Path
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from prefetch2es.models.Prefetch2es import Prefetch2es
-from prefetch2es.models.ElasticsearchUtils import ElasticsearchUtils
+import orjson
+from tqdm import tqdm
+
+from prefetch2es.models.Options import (
+    AUTO_CHUNK_SIZE,
+    DEFAULT_CACHE_BYTES,
+    DEFAULT_IO_THREADS,
+    DEFAULT_MAX_CHUNK_BYTES,
+    DEFAULT_SHARD_BYTES,
+    DEFAULT_TARGET_LATENCY,
+    EXECUTOR_INLINE,
+    resolve_executor,
+)
+from prefetch2es.models.Prefetch2es import (
+    RECORD_FILE,
+    RECORD_STANDARD,
+    RECORD_TIMELINE,
+    ChunkProcessor,
+    Prefetch2es,
+    SerializedRecord,
+    StatsChunkResult,
+    WorkerPool,
+    process_routed_chunk_with_stats,
+)
+from prefetch2es.models.ElasticsearchUtils import (
+    INGEST_SETTINGS,
+    ElasticsearchUtils,
+    gen_bulk_bodies,
+)
+from prefetch2es.models.IndexTemplate import build_index_template, get_template_name
+from prefetch2es.models.BulkFiles import BulkFileWriter
+from prefetch2es.models.StateStore import (
+    IngestTracker,
+    StateStore,
+    get_ingest_target,
+)
+from prefetch2es.models.BulkThrottle import BulkThrottle
+from prefetch2es.models.ParseCache import prune_cache_directory
+from prefetch2es.models.ReadAhead import gen_read_ahead
+from prefetch2es.models.Stats import RunStats
 
 
 class Prefetch2esPresenter(object):
 
     def __init__(
         self,
-        input_path: Path,
+        input_path: Union[Path, List[Path]],
         host: str = "localhost",
         port: int = 9200,
         index: str = "prefetch2es",
@@ -21,9 +73,38 @@ class Prefetch2esPresenter(object):
         is_quiet: bool = False,
         multiprocess: bool = False,
         chunk_size: int = 500,
+        max_inflight: int = 0,
         logger=None,
         timeline_mode: bool = False,
         tags: str = "",
+        bulk_threads: int = 1,
+        max_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+        state_file: str = "",
+        slim_timeline: bool = False,
+        files_index: str = "",
+        timeline_index: str = "",
+        bulk_output: str = "",
+        compression: str = "",
+        shard_bytes: int = DEFAULT_SHARD_BYTES,
+        overwrite: bool = False,
+        stats_file: str = "",
+        recursive: bool = False,
+        scan_threads: int = 1,
+        read_ahead: int = 0,
+        io_threads: int = DEFAULT_IO_THREADS,
+        parse_cache: int = 0,
+        parse_cache_dir: str = "",
+        parse_cache_bytes: int = DEFAULT_CACHE_BYTES,
+        max_retries: int = 3,
+        retry_wait: float = 1.0,
+        adaptive: bool = False,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        parse_chunk: int = AUTO_CHUNK_SIZE,
+        pool: Optional[WorkerPool] = None,
+        executor: str = "",
+        workers: int = 0,
+        index_template: bool = False,
+        tune_index: bool = False,
     ):
         self.input_path = input_path
         self.host = host
@@ -36,35 +117,201 @@ class Prefetch2esPresenter(object):
         self.is_quiet = is_quiet
         self.multiprocess = multiprocess
         self.chunk_size = chunk_size
+        self.max_inflight = max_inflight
         self.logger = logger
         self.timeline_mode = timeline_mode
         self.tags = tags
+        self.bulk_threads = bulk_threads
+        self.max_bytes = max_bytes
+        self.state_file = state_file
+        self.slim_timeline = slim_timeline
+        self.timeline_index = timeline_index
+        self.files_index = files_index or f"{timeline_index or index}-files"
+        self.bulk_output = bulk_output
+        self.compression = compression
+        self.shard_bytes = shard_bytes
+        self.overwrite = overwrite
+        self.stats_file = stats_file
+        self.recursive = recursive
+        self.scan_threads = scan_threads
+        self.read_ahead = read_ahead
+        self.io_threads = io_threads
+        self.parse_cache = parse_cache
+        self.parse_cache_dir = parse_cache_dir
+        self.parse_cache_bytes = parse_cache_bytes
+        self.max_retries = max_retries
+        self.retry_wait = retry_wait
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.parse_chunk = parse_chunk
+        self.pool = pool
+        self.executor = executor
+        self.workers = workers
+        self.index_template = index_template
+        self.tune_index = tune_index
+        self.stats = RunStats()
 
-    def prefetch2es(self):
-        prefetch2es = Prefetch2es(self.input_path)
+        # Templates are named after their index, so record kinds sharing
+        # an index would install the mappings of the last kind only
+        indices = list(self._get_record_indices().values())
+        if index_template and len(set(indices)) < len(indices):
+            raise ValueError(
+                "Index templates need a separate index per record kind: "
+                + ", ".join(indices)
+            )
 
-        # Timeline mode uses specialized record generation
-        if self.timeline_mode:
-            for records in prefetch2es.gen_timeline_records(
-                multiprocess=self.multiprocess,
-                chunk_size=self.chunk_size,
-                tags=self.tags,
-            ):
-                yield records
+    def _create_prefetch2es(self, store: Optional[StateStore]) -> Prefetch2es:
+        # Files already ingested as the same records into the same indices
+        # are skipped
+        skip = (
+            partial(store.is_ingested, target=self._get_ingest_target())
+            if store is not None
+            else None
+        )
+        return Prefetch2es(
+            self.input_path,
+            skip=skip,
+            recursive=self.recursive,
+            scan_threads=self.scan_threads,
+            pool=self.pool,
+        )
+
+    def _gen_discovered(
+        self, prefetch2es: Prefetch2es, progress: Optional[tqdm] = None
+    ) -> Generator[Path, None, None]:
+        # Files are parsed while directories are still being searched, so
+        # the progress bar total grows as files are found
+        filepaths = prefetch2es.iter_prefetch_files()
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                filepath = next(filepaths, None)
+                elapsed += time.perf_counter() - started
+                if filepath is None:
+                    return
+                if progress is not None:
+                    progress.total += 1
+                yield filepath
+        finally:
+            self.stats.add_time("discovery", elapsed)
+
+    def _gen_input_files(
+        self, prefetch2es: Prefetch2es, progress: Optional[tqdm] = None
+    ) -> Iterable[Path]:
+        # With read-ahead, parsers receive files already read into memory
+        return gen_read_ahead(
+            self._gen_discovered(prefetch2es, progress),
+            self.read_ahead,
+            self.io_threads,
+        )
+
+    def _start_stats(self) -> None:
+        self.stats = RunStats(workers=self._get_worker_count())
+
+    def _get_worker_count(self) -> int:
+        if resolve_executor(self.multiprocess, self.executor) == EXECUTOR_INLINE:
+            return 1
+        if self.pool is not None:
+            return self.pool.workers
+        return self.workers or Prefetch2es.get_cpu_count()
+
+    def _create_progress(self) -> tqdm:
+        return tqdm(total=0, unit="files", disable=self.is_quiet)
+
+    def _send_timed(
+        self, send: Callable[[List[bytes]], tuple], lines: List[bytes]
+    ) -> tuple:
+        started = time.perf_counter()
+        try:
+            return send(lines)
+        finally:
+            self.stats.add_latency(time.perf_counter() - started)
+
+    def _get_record_indices(self) -> Dict[str, str]:
+        # Target index of each record kind built from a prefetch file
+        if self.timeline_index:
+            # Dual output: both record shapes from a single parse
+            indices = {
+                RECORD_STANDARD: self.index,
+                RECORD_TIMELINE: self.timeline_index,
+            }
+        elif self.timeline_mode:
+            indices = {RECORD_TIMELINE: self.index}
         else:
-            for records in prefetch2es.gen_records(
-                multiprocess=self.multiprocess,
-                chunk_size=self.chunk_size,
-            ):
-                yield records
+            return {RECORD_STANDARD: self.index}
+        if self.slim_timeline:
+            indices[RECORD_FILE] = self.files_index
+        return indices
+
+    def _get_ingest_target(self) -> str:
+        return get_ingest_target(self._get_record_indices())
+
+    def _get_chunk_processor(self) -> ChunkProcessor[StatsChunkResult]:
+        # The manifest reuses the content hashes calculated by the workers
+        return partial(
+            process_routed_chunk_with_stats,
+            kinds=tuple(self._get_record_indices()),
+            tags=self.tags,
+            serialized=True,
+            cache_entries=self.parse_cache,
+            cache_dir=self.parse_cache_dir,
+            hash_files=bool(self.state_file),
+        )
+
+    def _to_index_batches(
+        self, routed: Dict[str, List[SerializedRecord]]
+    ) -> List[Tuple[str, List[SerializedRecord]]]:
+        indices = self._get_record_indices()
+        return [(indices[kind], records) for kind, records in routed.items()]
+
+    def _gen_serialized_records(
+        self,
+        prefetch2es: Prefetch2es,
+        tracker: Optional[IngestTracker],
+        progress: Optional[tqdm] = None,
+    ) -> Generator[Tuple[str, List[SerializedRecord]], None, None]:
+        for filepaths, (routed, chunk_stats, hashes) in prefetch2es.gen_file_records(
+            self._get_chunk_processor(),
+            multiprocess=self.multiprocess,
+            chunk_size=self.parse_chunk,
+            max_inflight=self.max_inflight,
+            workers=self.workers,
+            filepaths=self._gen_input_files(prefetch2es, progress),
+            executor=self.executor,
+        ):
+            self.stats.merge_chunk(chunk_stats)
+            if progress is not None:
+                progress.update(len(filepaths))
+            if tracker is not None:
+                tracker.add_chunk(
+                    filepaths,
+                    sum(len(records) for records in routed.values()),
+                    hashes,
+                )
+            yield from self._to_index_batches(routed)
+
+    def bulk_import(self) -> dict:
+        self._start_stats()
+        store = StateStore(self.state_file) if self.state_file else None
+        tracker = (
+            IngestTracker(store, self._get_ingest_target())
+            if store is not None
+            else None
+        )
 
-    def bulk_import(self):
         es = ElasticsearchUtils(
             hostname=self.host,
             port=self.port,
             scheme=self.scheme,
             login=self.login,
             pwd=self.pwd,
+            connections=max(10, self.bulk_threads),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_bytes,
+            max_retries=self.max_retries,
+            retry_wait=self.retry_wait,
+            throttle=self._create_throttle(),
         )
 
         # Buffer for collecting results
@@ -72,19 +319,218 @@ class Prefetch2esPresenter(object):
         total_failed = []
         batch_count = 0
 
-        for records in self.prefetch2es():
-            try:
-                success, failed = es.bulk_indice(records, self.index, self.pipeline)
-                total_success += success
-                if failed:
-                    total_failed.extend(failed)
+        # Records are serialized and hashed in the workers; bulk requests are
+        # assembled from those bytes, bounded by document count and payload size
+        prefetch2es = self._create_prefetch2es(store)
+        progress = self._create_progress()
+        batches = es.gen_bulk_batches(
+            self._gen_serialized_records(prefetch2es, tracker, progress),
+            self.pipeline,
+        )
+
+        # Number of documents of each submitted request, in submission order
+        doc_counts: Deque[int] = deque()
+        # Settings of the concrete indices of each tuned target, restored even
+        # if the import fails
+        tuned: Dict[str, Dict[str, dict]] = {}
+
+        def count_documents(
+            batches: Generator[List[bytes], None, None],
+        ) -> Generator[List[bytes], None, None]:
+            for lines in batches:
+                doc_counts.append(len(lines) // 2)
+                self.stats.count("bulk_requests")
+                self.stats.count("bytes_sent", sum(len(line) + 1 for line in lines))
+                yield lines
+
+        try:
+            self._prepare_indices(es, tuned)
+            for future in es.bulk_indice_concurrent(
+                count_documents(batches),
+                self.bulk_threads,
+                send=partial(self._send_timed, es.bulk_body),
+            ):
+                doc_count = doc_counts.popleft()
+                try:
+                    success, failed = future.result()
+                    total_success += success
+                    if failed:
+                        total_failed.extend(failed)
+                    batch_count += 1
+                    if tracker is not None:
+                        tracker.acknowledge(doc_count, succeeded=not failed)
+
+                except Exception:
+                    if tracker is not None:
+                        tracker.acknowledge(doc_count, succeeded=False)
+                    if self.logger:
+                        self.logger(
+                            "Error occurred during bulk indexing", self.is_quiet
+                        )
+                    traceback.print_exc()
+
+            if tracker is not None:
+                tracker.finish()
+        finally:
+            progress.close()
+            if store is not None:
+                store.close()
+            for index_name, settings in tuned.items():
+                try:
+                    es.restore_settings(index_name, settings)
+                except Exception:
+                    self._log_restore_error(index_name, settings)
+
+        self.stats.count("retried_documents", es.retried_documents)
+        self._log_throttle(es.throttle)
+        self._log_summary(batch_count, total_success, total_failed)
+        return self._report_stats()
+
+    def _get_index_templates(self) -> List[Tuple[str, dict]]:
+        # Name and body of the template of each target index
+        if not self.index_template:
+            return []
+        return [
+            (get_template_name(index_name), build_index_template(kind, index_name))
+            for kind, index_name in self._get_record_indices().items()
+        ]
+
+    def _get_tuned_indices(self) -> List[str]:
+        if not self.tune_index:
+            return []
+        return list(dict.fromkeys(self._get_record_indices().values()))
+
+    def _prepare_indices(
+        self, es: ElasticsearchUtils, tuned: Dict[str, Dict[str, dict]]
+    ) -> None:
+        # Templates only apply to indices created afterwards, so they are
+        # installed before tune_for_ingest creates the missing indices
+        for name, template in self._get_index_templates():
+            es.put_index_template(name, template)
+            self._log_template(name)
+        for index_name in self._get_tuned_indices():
+            tuned[index_name] = es.tune_for_ingest(index_name)
+            self._log_tuned(index_name, tuned[index_name])
+
+    def _log_template(self, name: str) -> None:
+        if self.logger:
+            self.logger(
+                f"Index template {name} installed (existing indices keep their"
+                " mappings)",
+                self.is_quiet,
+            )
+
+    def _log_tuned(self, index_name: str, settings: Dict[str, dict]) -> None:
+        # The previous values are logged to restore them by hand should the
+        # process be killed before the end of the import
+        if self.logger:
+            self.logger(
+                f"Ingest settings applied to {index_name}:"
+                f" {orjson.dumps(INGEST_SETTINGS).decode()}"
+                f" (previously {orjson.dumps(settings).decode()})",
+                self.is_quiet,
+            )
+
+    def _log_restore_error(self, index_name: str, settings: dict) -> None:
+        if self.logger:
+            self.logger(
+                f"Error occurred restoring the settings of {index_name}:"
+                f" {orjson.dumps(settings).decode()}",
+                self.is_quiet,
+            )
+        traceback.print_exc()
+
+    def _create_throttle(self) -> Optional[BulkThrottle]:
+        if not self.adaptive:
+            return None
+        return BulkThrottle(
+            self.chunk_size, self.bulk_threads, target_latency=self.target_latency
+        )
+
+    def _log_throttle(self, throttle: Optional[BulkThrottle]) -> None:
+        if throttle is not None and self.logger:
+            self.logger(
+                f"Adaptive bulk: slowed down {throttle.decreases} times, ending at"
+                f" {throttle.batch_size} documents per request and"
+                f" {throttle.concurrency} concurrent requests",
+                self.is_quiet,
+            )
+
+    def export_bulk_files(self) -> dict:
+        # Request bodies are written under bulk_output instead of being sent,
+        # to be replayed later by prefetch2es-replay
+        self._start_stats()
+        batch_count = 0
+        doc_count = 0
+        prefetch2es = self._create_prefetch2es(None)
+        with BulkFileWriter(
+            self.bulk_output,
+            self.index,
+            self.compression,
+            self.shard_bytes,
+            overwrite=self.overwrite,
+        ) as writer, self._create_progress() as progress:
+            for lines in gen_bulk_bodies(
+                self._gen_serialized_records(prefetch2es, None, progress),
+                self.pipeline,
+                self.chunk_size,
+                self.max_bytes,
+            ):
+                with self.stats.measure("write"):
+                    writer.write(lines)
                 batch_count += 1
+                doc_count += len(lines) // 2
+
+        if self.logger:
+            self.logger(
+                f"Bulk export completed: {batch_count} batches, {doc_count} documents"
+                f" written to {len(writer.paths)} files",
+                self.is_quiet,
+            )
+        return self._report_stats()
+
+    def _prune_parse_cache(self) -> None:
+        # Entries are only added during a run, so the size cap is enforced
+        # once at the end instead of by every worker
+        if not self.parse_cache_dir:
+            return
+        deleted = prune_cache_directory(self.parse_cache_dir, self.parse_cache_bytes)
+        if deleted and self.logger:
+            self.logger(f"Parse cache: {deleted} entries pruned", self.is_quiet)
 
-            except Exception:
-                if self.logger:
-                    self.logger("Error occurred during bulk indexing", self.is_quiet)
-                traceback.print_exc()
+    def _report_stats(self) -> dict:
+        self.stats.finish()
+        self._prune_parse_cache()
+        summary = self.stats.summary()
+        if self.logger:
+            self.logger(
+                f"Throughput: {summary['files_per_second']:.1f} files/s,"
+                f" {summary['documents_per_second']:.1f} documents/s",
+                self.is_quiet,
+            )
+            if self.parse_cache or self.parse_cache_dir:
+                self.logger(
+                    f"Parse cache hits: {summary['parse_cache_hits']}"
+                    f" of {summary['files']} files",
+                    self.is_quiet,
+                )
+            self.logger(
+                "Stage times: "
+                + ", ".join(
+                    f"{stage} {seconds:.2f}s"
+                    for stage, seconds in summary["stage_seconds"].items()
+                ),
+                self.is_quiet,
+            )
+        if self.stats_file:
+            Path(self.stats_file).write_bytes(
+                orjson.dumps(summary, option=orjson.OPT_INDENT_2)
+            )
+        return summary
 
+    def _log_summary(
+        self, batch_count: int, total_success: int, total_failed: List[dict]
+    ) -> None:
         # Log summary results after tqdm completes
         if self.logger:
             self.logger(
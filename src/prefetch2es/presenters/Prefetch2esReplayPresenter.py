@@ -0,0 +1,106 @@
+# coding: utf-8
+import traceback
+from pathlib import Path
+from typing import List
+
+from prefetch2es.models.BulkFiles import list_bulk_files, read_bulk_files
+from prefetch2es.models.BulkThrottle import BulkThrottle
+from prefetch2es.models.ElasticsearchUtils import ElasticsearchUtils, chunk_bulk_lines
+from prefetch2es.models.Options import DEFAULT_MAX_CHUNK_BYTES, DEFAULT_TARGET_LATENCY
+
+
+class Prefetch2esReplayPresenter(object):
+
+    def __init__(
+        self,
+        input_path: List[Path],
+        host: str = "localhost",
+        port: int = 9200,
+        scheme: str = "http",
+        login: str = "",
+        pwd: str = "",
+        is_quiet: bool = False,
+        chunk_size: int = 500,
+        max_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+        bulk_threads: int = 1,
+        max_retries: int = 3,
+        retry_wait: float = 1.0,
+        adaptive: bool = False,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        logger=None,
+    ):
+        self.input_path = input_path
+        self.host = host
+        self.port = port
+        self.scheme = scheme
+        self.login = login
+        self.pwd = pwd
+        self.is_quiet = is_quiet
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.bulk_threads = bulk_threads
+        self.max_retries = max_retries
+        self.retry_wait = retry_wait
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.logger = logger
+
+    def replay(self) -> None:
+        es = ElasticsearchUtils(
+            hostname=self.host,
+            port=self.port,
+            scheme=self.scheme,
+            login=self.login,
+            pwd=self.pwd,
+            connections=max(10, self.bulk_threads),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_bytes,
+            max_retries=self.max_retries,
+            retry_wait=self.retry_wait,
+            throttle=(
+                BulkThrottle(
+                    self.chunk_size,
+                    self.bulk_threads,
+                    target_latency=self.target_latency,
+                )
+                if self.adaptive
+                else None
+            ),
+        )
+
+        total_success = 0
+        total_failed: List[dict] = []
+        batch_count = 0
+
+        # Action lines are replayed as written, so _id, _index and pipeline
+        # are those of the export
+        batches = chunk_bulk_lines(
+            read_bulk_files(list_bulk_files(self.input_path)),
+            self.chunk_size,
+            self.max_bytes,
+            es.throttle,
+        )
+        for future in es.bulk_indice_concurrent(batches, self.bulk_threads):
+            try:
+                success, failed = future.result()
+                total_success += success
+                total_failed.extend(failed)
+                batch_count += 1
+            except Exception:
+                if self.logger:
+                    self.logger("Error occurred during bulk indexing", self.is_quiet)
+                traceback.print_exc()
+
+        if self.logger:
+            self.logger(
+                f"Replay completed: {batch_count} batches processed", self.is_quiet
+            )
+            self.logger(
+                f"Successfully indexed: {total_success} documents", self.is_quiet
+            )
+            if total_failed:
+                self.logger(
+                    f"Failed to index: {len(total_failed)} documents", self.is_quiet
+                )
+                for failure in total_failed[:3]:  # Show first 3 failures
+                    self.logger(f"Error: {failure}", self.is_quiet)
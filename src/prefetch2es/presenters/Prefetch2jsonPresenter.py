@@ -1,11 +1,20 @@
 # coding: utf-8
-from itertools import chain
+from contextlib import ExitStack
 from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, TypeVar
 
 import orjson
-from tqdm import tqdm
 
-from prefetch2es.models.Prefetch2es import Prefetch2es
+from prefetch2es.models.Compression import COMPRESSION_SUFFIXES, open_writer
+from prefetch2es.models.Options import COMPRESSIONS, OUTPUT_FORMATS
+from prefetch2es.models.Prefetch2es import (
+    RECORD_STANDARD,
+    RECORD_TIMELINE,
+    Prefetch2es,
+)
+
+
+T = TypeVar("T")
 
 
 class Prefetch2jsonPresenter(object):
@@ -17,58 +26,154 @@ class Prefetch2jsonPresenter(object):
         is_quiet: bool = False,
         multiprocess: bool = False,
         chunk_size: int = 500,
+        max_inflight: int = 0,
         timeline_mode: bool = False,
         tags: str = "",
+        output_format: str = "json",
+        compression: str = "",
+        timeline_output_path: str = "",
+        executor: str = "",
+        workers: int = 0,
+        recursive: bool = False,
     ):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid output format: {output_format}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Invalid compression: {compression}")
+
         self.input_path = Path(input_path).resolve()
         self.output_path: Path = (
             Path(output_path)
             if output_path
-            else Path(self.input_path).with_suffix(".json")
+            else Path(self.input_path).with_suffix(
+                f".{output_format}{COMPRESSION_SUFFIXES[compression]}"
+            )
+        )
+        # Timeline events of the same parse are written here (dual output)
+        self.timeline_output_path: Optional[Path] = (
+            Path(timeline_output_path) if timeline_output_path else None
         )
         self.is_quiet = is_quiet
         self.multiprocess = multiprocess
         self.chunk_size = chunk_size
+        self.max_inflight = max_inflight
         self.timeline_mode = timeline_mode
         self.tags = tags
+        self.output_format = output_format
+        self.compression = compression
+        self.executor = executor
+        self.workers = workers
+        self.recursive = recursive
+
+    def _track(self, iterable: Iterable[T]) -> Iterable[T]:
+        # Progress bar of the chunks written, unless quiet
+        if self.is_quiet:
+            return iterable
+        from tqdm import tqdm
+
+        return tqdm(iterable)
+
+    def _open_output(self, output_path: Path) -> BinaryIO:
+        return open_writer(output_path, self.compression)
+
+    def _write_records(self, f: BinaryIO, records: List[dict], is_first: bool) -> bool:
+        """Write a chunk of records.
+
+        Args:
+            f (BinaryIO): Output file.
+            records (List[dict]): Records of the chunk.
+            is_first (bool): Nothing has been written to f yet.
+
+        Returns:
+            bool: Nothing has been written to f yet after this chunk.
+        """
+        if not records:
+            return is_first
+
+        if self.output_format == "ndjson":
+            f.write(
+                b"".join(
+                    orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+                    for record in records
+                )
+            )
+            return False
+
+        # Streams the same bytes as orjson.dumps(all_records, option=OPT_INDENT_2):
+        # each element is indented one level deeper than when dumped alone.
+        for record in records:
+            f.write(b"[\n  " if is_first else b",\n  ")
+            f.write(
+                orjson.dumps(record, option=orjson.OPT_INDENT_2).replace(
+                    b"\n", b"\n  "
+                )
+            )
+            is_first = False
+        return False
+
+    def _write_end(self, f: BinaryIO, is_first: bool) -> None:
+        if self.output_format == "json":
+            f.write(b"[]" if is_first else b"\n]")
 
     def export_json(self) -> None:
-        r = Prefetch2es(self.input_path)
+        r = Prefetch2es(self.input_path, recursive=self.recursive)
+
+        if self.timeline_output_path is not None:
+            self._export_dual(r, self.timeline_output_path)
+            return
 
         # Use unified generation function with timeline mode parameter
         if self.timeline_mode:
-            generator = (
-                r.gen_timeline_records(
-                    multiprocess=self.multiprocess,
-                    chunk_size=self.chunk_size,
-                    tags=self.tags,
-                )
-                if self.is_quiet
-                else tqdm(
-                    r.gen_timeline_records(
-                        multiprocess=self.multiprocess,
-                        chunk_size=self.chunk_size,
-                        tags=self.tags,
-                    )
-                )
+            generator = r.gen_timeline_records(
+                multiprocess=self.multiprocess,
+                chunk_size=self.chunk_size,
+                max_inflight=self.max_inflight,
+                tags=self.tags,
+                executor=self.executor,
+                workers=self.workers,
             )
         else:
-            generator = (
-                r.gen_records(
-                    multiprocess=self.multiprocess,
-                    chunk_size=self.chunk_size,
-                )
-                if self.is_quiet
-                else tqdm(
-                    r.gen_records(
-                        multiprocess=self.multiprocess,
-                        chunk_size=self.chunk_size,
-                    )
-                )
+            generator = r.gen_records(
+                multiprocess=self.multiprocess,
+                chunk_size=self.chunk_size,
+                max_inflight=self.max_inflight,
+                executor=self.executor,
+                workers=self.workers,
             )
 
-        self.output_path.write_text(
-            orjson.dumps(
-                list(chain.from_iterable(generator)), option=orjson.OPT_INDENT_2
-            ).decode("utf-8")
+        # Each chunk is written as soon as it is produced
+        with self._open_output(self.output_path) as f:
+            is_first = True
+            for records in self._track(generator):
+                is_first = self._write_records(f, records, is_first)
+            self._write_end(f, is_first)
+
+    def _export_dual(self, r: Prefetch2es, timeline_output_path: Path) -> None:
+        # Standard records and timeline events from a single parse of each file
+        generator = r.gen_routed_records(
+            (RECORD_STANDARD, RECORD_TIMELINE),
+            multiprocess=self.multiprocess,
+            chunk_size=self.chunk_size,
+            tags=self.tags,
+            max_inflight=self.max_inflight,
+            executor=self.executor,
+            workers=self.workers,
         )
+        output_paths = {
+            RECORD_STANDARD: self.output_path,
+            RECORD_TIMELINE: timeline_output_path,
+        }
+
+        with ExitStack() as stack:
+            outputs = {
+                kind: stack.enter_context(self._open_output(path))
+                for kind, path in output_paths.items()
+            }
+            is_first = dict.fromkeys(outputs, True)
+            for routed in self._track(generator):
+                for kind, records in routed.items():
+                    is_first[kind] = self._write_records(
+                        outputs[kind], records, is_first[kind]
+                    )
+            for kind, f in outputs.items():
+                self._write_end(f, is_first[kind])
@@ -2,7 +2,30 @@
 import argparse
 from abc import ABCMeta, abstractmethod
 
-from prefetch2es.models.MetaData import get_version
+from prefetch2es.models.Options import EXECUTORS
+
+
+class VersionAction(argparse.Action):
+    """--version action looking the version up only when invoked.
+
+    Reading the package metadata is slow compared to the rest of the
+    startup, and every other command line can do without it.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, help=None):
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=argparse.SUPPRESS,
+            nargs=0,
+            help=help or "show program's version number and exit",
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from prefetch2es.models.MetaData import get_version
+
+        print(get_version("prefetch2es"))
+        parser.exit()
 
 
 class BaseView(metaclass=ABCMeta):
@@ -13,7 +36,7 @@ class BaseView(metaclass=ABCMeta):
 
     def __define_common_options(self):
         self.parser.add_argument(
-            "--version", "-v", action="version", version=get_version("prefetch2es")
+            "--version", "-v", action=VersionAction
         )
         self.parser.add_argument(
             "--quiet",
@@ -21,6 +44,16 @@ class BaseView(metaclass=ABCMeta):
             action="store_true",
             help="flag to suppress standard output.",
         )
+        self.parser.add_argument(
+            "--size",
+            "-s",
+            type=int,
+            default=500,
+            help="size of the chunks: files per worker task for prefetch2json, documents per bulk request for prefetch2es and prefetch2es-replay.",
+        )
+
+    def define_parse_options(self):
+        # Options of the commands parsing prefetch files
         self.parser.add_argument(
             "--multiprocess",
             "-m",
@@ -28,11 +61,22 @@ class BaseView(metaclass=ABCMeta):
             help="flag to run multiprocessing.",
         )
         self.parser.add_argument(
-            "--size",
-            "-s",
+            "--executor",
+            choices=EXECUTORS,
+            default="",
+            help="backend parsing the files: worker processes, threads or the main thread (default: process with --multiprocess, inline otherwise).",
+        )
+        self.parser.add_argument(
+            "--workers",
             type=int,
-            default=500,
-            help="size of the chunk to be processed for each process.",
+            default=0,
+            help="number of worker processes or threads (default: 0, the CPU count).",
+        )
+        self.parser.add_argument(
+            "--max-inflight",
+            type=int,
+            default=0,
+            help="maximum number of chunks in flight in multiprocess mode (default: twice the CPU count).",
         )
 
     @abstractmethod
@@ -0,0 +1,110 @@
+# coding: utf-8
+from pathlib import Path
+
+from prefetch2es.views.BaseView import BaseView
+from prefetch2es.models.Options import DEFAULT_MAX_CHUNK_BYTES, DEFAULT_TARGET_LATENCY
+
+
+class Prefetch2esReplayView(BaseView):
+
+    def __init__(self):
+        super().__init__()
+        self.define_options()
+        self.args = self.parser.parse_args()
+
+    def define_options(self):
+        self.parser.add_argument(
+            "bulk_files",
+            nargs="+",
+            type=str,
+            help="_bulk NDJSON files written by prefetch2es --bulk-output, or directories containing them.",
+        )
+        self.parser.add_argument(
+            "--host", default="localhost", help="ElasticSearch host"
+        )
+        self.parser.add_argument(
+            "--port", default=9200, help="ElasticSearch port number"
+        )
+        self.parser.add_argument(
+            "--scheme", default="http", help="Scheme to use (http, https)"
+        )
+        self.parser.add_argument(
+            "--login", default="", help="Login to use to connect to Elastic database"
+        )
+        self.parser.add_argument(
+            "--pwd", default="", help="Password associated with the login"
+        )
+        self.parser.add_argument(
+            "--bulk-threads",
+            type=int,
+            default=4,
+            help="Number of bulk requests sent to Elasticsearch concurrently",
+        )
+        self.parser.add_argument(
+            "--max-bytes",
+            type=int,
+            default=DEFAULT_MAX_CHUNK_BYTES,
+            help="Maximum payload size of a bulk request in bytes",
+        )
+        self.parser.add_argument(
+            "--retries",
+            type=int,
+            default=3,
+            help="Number of times a failed request or rejected documents are sent again",
+        )
+        self.parser.add_argument(
+            "--retry-wait",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before the first retry, doubled on each attempt (with random jitter)",
+        )
+        self.parser.add_argument(
+            "--adaptive",
+            action="store_true",
+            help="Adapt the documents per request and concurrent requests to bulk latency and rejections, up to --size and --bulk-threads",
+        )
+        self.parser.add_argument(
+            "--target-latency",
+            type=float,
+            default=DEFAULT_TARGET_LATENCY,
+            help="With --adaptive, bulk requests slower than this many seconds shrink the batch size",
+        )
+
+    def run(self):
+        # Loaded once the arguments are parsed, so --help stays fast
+        from prefetch2es.presenters.Prefetch2esReplayPresenter import (
+            Prefetch2esReplayPresenter,
+        )
+
+        view = Prefetch2esReplayView()
+        view.log(
+            f"Currently Replaying {len(self.args.bulk_files)} paths.", self.args.quiet
+        )
+
+        Prefetch2esReplayPresenter(
+            input_path=[Path(path) for path in self.args.bulk_files],
+            host=self.args.host,
+            port=int(self.args.port),
+            scheme=self.args.scheme,
+            login=self.args.login,
+            pwd=self.args.pwd,
+            is_quiet=self.args.quiet,
+            chunk_size=int(self.args.size),
+            max_bytes=int(self.args.max_bytes),
+            bulk_threads=int(self.args.bulk_threads),
+            max_retries=int(self.args.retries),
+            retry_wait=float(self.args.retry_wait),
+            adaptive=self.args.adaptive,
+            target_latency=float(self.args.target_latency),
+            logger=self.log,
+        ).replay()
+
+        view.log("Replay completed.", self.args.quiet)
+
+
+def entry_point():
+    Prefetch2esReplayView().run()
+
+
+if __name__ == "__main__":
+    entry_point()
@@ -1,16 +1,31 @@
 # coding: utf-8
-from typing import List
+import cProfile
 from pathlib import Path
-from multiprocessing import cpu_count
+from typing import TYPE_CHECKING
 
 from prefetch2es.views.BaseView import BaseView
-from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+from prefetch2es.models.Options import (
+    COMPRESSIONS,
+    DEFAULT_CACHE_BYTES,
+    DEFAULT_IO_THREADS,
+    DEFAULT_MAX_CHUNK_BYTES,
+    DEFAULT_SHARD_BYTES,
+    DEFAULT_TARGET_LATENCY,
+    EXECUTOR_INLINE,
+    get_cpu_count,
+    parse_chunk_size,
+    resolve_executor,
+)
+
+if TYPE_CHECKING:
+    from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
 
 
 class Prefetch2esView(BaseView):
 
     def __init__(self):
         super().__init__()
+        self.define_parse_options()
         self.define_options()
         self.args = self.parser.parse_args()
 
@@ -50,48 +65,242 @@ class Prefetch2esView(BaseView):
             default="",
             help="Comma-separated tags to add to each record for identification (e.g., hostname, domain name)",
         )
+        self.parser.add_argument(
+            "--parse-chunk",
+            type=parse_chunk_size,
+            default="auto",
+            help="Number of files handed to a worker at a time, or auto to size chunks from the files left and the CPU count (default: auto)",
+        )
+        self.parser.add_argument(
+            "--bulk-threads",
+            type=int,
+            default=1,
+            help="Number of bulk requests sent to Elasticsearch concurrently",
+        )
+        self.parser.add_argument(
+            "--max-bytes",
+            type=int,
+            default=DEFAULT_MAX_CHUNK_BYTES,
+            help="Maximum payload size of a bulk request in bytes",
+        )
+        self.parser.add_argument(
+            "--retries",
+            type=int,
+            default=3,
+            help="Number of times a failed request or documents rejected with 429/503 are sent again",
+        )
+        self.parser.add_argument(
+            "--retry-wait",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before the first retry, doubled on each attempt (with random jitter)",
+        )
+        self.parser.add_argument(
+            "--adaptive",
+            action="store_true",
+            help="Adapt the documents per request and concurrent requests to bulk latency and rejections, up to --size and --bulk-threads",
+        )
+        self.parser.add_argument(
+            "--target-latency",
+            type=float,
+            default=DEFAULT_TARGET_LATENCY,
+            help="With --adaptive, bulk requests slower than this many seconds shrink the batch size",
+        )
+        self.parser.add_argument(
+            "--state-file",
+            default="",
+            help="SQLite manifest used to skip already ingested files and resume interrupted imports",
+        )
+        self.parser.add_argument(
+            "--timeline-index",
+            default="",
+            help="Also index timeline records into this index, parsing each prefetch file once",
+        )
+        self.parser.add_argument(
+            "--slim-timeline",
+            action="store_true",
+            help="With --timeline, store volumes and metrics once per file in --files-index instead of in every event",
+        )
+        self.parser.add_argument(
+            "--files-index",
+            default="",
+            help="Index of the per-file records referenced by slim timeline events (default: <timeline index>-files)",
+        )
+        self.parser.add_argument(
+            "--index-template",
+            action="store_true",
+            help="Install an index template with explicit mappings (keyword paths, date timestamps) for the target indices before importing",
+        )
+        self.parser.add_argument(
+            "--tune-index",
+            action="store_true",
+            help="Disable refresh and replicas of the target indices during the import, then restore them and refresh",
+        )
 
-    def __list_prefetch_files(self, prefetch_files: List[str]) -> List[Path]:
-        prefetch_path_list = list()
-        for prefetch_file in prefetch_files:
-            if Path(prefetch_file).is_dir():
-                prefetch_path_list.extend(Path(prefetch_file).glob("**/*.pf"))
-            else:
-                prefetch_path_list.append(Path(prefetch_file))
+        self.parser.add_argument(
+            "--bulk-output",
+            default="",
+            help="Write ready-to-send _bulk NDJSON files into this directory instead of importing (replay them with prefetch2es-replay)",
+        )
+        self.parser.add_argument(
+            "--compress",
+            choices=[c for c in COMPRESSIONS if c],
+            default="",
+            help="Compress the files written by --bulk-output",
+        )
+        self.parser.add_argument(
+            "--shard-bytes",
+            type=int,
+            default=DEFAULT_SHARD_BYTES,
+            help="Uncompressed size in bytes after which --bulk-output starts a new file",
+        )
+        self.parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Delete the bulk files already in the --bulk-output directory instead of refusing to write there",
+        )
 
-        return prefetch_path_list
+        self.parser.add_argument(
+            "--scan-threads",
+            type=int,
+            default=1,
+            help="Number of directories searched concurrently (useful on network filesystems)",
+        )
+        self.parser.add_argument(
+            "--read-ahead",
+            type=int,
+            default=0,
+            help="Number of files read into memory ahead of the parsers, so parsing never waits on network shares (0 = disabled)",
+        )
+        self.parser.add_argument(
+            "--io-threads",
+            type=int,
+            default=DEFAULT_IO_THREADS,
+            help="Number of files read concurrently by --read-ahead",
+        )
+        self.parser.add_argument(
+            "--parse-cache",
+            type=int,
+            default=0,
+            help="Number of parsed files each process keeps in memory, so byte-identical files are parsed once (0 = disabled)",
+        )
+        self.parser.add_argument(
+            "--parse-cache-dir",
+            default="",
+            help="Also keep parsed files in this directory, shared by workers and later runs",
+        )
+        self.parser.add_argument(
+            "--parse-cache-bytes",
+            type=int,
+            default=DEFAULT_CACHE_BYTES,
+            help="Size cap of --parse-cache-dir; least recently used entries are removed after each run",
+        )
+        self.parser.add_argument(
+            "--stats-json",
+            default="",
+            help="Write run statistics (stage timings, throughput, bulk latency) to this JSON file",
+        )
+        self.parser.add_argument(
+            "--profile",
+            default="",
+            help="Profile the run with cProfile and write the stats to this file (inspect with python -m pstats)",
+        )
 
     def run(self):
+        # Loaded once the arguments are parsed, so --help stays fast
+        from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+
         view = Prefetch2esView()
-        prefetch_files = self.__list_prefetch_files(self.args.prefetch_files)
+        prefetch_files = [Path(path) for path in self.args.prefetch_files]
 
-        if self.args.multiprocess:
-            view.log(f"Multi-Process: {cpu_count()}", self.args.quiet)
+        executor = resolve_executor(self.args.multiprocess, self.args.executor)
+        if executor != EXECUTOR_INLINE:
+            view.log(
+                f"Executor: {executor}, workers: {self.args.workers or get_cpu_count()}",
+                self.args.quiet,
+            )
 
         if self.args.timeline:
             view.log("Timeline analysis mode enabled", self.args.quiet)
 
-        for prefetch_file in prefetch_files:
-            view.log(f"Currently Importing {prefetch_file}.", self.args.quiet)
-
-            Prefetch2esPresenter(
-                input_path=prefetch_file,
-                host=self.args.host,
-                port=int(self.args.port),
-                index=self.args.index,
-                scheme=self.args.scheme,
-                pipeline=self.args.pipeline,
-                login=self.args.login,
-                pwd=self.args.pwd,
-                is_quiet=self.args.quiet,
-                multiprocess=self.args.multiprocess,
-                chunk_size=int(self.args.size),
-                logger=self.log,
-                timeline_mode=self.args.timeline,
-                tags=self.args.tags,
-            ).bulk_import()
-
-        view.log("Import completed.", self.args.quiet)
+        if self.args.timeline_index:
+            view.log(
+                f"Timeline records are imported into {self.args.timeline_index}",
+                self.args.quiet,
+            )
+
+        # Directories are searched while files are being imported
+        view.log(
+            f"Currently Importing {len(prefetch_files)} paths.", self.args.quiet
+        )
+
+        # A single session (client, worker pool and batch stream) covers all inputs
+        presenter = Prefetch2esPresenter(
+            input_path=prefetch_files,
+            host=self.args.host,
+            port=int(self.args.port),
+            index=self.args.index,
+            scheme=self.args.scheme,
+            pipeline=self.args.pipeline,
+            login=self.args.login,
+            pwd=self.args.pwd,
+            is_quiet=self.args.quiet,
+            multiprocess=self.args.multiprocess,
+            executor=self.args.executor,
+            workers=int(self.args.workers),
+            chunk_size=int(self.args.size),
+            max_inflight=int(self.args.max_inflight),
+            logger=self.log,
+            timeline_mode=self.args.timeline,
+            tags=self.args.tags,
+            bulk_threads=int(self.args.bulk_threads),
+            max_bytes=int(self.args.max_bytes),
+            state_file=self.args.state_file,
+            slim_timeline=self.args.slim_timeline,
+            files_index=self.args.files_index,
+            timeline_index=self.args.timeline_index,
+            bulk_output=self.args.bulk_output,
+            compression=self.args.compress,
+            shard_bytes=int(self.args.shard_bytes),
+            overwrite=self.args.overwrite,
+            stats_file=self.args.stats_json,
+            recursive=True,
+            scan_threads=int(self.args.scan_threads),
+            read_ahead=int(self.args.read_ahead),
+            io_threads=int(self.args.io_threads),
+            parse_cache=int(self.args.parse_cache),
+            parse_cache_dir=self.args.parse_cache_dir,
+            parse_cache_bytes=int(self.args.parse_cache_bytes),
+            max_retries=int(self.args.retries),
+            retry_wait=float(self.args.retry_wait),
+            adaptive=self.args.adaptive,
+            target_latency=float(self.args.target_latency),
+            parse_chunk=self.args.parse_chunk,
+            index_template=self.args.index_template,
+            tune_index=self.args.tune_index,
+        )
+
+        profiler = cProfile.Profile() if self.args.profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            self.__run_presenter(view, presenter)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.args.profile)
+                # Parsing in worker processes or threads is not profiled
+                view.log(f"Profile written to {self.args.profile}", self.args.quiet)
+
+    def __run_presenter(
+        self, view: "Prefetch2esView", presenter: "Prefetch2esPresenter"
+    ) -> None:
+        if self.args.bulk_output:
+            presenter.export_bulk_files()
+            view.log("Export completed.", self.args.quiet)
+        else:
+            presenter.bulk_import()
+            view.log("Import completed.", self.args.quiet)
 
 
 def entry_point():
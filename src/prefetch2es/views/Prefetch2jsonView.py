@@ -1,14 +1,19 @@
 # coding: utf-8
-from multiprocessing import cpu_count
-
 from prefetch2es.views.BaseView import BaseView
-from prefetch2es.presenters.Prefetch2jsonPresenter import Prefetch2jsonPresenter
+from prefetch2es.models.Options import (
+    COMPRESSIONS,
+    EXECUTOR_INLINE,
+    OUTPUT_FORMATS,
+    get_cpu_count,
+    resolve_executor,
+)
 
 
 class Prefetch2jsonView(BaseView):
 
     def __init__(self):
         super().__init__()
+        self.define_parse_options()
         self.define_options()
         self.args = self.parser.parse_args()
 
@@ -33,13 +38,40 @@ class Prefetch2jsonView(BaseView):
             default="",
             help="Additional tags for timeline records (comma-separated)",
         )
+        self.parser.add_argument(
+            "--timeline-output",
+            type=str,
+            default="",
+            help="Also write timeline records to this file, parsing each prefetch file once",
+        )
+        self.parser.add_argument(
+            "--format",
+            choices=OUTPUT_FORMATS,
+            default="json",
+            help="Output format: indented JSON array or NDJSON (one record per line)",
+        )
+        self.parser.add_argument(
+            "--compress",
+            choices=[c for c in COMPRESSIONS if c],
+            default="",
+            help="Compress the output file while streaming",
+        )
 
     def run(self):
+        # Loaded once the arguments are parsed, so --help stays fast
+        from prefetch2es.presenters.Prefetch2jsonPresenter import (
+            Prefetch2jsonPresenter,
+        )
+
         view = Prefetch2jsonView()
         view.log(f"Converting {self.args.prefetch_file}.", self.args.quiet)
 
-        if self.args.multiprocess:
-            view.log(f"Multi-Process: {cpu_count()}", self.args.quiet)
+        executor = resolve_executor(self.args.multiprocess, self.args.executor)
+        if executor != EXECUTOR_INLINE:
+            view.log(
+                f"Executor: {executor}, workers: {self.args.workers or get_cpu_count()}",
+                self.args.quiet,
+            )
 
         if self.args.timeline:
             view.log("Timeline analysis mode enabled", self.args.quiet)
@@ -49,9 +81,15 @@ class Prefetch2jsonView(BaseView):
             output_path=self.args.output_file,
             is_quiet=self.args.quiet,
             multiprocess=self.args.multiprocess,
+            executor=self.args.executor,
+            workers=int(self.args.workers),
             chunk_size=self.args.size,
+            max_inflight=self.args.max_inflight,
             timeline_mode=self.args.timeline,
             tags=self.args.tags,
+            output_format=self.args.format,
+            compression=self.args.compress,
+            timeline_output_path=self.args.timeline_output,
         ).export_json()
 
         view.log("Converted.", self.args.quiet)
@@ -0,0 +1,56 @@
+# coding: utf-8
+import os
+import zipfile
+
+import pytest
+from prefetch2es.models import Archives
+from prefetch2es.models.Archives import ArchiveMember, iter_archive_members
+
+
+# utils
+MEMBER = 'C/Windows/Prefetch/CMD.EXE-D269B812.pf'
+
+def write_zip(path, data: bytes, mtime_ns: int = 0):
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr(MEMBER, data)
+    if mtime_ns:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+@pytest.fixture(autouse=True)
+def zip_handles():
+    yield
+    with Archives._zip_lock:
+        for _, handle in Archives._zip_handles.values():
+            handle.close()
+        Archives._zip_handles.clear()
+
+
+# zip handle test cases
+def test_zip_member_read_bytes(tmp_path):
+    archive = write_zip(tmp_path / 'collection.zip', b'prefetch')
+    assert [member.read_bytes() for member in iter_archive_members(archive)] == [b'prefetch']
+
+def test_zip_handle_reused(tmp_path):
+    archive = write_zip(tmp_path / 'collection.zip', b'prefetch')
+    assert Archives._open_zip(str(archive)) is Archives._open_zip(str(archive))
+
+def test_zip_replaced_archive_read_again(tmp_path):
+    archive = write_zip(tmp_path / 'collection.zip', b'prefetch', 1_000_000_000)
+    member = ArchiveMember(archive, MEMBER)
+    handle = Archives._open_zip(str(archive))
+    assert member.read_bytes() == b'prefetch'
+    write_zip(archive, b'replaced', 2_000_000_000)
+    assert member.read_bytes() == b'replaced'
+    assert handle.fp is None
+
+def test_zip_evicted_handles_closed(tmp_path):
+    archives = [
+        write_zip(tmp_path / f'{i}.zip', b'prefetch %d' % i)
+        for i in range(Archives.MAX_OPEN_ZIPS + 2)
+    ]
+    handles = [Archives._open_zip(str(archive)) for archive in archives]
+    assert len(Archives._zip_handles) == Archives.MAX_OPEN_ZIPS
+    assert [handle.fp is None for handle in handles[:3]] == [True, True, False]
+    # Evicted archives are opened again when needed
+    assert ArchiveMember(archives[0], MEMBER).read_bytes() == b'prefetch 0'
@@ -0,0 +1,102 @@
+# coding: utf-8
+import asyncio
+
+from prefetch2es.models.AsyncElasticsearchUtils import AsyncElasticsearchUtils
+from prefetch2es.models.BulkThrottle import BulkThrottle
+from prefetch2es.models.ElasticsearchUtils import INGEST_SETTINGS
+
+
+# utils
+class StubResponse(object):
+    def __init__(self, body: dict) -> None:
+        self.body = body
+
+class StubAsyncClient(object):
+    # Indexes every document, recording the number of concurrent requests
+    def __init__(self) -> None:
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def bulk(self, operations):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await asyncio.sleep(0.01)
+        self.inflight -= 1
+        return StubResponse({'items': [{'index': {'status': 201}}] * (len(operations) // 2)})
+
+class StubAsyncIndices(object):
+    # Flat settings of concrete indices, reached by name or alias
+    def __init__(self) -> None:
+        self.settings = {
+            'prefetch-1': {'index.refresh_interval': '30s'},
+            'prefetch-2': {'index.number_of_replicas': '2'},
+        }
+        self.aliases = {'prefetch': ['prefetch-1', 'prefetch-2']}
+        self.puts: list = []
+        self.refreshed: list = []
+
+    async def create(self, index):
+        pass
+
+    async def get_settings(self, index, name, flat_settings):
+        return StubResponse({
+            concrete: {'settings': dict(self.settings[concrete])}
+            for concrete in self.aliases.get(index, [index])
+        })
+
+    async def put_settings(self, index, settings):
+        assert index in self.settings, 'settings are only put on concrete indices'
+        self.puts.append((index, settings))
+
+    async def refresh(self, index):
+        self.refreshed.append(index)
+
+class StubAsyncIndicesClient(object):
+    def __init__(self) -> None:
+        self.indices = StubAsyncIndices()
+
+    def options(self, **kwargs):
+        return self
+
+async def tune_and_restore(target: str) -> tuple:
+    es = AsyncElasticsearchUtils('localhost', 9200, 'http', '', '')
+    await es.es.close()
+    es.es = StubAsyncIndicesClient()
+    previous = await es.tune_for_ingest(target)
+    await es.restore_settings(target, previous)
+    return previous, es.es.indices
+
+async def send_bodies(throttle, count: int) -> tuple:
+    es = AsyncElasticsearchUtils('localhost', 9200, 'http', '', '', throttle=throttle)
+    await es.es.close()
+    es.es = StubAsyncClient()
+    results = await asyncio.gather(*(es.bulk_body([b'a', b's']) for _ in range(count)))
+    return results, es.es.max_inflight
+
+
+# throttle test cases
+def test_bulk_body_concurrency_bounded_by_throttle():
+    throttle = BulkThrottle(500, 2)
+    results, max_inflight = asyncio.run(send_bodies(throttle, 6))
+    assert results == [(1, [])] * 6
+    assert max_inflight == 2
+
+def test_bulk_body_concurrency_without_throttle():
+    results, max_inflight = asyncio.run(send_bodies(None, 6))
+    assert results == [(1, [])] * 6
+    assert max_inflight == 6
+
+
+# tune_for_ingest test cases
+def test_tune_for_ingest_alias():
+    previous, indices = asyncio.run(tune_and_restore('prefetch'))
+    assert previous == {
+        'prefetch-1': {'index.refresh_interval': '30s', 'index.number_of_replicas': None},
+        'prefetch-2': {'index.refresh_interval': None, 'index.number_of_replicas': '2'},
+    }
+    assert indices.puts == [
+        ('prefetch-1', INGEST_SETTINGS),
+        ('prefetch-2', INGEST_SETTINGS),
+        *previous.items(),
+    ]
+    assert indices.refreshed == ['prefetch']
@@ -0,0 +1,36 @@
+# coding: utf-8
+import asyncio
+from pathlib import Path
+
+import pytest
+from prefetch2es.presenters.AsyncPrefetch2esPresenter import AsyncPrefetch2esPresenter
+
+
+# utils
+async def import_leaving_tasks(presenter: AsyncPrefetch2esPresenter) -> list:
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(presenter.async_bulk_import(), timeout=30)
+    return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+
+# teardown test cases
+def test_consumer_failure_cancels_producer(monkeypatch):
+    async def failing_consume(self, queue, es, totals, tracker):
+        # Let the producer fill the queue and block on it
+        while not queue.full():
+            await asyncio.sleep(0.01)
+        raise RuntimeError('bulk indexing failed')
+
+    monkeypatch.setattr(AsyncPrefetch2esPresenter, '_consume', failing_consume)
+    presenter = AsyncPrefetch2esPresenter(
+        input_path=[Path('tests/cache')], is_quiet=True, parse_chunk=1, queue_size=1
+    )
+    assert asyncio.run(import_leaving_tasks(presenter)) == []
+
+def test_producer_failure_cancels_consumer(monkeypatch):
+    async def failing_produce(self, queue, executor, store):
+        raise RuntimeError('discovery failed')
+
+    monkeypatch.setattr(AsyncPrefetch2esPresenter, '_produce', failing_produce)
+    presenter = AsyncPrefetch2esPresenter(input_path=[Path('tests/cache')], is_quiet=True)
+    assert asyncio.run(import_leaving_tasks(presenter)) == []
@@ -0,0 +1,74 @@
+# coding: utf-8
+import shutil
+from pathlib import Path
+
+import orjson
+import pytest
+from prefetch2es import prefetch2es, prefetch2es_replay
+from prefetch2es.models.BulkFiles import BulkFileWriter, list_bulk_files
+from prefetch2es.models.ElasticsearchUtils import ElasticsearchUtils
+
+
+# utils
+def get_prefetch_files() -> list:
+    return sorted(Path('tests/cache').glob('*.pf'))
+
+def write_shards(directory, count: int, **kwargs) -> list:
+    with BulkFileWriter(directory, 'prefetch2es', shard_bytes=1, **kwargs) as writer:
+        for i in range(count):
+            writer.write([b'{"index":{}}', b'{"n":%d}' % i])
+    return writer.paths
+
+@pytest.fixture
+def replayed(monkeypatch) -> list:
+    # Sources of the documents sent by prefetch2es_replay
+    sources: list = []
+
+    def bulk_body(self, lines):
+        sources.extend(orjson.loads(source) for source in lines[1::2])
+        return len(lines) // 2, []
+
+    monkeypatch.setattr(ElasticsearchUtils, 'bulk_body', bulk_body)
+    return sources
+
+
+# writer test cases
+def test_bulk_file_writer_refuses_existing_shards(tmp_path):
+    write_shards(tmp_path, 3)
+    with pytest.raises(FileExistsError):
+        write_shards(tmp_path, 1)
+    assert len(list_bulk_files([tmp_path])) == 3
+
+def test_bulk_file_writer_overwrite_removes_stale_shards(tmp_path):
+    write_shards(tmp_path, 3)
+    paths = write_shards(tmp_path, 1, overwrite=True)
+    assert list_bulk_files([tmp_path]) == paths
+    assert len(paths) == 1
+
+def test_bulk_file_writer_other_files(tmp_path):
+    (tmp_path / 'notes.txt').write_bytes(b'')
+    assert len(write_shards(tmp_path, 2)) == 2
+    assert (tmp_path / 'notes.txt').exists()
+
+
+# export and replay test cases
+def test_replay_smaller_reexport(tmp_path, replayed):
+    filepaths = get_prefetch_files()
+    assert len(filepaths) > 1
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    for filepath in filepaths:
+        shutil.copyfile(filepath, inputs / filepath.name)
+    output = str(tmp_path / 'bulk')
+    prefetch2es(str(inputs), bulk_output=output, shard_bytes=1, chunk_size=1)
+    assert len(list_bulk_files([output])) == len(filepaths)
+
+    # A smaller corpus exported into the same directory
+    (inputs / filepaths[0].name).unlink()
+    with pytest.raises(FileExistsError):
+        prefetch2es(str(inputs), bulk_output=output, shard_bytes=1, chunk_size=1)
+    prefetch2es(str(inputs), bulk_output=output, shard_bytes=1, chunk_size=1, overwrite=True)
+    prefetch2es_replay(output, bulk_threads=1)
+    assert sorted(source['source_file'] for source in replayed) == [
+        str(inputs / filepath.name) for filepath in filepaths[1:]
+    ]
@@ -0,0 +1,80 @@
+# coding: utf-8
+import pytest
+from prefetch2es.models import BulkThrottle as bulk_throttle
+from prefetch2es.models.BulkThrottle import BulkThrottle
+
+
+# utils
+@pytest.fixture
+def clock(monkeypatch):
+    # Seconds since the start, advanced by the test cases
+    now = [100.0]
+    monkeypatch.setattr(bulk_throttle.time, 'monotonic', lambda: now[0])
+    return now
+
+def make_throttle() -> BulkThrottle:
+    return BulkThrottle(500, 4, target_latency=2.0, min_batch_size=50)
+
+
+# decrease test cases
+def test_rejections_halve_concurrency_then_batch_size(clock):
+    throttle = make_throttle()
+    sizes = []
+    for _ in range(5):
+        throttle.observe(0.1, rejected=3)
+        sizes.append((throttle.concurrency, throttle.batch_size))
+        clock[0] += 2.0
+    assert sizes == [(2, 500), (1, 500), (1, 250), (1, 125), (1, 62)]
+    assert throttle.decreases == 5
+
+def test_failed_request_decreases(clock):
+    throttle = make_throttle()
+    throttle.observe(0.1, error=True)
+    assert (throttle.concurrency, throttle.batch_size) == (2, 500)
+
+def test_slow_request_halves_batch_size(clock):
+    throttle = make_throttle()
+    throttle.observe(3.0)
+    assert (throttle.concurrency, throttle.batch_size) == (4, 250)
+
+def test_batch_size_lower_bound(clock):
+    throttle = BulkThrottle(100, 1, target_latency=2.0, min_batch_size=40)
+    for _ in range(5):
+        throttle.observe(3.0)
+        clock[0] += 2.0
+    assert throttle.batch_size == 40
+
+def test_decreases_within_target_latency_count_once(clock):
+    # Requests already in flight when the cluster pushes back
+    throttle = make_throttle()
+    for _ in range(4):
+        throttle.observe(0.1, rejected=1)
+        clock[0] += 0.1
+    assert (throttle.concurrency, throttle.decreases) == (2, 1)
+
+
+# increase test cases
+def test_fast_requests_grow_concurrency_then_batch_size(clock):
+    throttle = make_throttle()
+    throttle.observe(0.1, rejected=1)
+    clock[0] += 2.0
+    throttle.observe(0.1, rejected=1)
+    clock[0] += 2.0
+    throttle.observe(3.0)
+    assert (throttle.concurrency, throttle.batch_size) == (1, 250)
+
+    sizes = []
+    for _ in range(8):
+        throttle.observe(0.5)
+        sizes.append((throttle.concurrency, throttle.batch_size))
+    assert sizes == [
+        (2, 250), (3, 250), (4, 250), (4, 300), (4, 350), (4, 400), (4, 450), (4, 500),
+    ]
+    throttle.observe(0.5)
+    assert (throttle.concurrency, throttle.batch_size) == (4, 500)
+
+def test_moderate_latency_keeps_limits(clock):
+    throttle = make_throttle()
+    throttle.observe(3.0)
+    throttle.observe(1.5)
+    assert (throttle.concurrency, throttle.batch_size) == (4, 250)
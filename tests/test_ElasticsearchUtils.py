@@ -0,0 +1,248 @@
+# coding: utf-8
+import fnmatch
+import random
+
+import pytest
+from elastic_transport import ApiResponseMeta, ConnectionTimeout, HttpHeaders, NodeConfig
+from elastic_transport import ConnectionError as TransportConnectionError
+from elasticsearch import ApiError
+from prefetch2es.models.ElasticsearchUtils import (
+    INGEST_SETTINGS,
+    BulkBodyBuilder,
+    ElasticsearchUtils,
+    calc_retry_wait,
+    chunk_bulk_lines,
+    is_retryable_error,
+    partition_bulk_response,
+)
+
+
+# utils
+def make_documents(count: int, size: int) -> list:
+    # action and source lines of size bytes each
+    return [(b'a' * size, b's' * size) for _ in range(count)]
+
+def body_bytes(lines: list) -> int:
+    return sum(len(line) + 1 for line in lines)
+
+
+# chunk_bulk_lines test cases
+def test_chunk_bulk_lines_by_count():
+    bodies = list(chunk_bulk_lines(make_documents(5, 10), 2, 10_000))
+    assert [len(lines) // 2 for lines in bodies] == [2, 2, 1]
+
+def test_chunk_bulk_lines_by_bytes():
+    # each document takes 2 * 49 + 2 = 100 bytes
+    bodies = list(chunk_bulk_lines(make_documents(10, 49), 500, 350))
+    assert [len(lines) // 2 for lines in bodies] == [3, 3, 3, 1]
+    assert all(body_bytes(lines) <= 350 for lines in bodies)
+
+def test_chunk_bulk_lines_exact_fit():
+    bodies = list(chunk_bulk_lines(make_documents(4, 49), 500, 200))
+    assert [len(lines) // 2 for lines in bodies] == [2, 2]
+
+def test_chunk_bulk_lines_oversized_document():
+    # a document larger than the limit is sent alone rather than dropped
+    documents = make_documents(1, 10) + make_documents(1, 1000) + make_documents(1, 10)
+    bodies = list(chunk_bulk_lines(documents, 500, 100))
+    assert [len(lines) // 2 for lines in bodies] == [1, 1, 1]
+    assert [line for lines in bodies for line in lines] == [
+        line for document in documents for line in document
+    ]
+
+def test_chunk_bulk_lines_empty():
+    assert list(chunk_bulk_lines([], 500, 100)) == []
+
+def test_bulk_body_builder_across_chunks():
+    # documents arriving in several parse chunks fill the same bodies
+    builder = BulkBodyBuilder(4, 10_000)
+    bodies = []
+    for chunk in (make_documents(3, 10), make_documents(3, 10), make_documents(1, 10)):
+        bodies.extend(
+            body for body in (builder.add(*document) for document in chunk) if body
+        )
+    assert [len(lines) // 2 for lines in bodies] == [4]
+    assert len(builder.flush()) // 2 == 3
+    assert builder.flush() is None
+
+
+# partition_bulk_response test cases
+def bulk_item(status: int, doc_id: str) -> dict:
+    return {'index': {'_id': doc_id, 'status': status}}
+
+def test_partition_bulk_response():
+    lines = [b'a0', b's0', b'a1', b's1', b'a2', b's2', b'a3', b's3']
+    response = {'items': [
+        bulk_item(201, '0'), bulk_item(429, '1'), bulk_item(400, '2'), bulk_item(503, '3'),
+    ]}
+    success, failed, rejected, rejected_lines = partition_bulk_response(response, lines)
+    assert success == 1
+    assert failed == [bulk_item(400, '2')]
+    assert rejected == [bulk_item(429, '1'), bulk_item(503, '3')]
+    assert rejected_lines == [b'a1', b's1', b'a3', b's3']
+
+def test_partition_bulk_response_without_items():
+    assert partition_bulk_response({}, [b'a0', b's0']) == (0, [], [], [])
+
+
+# calc_retry_wait test cases
+def test_calc_retry_wait_jitter(monkeypatch):
+    monkeypatch.setattr(random, 'uniform', lambda low, high: high)
+    assert [calc_retry_wait(attempt, 1.0) for attempt in (1, 2, 3)] == [1.0, 2.0, 4.0]
+    monkeypatch.setattr(random, 'uniform', lambda low, high: low)
+    assert [calc_retry_wait(attempt, 1.0) for attempt in (1, 2, 3)] == [0.5, 1.0, 2.0]
+
+def test_calc_retry_wait_bounded():
+    waits = [calc_retry_wait(20, 1.0, max_wait=8.0) for _ in range(100)]
+    assert all(4.0 <= wait <= 8.0 for wait in waits)
+
+
+# bulk_body test cases
+class StubResponse(object):
+    def __init__(self, body: dict) -> None:
+        self.body = body
+
+class StubClient(object):
+    # Answers each bulk request with the next outcome, raising exceptions
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.requests: list = []
+
+    def bulk(self, operations):
+        self.requests.append(list(operations))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return StubResponse(outcome)
+
+def api_error(status: int) -> ApiError:
+    meta = ApiResponseMeta(
+        status=status, http_version='1.1', headers=HttpHeaders(), duration=0.0,
+        node=NodeConfig('http', 'localhost', 9200),
+    )
+    return ApiError(f'status {status}', meta=meta, body={})
+
+def make_es(*outcomes, max_retries: int = 2) -> ElasticsearchUtils:
+    es = ElasticsearchUtils('localhost', 9200, 'http', '', '', max_retries=max_retries, retry_wait=0.0)
+    es.es = StubClient(*outcomes)
+    return es
+
+def test_is_retryable_error():
+    assert is_retryable_error(TransportConnectionError('refused'))
+    assert is_retryable_error(ConnectionTimeout('timed out'))
+    assert is_retryable_error(api_error(429))
+    assert is_retryable_error(api_error(503))
+    assert not any(is_retryable_error(api_error(status)) for status in (400, 401, 413))
+    assert not is_retryable_error(ValueError('bug'))
+
+def test_bulk_body_retries_transient_errors():
+    es = make_es(TransportConnectionError('refused'), api_error(429), {'items': [bulk_item(201, '0')]})
+    assert es.bulk_body([b'a0', b's0']) == (1, [])
+    assert len(es.es.requests) == 3
+
+@pytest.mark.parametrize('status', [400, 401, 413])
+def test_bulk_body_does_not_retry_client_errors(status):
+    es = make_es(api_error(status), {'items': [bulk_item(201, '0')]})
+    with pytest.raises(Exception, match='Bulk indexing error'):
+        es.bulk_body([b'a0', b's0'])
+    assert len(es.es.requests) == 1
+
+def test_bulk_body_resends_rejected_documents():
+    es = make_es(
+        {'items': [bulk_item(201, '0'), bulk_item(429, '1')]},
+        {'items': [bulk_item(201, '1')]},
+    )
+    assert es.bulk_body([b'a0', b's0', b'a1', b's1']) == (2, [])
+    assert es.es.requests[1] == [b'a1', b's1']
+    assert es.retried_documents == 1
+
+def test_bulk_body_keeps_success_when_a_retry_raises():
+    es = make_es(
+        {'items': [bulk_item(201, '0'), bulk_item(429, '1')]},
+        api_error(400),
+    )
+    assert es.bulk_body([b'a0', b's0', b'a1', b's1']) == (1, [bulk_item(429, '1')])
+
+def test_bulk_body_retries_exhausted():
+    es = make_es(
+        {'items': [bulk_item(201, '0'), bulk_item(503, '1')]},
+        TransportConnectionError('refused'),
+        max_retries=1,
+    )
+    assert es.bulk_body([b'a0', b's0', b'a1', b's1']) == (1, [bulk_item(503, '1')])
+
+
+# tune_for_ingest test cases
+class StubIndices(object):
+    # Flat settings of concrete indices, reached by name, alias or pattern
+    def __init__(self, settings: dict, aliases: dict) -> None:
+        self.settings = settings
+        self.aliases = aliases
+        self.puts: list = []
+        self.refreshed: list = []
+
+    def resolve(self, index: str) -> list:
+        if index in self.aliases:
+            return self.aliases[index]
+        return sorted(fnmatch.filter(self.settings, index))
+
+    def create(self, index):
+        pass
+
+    def get_settings(self, index, name, flat_settings):
+        return StubResponse({
+            concrete: {'settings': {
+                key: value for key, value in self.settings[concrete].items() if key in name
+            }}
+            for concrete in self.resolve(index)
+        })
+
+    def put_settings(self, index, settings):
+        assert index in self.settings, 'settings are only put on concrete indices'
+        self.puts.append((index, settings))
+        self.settings[index].update(settings)
+
+    def refresh(self, index):
+        self.refreshed.append(index)
+
+class StubIndicesClient(object):
+    def __init__(self, indices: StubIndices) -> None:
+        self.indices = indices
+
+    def options(self, **kwargs):
+        return self
+
+def make_indices() -> StubIndices:
+    return StubIndices(
+        {
+            'prefetch-1': {'index.refresh_interval': '30s', 'index.number_of_shards': '1'},
+            'prefetch-2': {'index.number_of_replicas': '2'},
+        },
+        {'prefetch': ['prefetch-1', 'prefetch-2']},
+    )
+
+
+PREVIOUS_SETTINGS = {
+    'prefetch-1': {'index.refresh_interval': '30s', 'index.number_of_replicas': None},
+    'prefetch-2': {'index.refresh_interval': None, 'index.number_of_replicas': '2'},
+}
+
+@pytest.mark.parametrize('target', ['prefetch', 'prefetch-*'])
+def test_tune_for_ingest_alias_or_pattern(target):
+    indices = make_indices()
+    es = ElasticsearchUtils('localhost', 9200, 'http', '', '')
+    es.es = StubIndicesClient(indices)
+    previous = es.tune_for_ingest(target)
+    assert previous == PREVIOUS_SETTINGS
+    assert indices.puts == [('prefetch-1', INGEST_SETTINGS), ('prefetch-2', INGEST_SETTINGS)]
+    es.restore_settings(target, previous)
+    assert indices.puts[2:] == list(PREVIOUS_SETTINGS.items())
+    assert indices.refreshed == [target]
+
+def test_tune_for_ingest_concrete_index():
+    indices = make_indices()
+    es = ElasticsearchUtils('localhost', 9200, 'http', '', '')
+    es.es = StubIndicesClient(indices)
+    previous = es.tune_for_ingest('prefetch-1')
+    assert previous == {'prefetch-1': PREVIOUS_SETTINGS['prefetch-1']}
+    assert indices.puts == [('prefetch-1', INGEST_SETTINGS)]
@@ -0,0 +1,90 @@
+# coding: utf-8
+import os
+from pathlib import Path
+
+import pytest
+from prefetch2es.models.FileDiscovery import (
+    iter_prefetch_files,
+    scan_directory,
+    walk_prefetch_files,
+    walk_prefetch_files_parallel,
+)
+
+
+# utils
+@pytest.fixture
+def tree(tmp_path):
+    # Prefetch directory of a collection, with the case of Windows names
+    files = [
+        'Windows/Prefetch/CMD.EXE-D269B812.PF',
+        'Windows/Prefetch/calc.exe-3fbef7fd.pf',
+        'Windows/Prefetch/Chrome.exe-B3BA7868.Pf',
+        'Windows/Prefetch/ReadyBoot/Trace.fx',
+        'Windows/Prefetch/Layout.ini',
+        'Windows/PREFETCH.OLD/DEVENV.EXE-854D7862.pF',
+        'Users/Public/notes.txt',
+    ]
+    for name in files:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return tmp_path
+
+def names(paths) -> set:
+    return {Path(path).name for path in paths}
+
+@pytest.fixture
+def unreadable(monkeypatch, tree):
+    # Running as root ignores permission bits, so scandir fails on request
+    denied = str(tree / 'Windows' / 'Prefetch')
+    scandir = os.scandir
+
+    def fake_scandir(path):
+        if os.fspath(path) == denied:
+            raise PermissionError(13, 'Permission denied', denied)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', fake_scandir)
+    return tree
+
+
+# case-insensitive discovery test cases
+def test_walk_prefetch_files_any_case(tree):
+    assert names(walk_prefetch_files(str(tree / 'Windows' / 'Prefetch'))) == {
+        'CMD.EXE-D269B812.PF', 'calc.exe-3fbef7fd.pf', 'Chrome.exe-B3BA7868.Pf',
+    }
+
+def test_walk_prefetch_files_recursive(tree):
+    expected = {
+        'CMD.EXE-D269B812.PF', 'calc.exe-3fbef7fd.pf', 'Chrome.exe-B3BA7868.Pf',
+        'DEVENV.EXE-854D7862.pF',
+    }
+    assert names(walk_prefetch_files(str(tree))) == set()
+    assert names(walk_prefetch_files(str(tree), recursive=True)) == expected
+    assert names(walk_prefetch_files_parallel(str(tree), 4)) == expected
+    assert names(iter_prefetch_files([tree], recursive=True, threads=4)) == expected
+
+def test_scan_directory(tree):
+    filepaths, subdirectories = scan_directory(str(tree / 'Windows'))
+    assert filepaths == []
+    assert names(subdirectories) == {'Prefetch', 'PREFETCH.OLD'}
+
+def test_iter_prefetch_files_explicit_file(tree):
+    # Files given explicitly are yielded whatever their suffix
+    path = tree / 'Users' / 'Public' / 'notes.txt'
+    assert list(iter_prefetch_files([path])) == [path]
+
+
+# unreadable directory test cases
+def test_walk_prefetch_files_skips_unreadable(unreadable):
+    assert names(walk_prefetch_files(str(unreadable), recursive=True)) == {
+        'DEVENV.EXE-854D7862.pF',
+    }
+
+def test_walk_prefetch_files_parallel_skips_unreadable(unreadable):
+    assert names(walk_prefetch_files_parallel(str(unreadable), 4)) == {
+        'DEVENV.EXE-854D7862.pF',
+    }
+
+def test_scan_directory_unreadable(unreadable):
+    assert scan_directory(str(unreadable / 'Windows' / 'Prefetch')) == ([], [])
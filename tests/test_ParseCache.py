@@ -0,0 +1,94 @@
+# coding: utf-8
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from prefetch2es.models.ParseCache import (
+    ParseCache,
+    calc_content_key,
+    prune_cache_directory,
+)
+from prefetch2es.models.Prefetch2es import (
+    RECORD_STANDARD,
+    process_routed_chunk,
+    process_routed_chunk_with_stats,
+)
+
+
+# utils
+def cache_files(directory: Path) -> list:
+    return sorted(path for path in directory.rglob('*') if path.is_file())
+
+
+# memory cache test cases
+def test_parse_cache_hits():
+    cache = ParseCache(max_entries=4)
+    key = calc_content_key(b'prefetch')
+    assert cache.get(key) is None
+    cache.put(key, b'parsed')
+    assert cache.get(key) == b'parsed'
+    assert cache.get(key) == b'parsed'
+    assert cache.hits == 2
+    assert cache.get_thread_hits() == 2
+
+def test_parse_cache_evicts_least_recently_used():
+    cache = ParseCache(max_entries=2)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    cache.get('a')
+    cache.put('c', b'3')
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.get('b') is None
+
+def test_parse_cache_thread_hits():
+    cache = ParseCache()
+    cache.put('a', b'1')
+    thread = threading.Thread(target=cache.get, args=('a',))
+    thread.start()
+    thread.join()
+    assert cache.hits == 1
+    assert cache.get_thread_hits() == 0
+
+
+# on-disk cache test cases
+def test_parse_cache_directory_round_trip(tmp_path):
+    key = calc_content_key(b'prefetch')
+    ParseCache(directory=str(tmp_path)).put(key, b'parsed')
+    # Another process or a later run, with nothing in memory
+    cache = ParseCache(max_entries=0, directory=str(tmp_path))
+    assert cache.get(key) == b'parsed'
+    assert cache.hits == 1
+    assert [path.name for path in cache_files(tmp_path)] == [key]
+
+def test_parse_cache_directory_miss(tmp_path):
+    cache = ParseCache(directory=str(tmp_path))
+    assert cache.get(calc_content_key(b'prefetch')) is None
+    assert cache.hits == 0
+
+def test_prune_cache_directory(tmp_path):
+    cache = ParseCache(max_entries=0, directory=str(tmp_path))
+    for i, key in enumerate(['a1', 'b2', 'c3', 'd4']):
+        cache.put(key, b'x' * 100)
+        os.utime(cache._entry_path(key), (1000 + i, 1000 + i))
+    # Reading an entry makes it the most recently used
+    cache.get('a1')
+    assert prune_cache_directory(str(tmp_path), 250) == 2
+    assert [path.name for path in cache_files(tmp_path)] == ['a1', 'd4']
+    assert prune_cache_directory(str(tmp_path), 250) == 0
+
+
+# parsing test cases
+def test_parse_cache_identical_files(tmp_path):
+    sample = sorted(Path('tests/cache').glob('*.pf'))[0]
+    filepaths = [tmp_path / f'{host}-{sample.name}' for host in ('host1', 'host2')]
+    for filepath in filepaths:
+        shutil.copyfile(sample, filepath)
+    routed, stats, _ = process_routed_chunk_with_stats(
+        filepaths, (RECORD_STANDARD,), cache_entries=16, cache_dir=str(tmp_path / 'cache')
+    )
+    assert stats['cache_hits'] == 1
+    expected = process_routed_chunk(filepaths, (RECORD_STANDARD,))
+    assert [record.to_dict() for record in routed[RECORD_STANDARD]] == [
+        record.to_dict() for record in expected[RECORD_STANDARD]
+    ]
@@ -0,0 +1,166 @@
+# coding: utf-8
+import multiprocessing
+from functools import partial
+from pathlib import Path
+
+import orjson
+import pytest
+from prefetch2es.models.Prefetch2es import (
+    AUTO_TASKS_PER_WORKER,
+    EXECUTOR_INLINE,
+    EXECUTOR_THREAD,
+    RECORD_FILE,
+    RECORD_STANDARD,
+    RECORD_TIMELINE,
+    Prefetch2es,
+    WorkerPool,
+    generate_auto_chunks,
+    process_routed_chunk,
+)
+
+
+# utils
+def get_prefetch_files() -> list:
+    return sorted(Path('tests/cache').glob('*.pf'))
+
+def parse_standard(prefetch: Prefetch2es, **kwargs) -> list:
+    return [
+        record.to_dict()
+        for _, routed in prefetch.gen_file_records(
+            partial(process_routed_chunk, kinds=(RECORD_STANDARD,)),
+            multiprocess=True,
+            chunk_size=1,
+            **kwargs,
+        )
+        for record in routed[RECORD_STANDARD]
+    ]
+
+def worker_pids() -> set:
+    return {process.pid for process in multiprocessing.active_children()}
+
+
+# slim timeline test cases
+def test_slim_timeline_references_file_records():
+    filepaths = get_prefetch_files()
+    routed = process_routed_chunk(filepaths, (RECORD_TIMELINE, RECORD_FILE), serialized=True)
+    files = {
+        orjson.loads(source)['log']['file']['path']: _id
+        for _id, source in routed[RECORD_FILE]
+    }
+    assert len(files) == len(filepaths)
+    for _, source in routed[RECORD_TIMELINE]:
+        event = orjson.loads(source)
+        assert event['windows']['prefetch']['file_id'] == files[event['log']['file']['path']]
+
+def test_slim_timeline_keeps_full_event_data():
+    filepaths = get_prefetch_files()
+    full = process_routed_chunk(filepaths, (RECORD_TIMELINE,))[RECORD_TIMELINE]
+    routed = process_routed_chunk(filepaths, (RECORD_TIMELINE, RECORD_FILE))
+    slim = routed[RECORD_TIMELINE]
+    files = {record['log']['file']['path']: record for record in routed[RECORD_FILE]}
+    assert full and len(slim) == len(full)
+    for slim_event, full_event in zip(slim, full):
+        prefetch = slim_event['windows']['prefetch']
+        assert set(prefetch) == {'hash', 'file_id'}
+        companion = dict(files[slim_event['log']['file']['path']]['windows']['prefetch'])
+        assert full_event['@timestamp'] in companion.pop('last_exec_times')
+        assert companion == full_event['windows']['prefetch']
+        assert {**slim_event, 'windows': full_event['windows']} == full_event
+
+
+# automatic chunk size test cases
+def test_auto_chunks_start_before_reading_a_full_window():
+    pulled = []
+
+    def gen_items():
+        for i in range(100_000):
+            pulled.append(i)
+            yield i
+
+    chunks = generate_auto_chunks(gen_items(), workers=8, max_chunk_size=64)
+    assert next(chunks) == [0]
+    assert len(pulled) == 8 * AUTO_TASKS_PER_WORKER
+    chunks.close()
+
+def test_auto_chunks_grow_to_max_chunk_size():
+    chunks = list(generate_auto_chunks(range(10_000), workers=2, max_chunk_size=64))
+    assert [len(chunk) for chunk in chunks[:8]] == [1, 2, 4, 8, 16, 32, 64, 64]
+    assert [item for chunk in chunks for item in chunk] == list(range(10_000))
+
+def test_auto_chunks_split_the_tail():
+    chunks = list(generate_auto_chunks(range(10_000), workers=2, max_chunk_size=64))
+    tail = [len(chunk) for chunk in chunks[-2 * AUTO_TASKS_PER_WORKER:]]
+    assert max(tail) < 64
+
+def test_auto_chunks_few_items():
+    assert list(generate_auto_chunks(range(3), workers=4)) == [[0], [1], [2]]
+    assert list(generate_auto_chunks([], workers=4)) == []
+
+
+# worker pool test cases
+def test_worker_pool_reused_across_calls():
+    expected = parse_standard(Prefetch2es(get_prefetch_files()))
+    with WorkerPool(workers=2) as pool:
+        started = pool.pool
+        pids = worker_pids()
+        assert len(pids) == 2
+        prefetch = Prefetch2es(get_prefetch_files(), pool=pool)
+        assert parse_standard(prefetch) == expected
+        assert parse_standard(prefetch) == expected
+        # The same workers served both calls
+        assert pool.start() is started
+        assert worker_pids() == pids
+    assert pool.pool is None
+    assert not multiprocessing.active_children()
+
+def test_worker_pool_restarts_after_close():
+    pool = WorkerPool(workers=2)
+    pool.start()
+    pool.close()
+    assert not multiprocessing.active_children()
+    prefetch = Prefetch2es(get_prefetch_files(), pool=pool)
+    try:
+        assert parse_standard(prefetch) == parse_standard(Prefetch2es(get_prefetch_files()))
+        assert len(worker_pids()) == 2
+    finally:
+        pool.terminate()
+    assert pool.pool is None
+    assert not multiprocessing.active_children()
+
+def test_worker_pool_threads():
+    with WorkerPool(workers=2, executor=EXECUTOR_THREAD) as pool:
+        prefetch = Prefetch2es(get_prefetch_files(), pool=pool)
+        assert parse_standard(prefetch) == parse_standard(Prefetch2es(get_prefetch_files()))
+        assert not multiprocessing.active_children()
+    assert pool.pool is None
+
+def test_worker_pool_rejects_inline():
+    with pytest.raises(ValueError):
+        WorkerPool(executor=EXECUTOR_INLINE)
+
+def test_prefetch2es_context_owns_pool():
+    with Prefetch2es(get_prefetch_files()) as prefetch:
+        pool = prefetch.pool
+        assert pool is not None and multiprocessing.active_children()
+        parse_standard(prefetch)
+    assert prefetch.pool is None and pool.pool is None
+    assert not multiprocessing.active_children()
+
+def test_prefetch2es_context_keeps_given_pool():
+    with WorkerPool(workers=2) as pool:
+        with Prefetch2es(get_prefetch_files(), pool=pool) as prefetch:
+            parse_standard(prefetch)
+        assert prefetch.pool is pool
+        assert len(worker_pids()) == 2
+
+def test_gen_file_records_honours_inline_executor():
+    with WorkerPool(workers=2) as pool:
+        prefetch = Prefetch2es(get_prefetch_files(), pool=pool)
+        records = parse_standard(prefetch, executor=EXECUTOR_INLINE)
+        assert records == parse_standard(Prefetch2es(get_prefetch_files()))
+
+def test_gen_file_records_rejects_conflicting_executor():
+    with WorkerPool(workers=2) as pool:
+        prefetch = Prefetch2es(get_prefetch_files(), pool=pool)
+        with pytest.raises(ValueError):
+            parse_standard(prefetch, executor=EXECUTOR_THREAD)
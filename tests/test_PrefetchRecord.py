@@ -0,0 +1,122 @@
+# coding: utf-8
+import pickle
+from pathlib import Path
+
+import pyscca
+from prefetch2es.models.Prefetch2es import (
+    process_prefetch_chunk,
+    process_prefetch_file,
+    process_prefetch_file_timeline,
+    read_standard_record,
+)
+from prefetch2es.models.PrefetchRecord import PrefetchRecord
+
+
+# utils
+def get_prefetch_files() -> list:
+    return sorted(Path('tests/cache').glob('*.pf'))
+
+def to_time(value) -> str:
+    return f'{value}Z'.replace(' ', 'T')
+
+def legacy_record(filepath: Path, tags: list) -> dict:
+    # dict built straight from pyscca, as before PrefetchRecord
+    p = pyscca.file()
+    p.open_file_object(filepath.open(mode='rb'))
+    record = {
+        'name': p.executable_filename,
+        'filenames': [name for name in p.filenames],
+        'exec_count': p.run_count,
+        'last_exec_times': [to_time(p.get_last_run_time(i)) for i in range(min(p.run_count, 8))],
+        'format_version': p.format_version,
+        'prefetch_hash': format(p.prefetch_hash, 'x').upper(),
+        'number_of_volumes': p.number_of_volumes,
+        'number_of_filenames': p.number_of_filenames,
+        'number_of_file_metrics_entries': p.number_of_file_metrics_entries,
+        'metrics': [
+            {'filename': metrics.filename, 'file_reference': hex(metrics.file_reference).upper()}
+            for metrics in p.file_metrics_entries
+        ],
+        'volumes': [
+            {
+                'path': volume.device_path,
+                'creation_time': to_time(volume.get_creation_time()),
+                'serial_number': format(volume.serial_number, 'x').upper(),
+            }
+            for volume in p.volumes
+        ],
+        'source_file': str(filepath),
+        'tags': tags,
+    }
+    p.close()
+    return record
+
+def legacy_timeline_records(filepath: Path, tags: list) -> list:
+    record = legacy_record(filepath, tags)
+    return [
+        {
+            '@timestamp': timestamp,
+            'event': {
+                'action': 'prefetch-executed',
+                'category': ['process'],
+                'type': ['start'],
+                'kind': 'event',
+                'provider': 'prefetch',
+                'module': 'windows',
+                'dataset': 'windows.prefetch',
+            },
+            'process': {'name': record['name'], 'start': timestamp},
+            'windows': {
+                'prefetch': {
+                    'exec_count': record['exec_count'],
+                    'hash': {'prefetch': record['prefetch_hash']},
+                    'format_version': record['format_version'],
+                    'volumes': record['volumes'],
+                    'metrics': record['metrics'],
+                }
+            },
+            'log': {'file': {'path': str(filepath)}},
+            'tags': tags,
+        }
+        for timestamp in record['last_exec_times']
+    ]
+
+
+# dict layout test cases
+def test_to_dict_standard_records():
+    filepaths = get_prefetch_files()
+    assert filepaths
+    for filepath in filepaths:
+        expected = legacy_record(filepath, ['prefetch', 'host1', 'case'])
+        assert read_standard_record(filepath, 'host1, case').to_dict() == expected
+
+def test_process_prefetch_file_returns_dicts():
+    filepaths = get_prefetch_files()
+    assert process_prefetch_file(filepaths[0], 'host1') == legacy_record(filepaths[0], ['prefetch', 'host1'])
+    assert process_prefetch_chunk(filepaths) == [
+        legacy_record(filepath, ['prefetch']) for filepath in filepaths
+    ]
+
+def test_to_dict_timeline_records():
+    for filepath in get_prefetch_files():
+        expected = legacy_timeline_records(filepath, ['prefetch', 'host1'])
+        assert process_prefetch_file_timeline(filepath, 'host1') == expected
+
+def test_from_dict_round_trip():
+    record = process_prefetch_file(get_prefetch_files()[0], 'host1')
+    assert PrefetchRecord.from_dict(record).to_dict() == record
+
+
+# with_source test cases
+def test_with_source_shares_parsed_data():
+    record = read_standard_record(get_prefetch_files()[0])
+    other = record.with_source('other.pf', ['prefetch', 'host2'])
+    assert other is not record
+    assert other.metrics is record.metrics and other.volumes is record.volumes
+    assert (other.source_file, other.tags) == ('other.pf', ['prefetch', 'host2'])
+    assert record.source_file != 'other.pf'
+    assert record.tags == ['prefetch']
+
+def test_with_source_pickles():
+    record = read_standard_record(get_prefetch_files()[0]).with_source('other.pf', ['prefetch'])
+    assert pickle.loads(pickle.dumps(record)).to_dict() == record.to_dict()
@@ -0,0 +1,66 @@
+# coding: utf-8
+import pickle
+import time
+from pathlib import Path
+
+import pytest
+from prefetch2es.models.ReadAhead import BufferedFile, gen_read_ahead, read_ahead
+
+
+# utils
+class SlowFile(object):
+    # Earlier files take longer to read, so reads complete out of order
+    def __init__(self, index: int, delay: float, reads: list) -> None:
+        self.index = index
+        self.delay = delay
+        self.reads = reads
+
+    def __str__(self) -> str:
+        return f'{self.index}.pf'
+
+    def read_bytes(self) -> bytes:
+        time.sleep(self.delay)
+        self.reads.append(self.index)
+        return b'%d' % self.index
+
+
+# read-ahead test cases
+def test_read_ahead_keeps_input_order():
+    reads: list = []
+    files = [SlowFile(i, 0.01 * (8 - i), reads) for i in range(8)]
+    buffered = list(read_ahead(files, depth=8, threads=8))
+    assert [str(f) for f in buffered] == [str(f) for f in files]
+    assert [f.read_bytes() for f in buffered] == [b'%d' % i for i in range(8)]
+    assert reads != sorted(reads)
+
+def test_read_ahead_bounded_by_depth():
+    reads: list = []
+    pulled: list = []
+
+    def gen_files():
+        for i in range(100):
+            pulled.append(i)
+            yield SlowFile(i, 0.0, reads)
+
+    buffered = read_ahead(gen_files(), depth=4, threads=2)
+    assert next(buffered).read_bytes() == b'0'
+    assert len(pulled) == 4
+    buffered.close()
+
+def test_gen_read_ahead_disabled():
+    files = [Path('a.pf'), Path('b.pf')]
+    assert gen_read_ahead(files, 0) is files
+
+
+# BufferedFile test cases
+def test_buffered_file(tmp_path):
+    source = tmp_path / 'CMD.EXE-D269B812.pf'
+    source.write_bytes(b'prefetch')
+    buffered = BufferedFile(source, source.read_bytes())
+    source.unlink()
+    assert buffered.read_bytes() == b'prefetch'
+    assert buffered.open().read() == b'prefetch'
+    assert str(buffered) == str(source)
+    assert pickle.loads(pickle.dumps(buffered)).read_bytes() == b'prefetch'
+    with pytest.raises(ValueError):
+        buffered.open('wb')
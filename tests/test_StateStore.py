@@ -0,0 +1,138 @@
+# coding: utf-8
+import os
+from pathlib import Path
+
+import pytest
+from prefetch2es.models import StateStore as state_store
+from prefetch2es.models.StateStore import IngestTracker, StateStore, get_ingest_target
+
+
+# utils
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(tmp_path / 'state.sqlite')
+    yield store
+    store.close()
+
+def write_file(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+def touch(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+class FakeStore(object):
+    def __init__(self):
+        self.marked = []
+
+    def mark_ingested(self, filepaths, target, content_hashes=None):
+        self.marked.append((list(filepaths), target, content_hashes))
+
+
+# StateStore test cases
+def test_state_store_unchanged_file(store, tmp_path):
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    assert not store.is_ingested(filepath, 'standard:prefetch2es')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    assert store.is_ingested(filepath, 'standard:prefetch2es')
+
+def test_state_store_other_target(store, tmp_path):
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    assert not store.is_ingested(filepath, 'timeline:prefetch2es')
+    assert not store.is_ingested(filepath, 'standard:prefetch2es,timeline:timeline')
+
+def test_state_store_modified_file(store, tmp_path):
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    write_file(filepath, b'modified')
+    touch(filepath)
+    assert not store.is_ingested(filepath, 'standard:prefetch2es')
+
+def test_state_store_touched_file(store, tmp_path):
+    # same content with a new mtime, e.g. collected again
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    touch(filepath)
+    assert store.is_ingested(filepath, 'standard:prefetch2es')
+
+def test_state_store_resized_file(store, tmp_path):
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    write_file(filepath, b'prefetch file')
+    assert not store.is_ingested(filepath, 'standard:prefetch2es')
+
+def test_state_store_reuses_content_hashes(store, tmp_path, monkeypatch):
+    filepaths = [write_file(tmp_path / f'{i}.pf', b'prefetch %d' % i) for i in range(2)]
+    hashes = [state_store.calc_file_hash(filepath) for filepath in filepaths]
+
+    def read_again(filepath):
+        raise AssertionError(f'{filepath} read again')
+
+    monkeypatch.setattr(state_store, 'calc_file_hash', read_again)
+    store.mark_ingested(filepaths, 'standard:prefetch2es', hashes)
+    monkeypatch.undo()
+
+    for filepath in filepaths:
+        touch(filepath)
+        assert store.is_ingested(filepath, 'standard:prefetch2es')
+
+def test_state_store_persistent(tmp_path):
+    filepath = write_file(tmp_path / 'A.pf', b'prefetch')
+    store = StateStore(tmp_path / 'state.sqlite')
+    store.mark_ingested([filepath], 'standard:prefetch2es')
+    store.close()
+    store = StateStore(tmp_path / 'state.sqlite')
+    assert store.is_ingested(filepath, 'standard:prefetch2es')
+    store.close()
+
+def test_get_ingest_target():
+    assert get_ingest_target({'standard': 'prefetch2es'}) == 'standard:prefetch2es'
+    assert get_ingest_target({'timeline': 'pt', 'standard': 'p'}) == 'standard:p,timeline:pt'
+    assert get_ingest_target({'timeline': 'p'}) != get_ingest_target({'standard': 'p'})
+    assert get_ingest_target({'timeline': 'p', 'file': 'p-files'}) != get_ingest_target({'timeline': 'p'})
+
+
+# IngestTracker test cases
+def test_ingest_tracker_marks_completed_chunks_in_order():
+    store = FakeStore()
+    tracker = IngestTracker(store, 'standard:prefetch2es')
+    tracker.add_chunk(['a'], 3, ['ha'])
+    tracker.add_chunk(['b'], 2, ['hb'])
+    tracker.acknowledge(2, succeeded=True)
+    assert store.marked == []
+    tracker.acknowledge(2, succeeded=True)
+    assert store.marked == [(['a'], 'standard:prefetch2es', ['ha'])]
+    tracker.acknowledge(1, succeeded=True)
+    assert store.marked[1:] == [(['b'], 'standard:prefetch2es', ['hb'])]
+
+def test_ingest_tracker_request_spanning_chunks():
+    store = FakeStore()
+    tracker = IngestTracker(store, 'standard:prefetch2es')
+    for name in 'abc':
+        tracker.add_chunk([name], 1)
+    tracker.acknowledge(3, succeeded=True)
+    assert [filepaths for filepaths, _, _ in store.marked] == [['a'], ['b'], ['c']]
+
+def test_ingest_tracker_failed_request():
+    store = FakeStore()
+    tracker = IngestTracker(store, 'standard:prefetch2es')
+    tracker.add_chunk(['a'], 2)
+    tracker.add_chunk(['b'], 2)
+    tracker.add_chunk(['c'], 2)
+    tracker.acknowledge(3, succeeded=False)
+    tracker.acknowledge(3, succeeded=True)
+    # a and b shared the failed request, c was sent in the next one
+    assert [filepaths for filepaths, _, _ in store.marked] == [['c']]
+
+def test_ingest_tracker_chunks_without_documents():
+    store = FakeStore()
+    tracker = IngestTracker(store, 'standard:prefetch2es')
+    tracker.add_chunk(['a'], 1)
+    tracker.add_chunk(['b'], 0)
+    tracker.finish()
+    assert store.marked == []
+    tracker.acknowledge(1, succeeded=True)
+    tracker.finish()
+    assert [filepaths for filepaths, _, _ in store.marked] == [['a'], ['b']]
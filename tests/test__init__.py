@@ -1,10 +1,16 @@
 # coding: utf-8
+import gzip
+import subprocess
+import sys
+import zipfile
 from hashlib import md5
 from pathlib import Path
 
+import orjson
 import pytest
 from prefetch2es.views.Prefetch2esView import entry_point as p2e
 from prefetch2es.views.Prefetch2jsonView import entry_point as p2j
+from prefetch2es.views.Prefetch2esReplayView import entry_point as p2r
 
 # utils
 def calc_md5(path: Path) -> str:
@@ -47,7 +53,56 @@ def test_prefetch2json_version(monkeypatch):
             p2j()
         assert exited.value.code == 0
 
-# behavior test cases 
+def test_prefetch2es_replay_help(monkeypatch):
+    argv = ["prefetch2es-replay", "-h"]
+    with pytest.raises(SystemExit) as exited:
+        with monkeypatch.context() as m:
+            m.setattr("sys.argv", argv)
+            p2r()
+        assert exited.value.code == 0
+
+def test_prefetch2es_replay_rejects_parse_options(monkeypatch):
+    argv = ["prefetch2es-replay", "--workers", "2", "tests/cache/"]
+    with pytest.raises(SystemExit) as exited:
+        with monkeypatch.context() as m:
+            m.setattr("sys.argv", argv)
+            p2r()
+    assert exited.value.code == 2
+
+
+# startup test cases
+# Loaded only by the code paths that need them
+LAZY_MODULES = (
+    'pyscca', 'elasticsearch', 'orjson', 'tqdm',
+    'elastic_transport', 'aiohttp', 'urllib3', 'multiprocessing',
+)
+
+def loaded_modules(code: str) -> set:
+    # Modules in sys.modules after running code in a fresh interpreter
+    process = subprocess.run(
+        [sys.executable, '-c', f'{code}\nimport sys\nprint("\\n".join(sys.modules))'],
+        capture_output=True, text=True, check=True,
+    )
+    return {name.split('.')[0] for name in process.stdout.splitlines()}
+
+def build_view(view: str, argv: list) -> str:
+    # Build the parser of a command and parse argv, without running it
+    return (
+        f'import sys; sys.argv = {argv!r}\n'
+        f'from prefetch2es.views.{view} import {view}\n'
+        f'{view}()'
+    )
+
+@pytest.mark.parametrize('code', [
+    'import prefetch2es',
+    build_view('Prefetch2esView', ['prefetch2es', 'tests/cache/']),
+    build_view('Prefetch2jsonView', ['prefetch2json', 'tests/cache/']),
+    build_view('Prefetch2esReplayView', ['prefetch2es-replay', 'tests/cache/bulk']),
+])
+def test_startup_lazy_modules(code):
+    assert loaded_modules(code).isdisjoint(LAZY_MODULES)
+
+# behavior test cases
 def test__prefetch2json_convert(monkeypatch):
     path = 'tests/cache/prefetches.json'
     argv = ["prefetch2json", "-o", path, "tests/cache/"]
@@ -64,6 +119,14 @@ def test__prefetch2json_convert_multiprocessing(monkeypatch):
         p2j()
     assert calc_md5(Path(path)) == "c5c63abb890bdbd72f5ed1237a108ab2"
 
+def test__prefetch2json_convert_thread_executor(monkeypatch):
+    path = 'tests/cache/prefetches-thread.json'
+    argv = ["prefetch2json", "-o", path, "--executor", "thread", "--workers", "2", "-s", "1", "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    assert calc_md5(Path(path)) == "c5c63abb890bdbd72f5ed1237a108ab2"
+
 def test__prefetch2json_timeline_convert(monkeypatch):
     path = 'tests/cache/prefetches-t.json'
     argv = ["prefetch2json", "--timeline", "-o", path, "tests/cache/"]
@@ -78,4 +141,185 @@ def test__prefetch2json_timeline_convert_multiprocessing(monkeypatch):
     with monkeypatch.context() as m:
         m.setattr("sys.argv", argv)
         p2j()
-    assert calc_md5(Path(path)) == "5ad06fe5ec524c940e8037248ed59e60"
\ No newline at end of file
+    assert calc_md5(Path(path)) == "5ad06fe5ec524c940e8037248ed59e60"
+
+def test__prefetch2json_convert_gzip(monkeypatch):
+    path = 'tests/cache/prefetches.json.gz'
+    argv = ["prefetch2json", "--compress", "gzip", "-o", path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    assert md5(gzip.decompress(Path(path).read_bytes())).hexdigest() == "c5c63abb890bdbd72f5ed1237a108ab2"
+
+def test__prefetch2json_convert_ndjson(monkeypatch):
+    path = 'tests/cache/prefetches.ndjson'
+    argv = ["prefetch2json", "--format", "ndjson", "-o", path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    expected_path = 'tests/cache/prefetches-nd.json'
+    argv = ["prefetch2json", "-o", expected_path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    lines = Path(path).read_bytes().splitlines()
+    assert [orjson.loads(line) for line in lines] == orjson.loads(Path(expected_path).read_bytes())
+
+def test__prefetch2json_convert_dual(monkeypatch):
+    path = 'tests/cache/prefetches-d.json'
+    timeline_path = 'tests/cache/prefetches-d-t.json'
+    argv = ["prefetch2json", "-o", path, "--timeline-output", timeline_path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    assert calc_md5(Path(path)) == "c5c63abb890bdbd72f5ed1237a108ab2"
+    assert calc_md5(Path(timeline_path)) == "5ad06fe5ec524c940e8037248ed59e60"
+
+def test__prefetch2json_convert_zip(monkeypatch):
+    archive = Path('tests/cache/collection.zip')
+    with zipfile.ZipFile(archive, 'w') as z:
+        for pf in Path('tests/cache').glob('*.pf'):
+            z.write(pf, f'C/Windows/Prefetch/{pf.name}')
+    path = 'tests/cache/prefetches-z.json'
+    argv = ["prefetch2json", "-o", path, str(archive)]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    expected_path = 'tests/cache/prefetches-z-expected.json'
+    argv = ["prefetch2json", "-o", expected_path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    records = {
+        record.pop('source_file'): record
+        for record in orjson.loads(Path(path).read_bytes())
+    }
+    expected = {
+        f'{archive.resolve()}!C/Windows/Prefetch/{Path(record.pop("source_file")).name}': record
+        for record in orjson.loads(Path(expected_path).read_bytes())
+    }
+    assert records == expected
+
+
+STATS_SCHEMA = {
+    'elapsed_seconds': float,
+    'workers': int,
+    'files': int,
+    'documents': int,
+    'files_per_second': float,
+    'documents_per_second': float,
+    'serialized_bytes': int,
+    'parse_cache_hits': int,
+    'bulk_requests': int,
+    'bytes_sent': int,
+    'retried_documents': int,
+    'stage_seconds': dict,
+    'bulk_latency_seconds': dict,
+    'worker_utilization': float,
+}
+
+def test__prefetch2es_stats_json(monkeypatch):
+    path = Path('tests/cache/stats.json')
+    argv = ["prefetch2es", "--bulk-output", "tests/cache/bulk", "--overwrite", "--stats-json", str(path), "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2e()
+    stats = orjson.loads(path.read_bytes())
+    assert {name: type(value) for name, value in stats.items()} == STATS_SCHEMA
+    assert stats['files'] == stats['documents'] == len(list(Path('tests/cache').glob('*.pf')))
+    assert {'discovery', 'parse', 'build', 'serialize', 'write'} <= set(stats['stage_seconds'])
+    assert set(stats['bulk_latency_seconds']) == {'p50', 'p90', 'p99', 'max'}
+
+def mapped_fields(properties: dict, prefix: str = '') -> set:
+    fields = set()
+    for name, mapping in properties.items():
+        if 'properties' in mapping:
+            fields |= mapped_fields(mapping['properties'], f'{prefix}{name}.')
+        else:
+            fields.add(f'{prefix}{name}')
+    return fields
+
+def record_fields(record: dict, prefix: str = '') -> set:
+    fields = set()
+    for name, value in record.items():
+        values = value if isinstance(value, list) else [value]
+        for value in values:
+            if isinstance(value, dict):
+                fields |= record_fields(value, f'{prefix}{name}.')
+            else:
+                fields.add(f'{prefix}{name}')
+    return fields
+
+@pytest.mark.parametrize('kind, options', [('standard', []), ('timeline', ['--timeline'])])
+def test__index_template_maps_every_field(monkeypatch, kind, options):
+    from prefetch2es.models.IndexTemplate import build_index_template
+    path = f'tests/cache/prefetches-{kind}-mapped.json'
+    argv = ["prefetch2json", *options, "-o", path, "tests/cache/"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        p2j()
+    template = build_index_template(kind, 'prefetch2es')
+    mapped = mapped_fields(template['template']['mappings']['properties'])
+    for record in orjson.loads(Path(path).read_bytes()):
+        assert record_fields(record) <= mapped
+
+@pytest.mark.parametrize('options', [
+    {'timeline_index': 'prefetch2es'},
+    {'timeline_index': 'prefetch2es-timeline', 'slim_timeline': True, 'files_index': 'prefetch2es'},
+])
+def test__index_template_rejects_shared_index(options):
+    from prefetch2es import prefetch2es
+    with pytest.raises(ValueError):
+        prefetch2es('tests/cache/', index_template=True, **options)
+
+def test__index_template_dual_names():
+    from prefetch2es.presenters.Prefetch2esPresenter import Prefetch2esPresenter
+    presenter = Prefetch2esPresenter(
+        [Path('tests/cache')], timeline_index='prefetch2es-timeline', index_template=True
+    )
+    templates = dict(presenter._get_index_templates())
+    assert len(templates) == 2
+    assert [template['index_patterns'] for template in templates.values()] == [
+        ['prefetch2es'], ['prefetch2es-timeline']
+    ]
+
+# library test cases
+def test__iter_prefetch_records_early_close():
+    import multiprocessing
+    from prefetch2es import iter_prefetch_records, prefetch2json
+    records = iter_prefetch_records('tests/cache/', workers=2, chunk_size=1, max_inflight=2)
+    first = next(records)
+    assert multiprocessing.active_children()
+    records.close()
+    assert first == prefetch2json('tests/cache/')[0]
+    assert not multiprocessing.active_children()
+
+def test__iter_prefetch_records_early_close_keeps_pool():
+    from prefetch2es import WorkerPool, iter_prefetch_records, prefetch2json
+    with WorkerPool(workers=2) as pool:
+        for _ in iter_prefetch_records('tests/cache/', pool=pool, chunk_size=1):
+            break
+        assert list(iter_prefetch_records('tests/cache/', pool=pool)) == prefetch2json('tests/cache/')
+
+def test__recursive_default(tmp_path):
+    import shutil
+    from prefetch2es import iter_prefetch_records, prefetch2es, prefetch2json
+    from prefetch2es.models.BulkFiles import list_bulk_files, read_bulk_files
+    from prefetch2es.models.Prefetch2es import Prefetch2es
+    filepaths = sorted(Path('tests/cache').glob('*.pf'))[:2]
+    (tmp_path / 'sub').mkdir()
+    shutil.copyfile(filepaths[0], tmp_path / filepaths[0].name)
+    shutil.copyfile(filepaths[1], tmp_path / 'sub' / filepaths[1].name)
+
+    def exported(**kwargs) -> int:
+        output = tmp_path / f'bulk-{len(kwargs)}'
+        prefetch2es(str(tmp_path), bulk_output=str(output), **kwargs)
+        return len(list(read_bulk_files(list_bulk_files([output]))))
+
+    assert len(prefetch2json(str(tmp_path))) == len(list(iter_prefetch_records(str(tmp_path)))) == 1
+    assert exported() == 1
+    assert len(prefetch2json(str(tmp_path), recursive=True)) == 2
+    assert len(list(iter_prefetch_records(str(tmp_path), recursive=True))) == 2
+    assert exported(recursive=True) == 2
+    prefetch = Prefetch2es([tmp_path], recursive=True)
+    assert prefetch._get_prefetch_files() == prefetch.get_prefetch_files()